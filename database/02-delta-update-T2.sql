@@ -0,0 +1,261 @@
+-- Delta Load Script for T2 Dataset
+-- Applies a T2 snapshot generated with --t2-dimensions delta on top of a
+-- loaded T1 database: dimension rows are inserted or updated from the
+-- <table>.insert.csv / <table>.update.csv change sets, facts are appended.
+-- Only changed rows are touched, unlike 02-bulk-update-T2.sql.
+
+-- Pociag: new rows
+BULK INSERT Pociag
+FROM '/opt/data/T2/Pociag.insert.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+-- Pociag: changed rows
+CREATE TABLE Pociag_Changes
+(
+    id INT,
+    nazwa VARCHAR(20),
+    typ_pociagu VARCHAR(30),
+    operator VARCHAR(40)
+);
+
+BULK INSERT Pociag_Changes
+FROM '/opt/data/T2/Pociag.update.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
+
+UPDATE target
+SET
+    nazwa = source.nazwa,
+    typ_pociagu = source.typ_pociagu,
+    operator = source.operator
+FROM Pociag AS target
+    INNER JOIN Pociag_Changes AS source ON target.id = source.id;
+
+DROP TABLE Pociag_Changes;
+
+-- Maszynista: new rows
+BULK INSERT Maszynista
+FROM '/opt/data/T2/Maszynista.insert.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+-- Maszynista: changed rows
+CREATE TABLE Maszynista_Changes
+(
+    id INT,
+    imie VARCHAR(30),
+    nazwisko VARCHAR(30),
+    pesel CHAR(11),
+    plec VARCHAR(10),
+    wiek INT,
+    rok_zatrudnienia INT
+);
+
+BULK INSERT Maszynista_Changes
+FROM '/opt/data/T2/Maszynista.update.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
+
+UPDATE target
+SET
+    imie = source.imie,
+    nazwisko = source.nazwisko,
+    pesel = source.pesel,
+    plec = source.plec,
+    wiek = source.wiek,
+    rok_zatrudnienia = source.rok_zatrudnienia
+FROM Maszynista AS target
+    INNER JOIN Maszynista_Changes AS source ON target.id = source.id;
+
+DROP TABLE Maszynista_Changes;
+
+-- Przejazd: new rows
+BULK INSERT Przejazd
+FROM '/opt/data/T2/Przejazd.insert.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+-- Przejazd: changed rows
+CREATE TABLE Przejazd_Changes
+(
+    id INT,
+    czy_rogatki BIT,
+    czy_sygnalizacja_swietlna BIT,
+    czy_oswietlony BIT,
+    dopuszczalna_predkosc INT
+);
+
+BULK INSERT Przejazd_Changes
+FROM '/opt/data/T2/Przejazd.update.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
+
+UPDATE target
+SET
+    czy_rogatki = source.czy_rogatki,
+    czy_sygnalizacja_swietlna = source.czy_sygnalizacja_swietlna,
+    czy_oswietlony = source.czy_oswietlony,
+    dopuszczalna_predkosc = source.dopuszczalna_predkosc
+FROM Przejazd AS target
+    INNER JOIN Przejazd_Changes AS source ON target.id = source.id;
+
+DROP TABLE Przejazd_Changes;
+
+-- Zdarzenie: new rows
+BULK INSERT Zdarzenie
+FROM '/opt/data/T2/Zdarzenie.insert.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+-- Zdarzenie: changed rows
+CREATE TABLE Zdarzenie_Changes
+(
+    id INT,
+    typ_zdarzenia VARCHAR(30),
+    kategoria VARCHAR(40),
+    skala_niebezpieczenstwa INT
+);
+
+BULK INSERT Zdarzenie_Changes
+FROM '/opt/data/T2/Zdarzenie.update.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
+
+UPDATE target
+SET
+    typ_zdarzenia = source.typ_zdarzenia,
+    kategoria = source.kategoria,
+    skala_niebezpieczenstwa = source.skala_niebezpieczenstwa
+FROM Zdarzenie AS target
+    INNER JOIN Zdarzenie_Changes AS source ON target.id = source.id;
+
+DROP TABLE Zdarzenie_Changes;
+
+-- Stacja: new rows
+BULK INSERT Stacja
+FROM '/opt/data/T2/Stacja.insert.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+-- Stacja: changed rows
+CREATE TABLE Stacja_Changes
+(
+    id INT,
+    nazwa VARCHAR(40),
+    miasto VARCHAR(40)
+);
+
+BULK INSERT Stacja_Changes
+FROM '/opt/data/T2/Stacja.update.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
+
+UPDATE target
+SET
+    nazwa = source.nazwa,
+    miasto = source.miasto
+FROM Stacja AS target
+    INNER JOIN Stacja_Changes AS source ON target.id = source.id;
+
+DROP TABLE Stacja_Changes;
+
+-- Facts: T2 only contains new rides, so they are appended
+
+BULK INSERT Kurs
+FROM '/opt/data/T2/Kurs.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+BULK INSERT Odcinek_kursu
+FROM '/opt/data/T2/Odcinek_kursu.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+BULK INSERT Zdarzenie_na_trasie
+FROM '/opt/data/T2/Zdarzenie_na_trasie.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    KEEPIDENTITY,
+    TABLOCK
+);
+
+BULK INSERT Weather
+FROM '/opt/data/T2/Weather.csv'
+WITH (
+    FORMAT = 'CSV',
+    FIRSTROW = 2,
+    FIELDTERMINATOR = ',',
+    ROWTERMINATOR = '\n',
+    TABLOCK
+);
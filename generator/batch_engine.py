@@ -0,0 +1,657 @@
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Union
+
+import numpy as np
+
+from clock import DAY, MINUTE, to_epoch
+from config import (
+    EVENT_DEFINITIONS,
+    EVENT_DELAY_RANGES,
+    EVENT_RATE_IMPROVEMENT_DATE,
+    EVENT_REPAIR_COST_RANGES,
+    EVENT_TYPE_WEIGHTS,
+    REGIONS,
+    SWITCH_DATE,
+    UPGRADE_DATE,
+    SnapshotConfig,
+)
+from dimensions import CARGO_CODES, OLD, PASSENGER, POLREGIO
+from eligibility import EmploymentIndex, resolve_upgrade_pools
+from sampling import CARGO_OPERATOR, OLD_CROSSING, SAMPLERS, SNOW
+from streams import EVENT, RIDE, ROUTE, SECTION, CounterStreams, KeyedDraws
+from weather import DESZCZ, GRAD, SNIEG
+
+if TYPE_CHECKING:
+    from main import RailwayDataGenerator
+
+# ---------------------------------------------------------------------------
+# Vectorised fact generation
+# Draws whole blocks of rides as NumPy arrays from sequential or counter
+# streams (see ``streams``).
+# ---------------------------------------------------------------------------
+
+EVENT_TYPES = tuple(EVENT_TYPE_WEIGHTS)
+WYPADEK, INCYDENT, AWARIA, TECHNICZNE = range(len(EVENT_TYPES))
+
+Stream = Union[np.random.Generator, KeyedDraws]
+
+
+@dataclass
+class FactBlock:
+    """Rows produced for one block of rides, column by column."""
+
+    ride_id: np.ndarray
+    ride_route: np.ndarray
+    ride_delay: np.ndarray
+    ride_departure: np.ndarray
+    ride_arrival: np.ndarray
+    ride_train_id: np.ndarray
+    ride_driver_id: np.ndarray
+
+    section_id: np.ndarray
+    section_ride_id: np.ndarray
+    section_number: np.ndarray
+    section_departure_station: np.ndarray
+    section_arrival_station: np.ndarray
+    section_delay: np.ndarray
+    section_arrival: np.ndarray
+    section_departure: np.ndarray
+
+    weather_temperature: np.ndarray
+    weather_precipitation: np.ndarray
+    weather_type: np.ndarray
+
+    event_id: np.ndarray
+    event_section_id: np.ndarray
+    event_crossing_id: np.ndarray
+    event_definition_id: np.ndarray
+    event_delay: np.ndarray
+    event_injured: np.ndarray
+    event_deaths: np.ndarray
+    event_repair_cost: np.ndarray
+    event_emergency: np.ndarray
+    event_time: np.ndarray
+    event_speed: np.ndarray
+
+    @property
+    def ride_count(self) -> int:
+        return len(self.ride_id)
+
+    @property
+    def section_count(self) -> int:
+        return len(self.section_id)
+
+    @property
+    def event_count(self) -> int:
+        return len(self.event_id)
+
+    def select_rides(self, rides: np.ndarray) -> "FactBlock":
+        """The rows of the rides selected by the boolean mask ``rides``."""
+        sections = rides[np.searchsorted(self.ride_id, self.section_ride_id)]
+        events = sections[np.searchsorted(self.section_id, self.event_section_id)]
+        masks = {
+            "ride": rides,
+            "section": sections,
+            "weather": sections,
+            "event": events,
+        }
+        return FactBlock(
+            **{
+                field.name: getattr(self, field.name)[masks[field.name.split("_")[0]]]
+                for field in fields(self)
+            }
+        )
+
+
+class CompiledDimensions:
+    """Array views of the generator dimensions used by the batch engine.
+
+    Built once per snapshot in the parent process; plain NumPy arrays keep it
+    cheap to pickle into worker processes.
+    """
+
+    def __init__(self, generator: "RailwayDataGenerator") -> None:
+        self._compile_routes(generator)
+        self._compile_crossings(generator)
+        self._compile_trains(generator)
+        self._compile_drivers(generator)
+        self._compile_events(generator)
+        self.weather = generator.weather
+        self.calendar = generator.calendar
+
+    def sections_for_routes(self, routes: np.ndarray) -> int:
+        return int(self.route_lengths[routes].sum())
+
+    def _compile_routes(self, generator: "RailwayDataGenerator") -> None:
+        """Concatenate the route timetables into flat per-section arrays."""
+        timetables = generator.timetables
+        self.route_names = np.array([t.name for t in timetables], dtype=object)
+        self.route_lengths = np.array(
+            [t.section_count for t in timetables], dtype=np.int64
+        )
+        self.route_offsets = np.cumsum(self.route_lengths) - self.route_lengths
+        self.route_total_minutes = np.array(
+            [t.total_minutes for t in timetables], dtype=np.int64
+        )
+        self.section_dep = np.concatenate([t.departure_station for t in timetables])
+        self.section_arr = np.concatenate([t.arrival_station for t in timetables])
+        self.section_minutes = np.concatenate([t.section_minutes for t in timetables])
+        self.section_start_minutes = np.concatenate(
+            [t.start_minutes for t in timetables]
+        )
+        self.section_hotspot = np.concatenate([t.hotspot for t in timetables])
+        self.section_region = np.concatenate([t.region for t in timetables])
+
+        self.repeating_timetable = generator.timetable == "repeating"
+        self.route_departure_counts = np.array(
+            [len(t.departures) for t in timetables], dtype=np.int64
+        )
+        self.route_departure_offsets = (
+            np.cumsum(self.route_departure_counts) - self.route_departure_counts
+        )
+        self.route_departures = np.concatenate([t.departures for t in timetables])
+
+    def _compile_crossings(self, generator: "RailwayDataGenerator") -> None:
+        crossings = generator.crossings
+        self.crossing_is_old = (crossings.column("flags") & OLD) > 0
+        self.crossing_upgrade_target = crossings.column("upgrade_target").astype(
+            np.int64
+        )
+        self.crossing_speed_limit = crossings.column("speed_limit").astype(np.int64)
+
+        resolved = resolve_upgrade_pools(
+            generator.crossings_by_region, crossings.column("upgrade_target")
+        )
+        pools = [resolved.get(name, ([], [])) for name in REGIONS]
+        self.region_crossing_counts = np.array(
+            [len(before) for before, _ in pools], dtype=np.int64
+        )
+        self.region_crossing_offsets = (
+            np.cumsum(self.region_crossing_counts) - self.region_crossing_counts
+        )
+        before = [cid for pool, _ in pools for cid in pool]
+        after = [cid for _, pool in pools for cid in pool]
+        self.region_crossings = np.array(before or [0], dtype=np.int64)
+        self.region_crossings_upgraded = np.array(after or [0], dtype=np.int64)
+
+    def _compile_trains(self, generator: "RailwayDataGenerator") -> None:
+        trains = generator.trains
+        self.train_pool = np.array(trains.ids(), dtype=np.int64)
+        size = trains.next_id
+        operator = trains.column("operator")
+        self.train_is_polregio = operator == POLREGIO
+        self.train_is_cargo = np.isin(operator, list(CARGO_CODES))
+        self.train_is_passenger = trains.column("train_type") == PASSENGER
+
+        # Before the switch replacement trains stand in for their originals,
+        # afterwards the originals hand their rides over to the replacements.
+        self.train_before_switch = np.arange(size, dtype=np.int64)
+        self.train_after_switch = np.arange(size, dtype=np.int64)
+        for old_id, new_id in generator.train_switch_pairs.items():
+            self.train_before_switch[new_id] = old_id
+            self.train_after_switch[old_id] = new_id
+
+    def _compile_drivers(self, generator: "RailwayDataGenerator") -> None:
+        drivers = generator.drivers
+        self.driver_pool = np.array(drivers.ids(), dtype=np.int64)
+        self.driver_employment_year = drivers.column("employment_year").astype(np.int64)
+        self.driver_index = EmploymentIndex(drivers.employment_years())
+
+    def _compile_events(self, generator: "RailwayDataGenerator") -> None:
+        by_type = [generator.event_pools[name] for name in EVENT_TYPES]
+        width = max(len(ids) for ids in by_type)
+        self.type_event_ids = np.zeros((len(EVENT_TYPES), width), dtype=np.int64)
+        self.type_event_counts = np.array([len(ids) for ids in by_type])
+        for idx, ids in enumerate(by_type):
+            self.type_event_ids[idx, : len(ids)] = ids
+        self.type_delay_low = np.array([EVENT_DELAY_RANGES[n][0] for n in EVENT_TYPES])
+        self.type_delay_span = np.array(
+            [EVENT_DELAY_RANGES[n][1] - EVENT_DELAY_RANGES[n][0] for n in EVENT_TYPES]
+        )
+        self.type_cost_low = np.array(
+            [EVENT_REPAIR_COST_RANGES[n][0] for n in EVENT_TYPES]
+        )
+        self.type_cost_span = np.array(
+            [
+                EVENT_REPAIR_COST_RANGES[n][1] - EVENT_REPAIR_COST_RANGES[n][0]
+                for n in EVENT_TYPES
+            ]
+        )
+        assert len(generator.events) == len(EVENT_DEFINITIONS)
+
+
+def draw_routes(route_rng: Stream, dims: CompiledDimensions, count: int) -> np.ndarray:
+    """Route choices come from their own stream so section counts can be
+    replayed without generating the rest of the ride."""
+    return route_rng.integers(0, len(dims.route_lengths), count)
+
+
+def count_sections(
+    dims: CompiledDimensions,
+    route_rng: np.random.Generator,
+    ride_count: int,
+    block_size: int,
+) -> int:
+    total = 0
+    remaining = ride_count
+    while remaining > 0:
+        size = min(block_size, remaining)
+        total += dims.sections_for_routes(draw_routes(route_rng, dims, size))
+        remaining -= size
+    return total
+
+
+class BatchFactEngine:
+    """Vectorised fact generation for one snapshot (or shard of it).
+
+    Pass ``rng`` and ``route_rng`` for sequential streams, or ``streams``
+    and ``ride_base`` -- the id of the snapshot's first ride -- for counter
+    streams, under which the rides can also be regenerated individually.
+    """
+
+    def __init__(
+        self,
+        dims: CompiledDimensions,
+        config: SnapshotConfig,
+        rng: Optional[np.random.Generator] = None,
+        route_rng: Optional[np.random.Generator] = None,
+        block_size: int = 4096,
+        streams: Optional[CounterStreams] = None,
+        ride_base: int = 1,
+    ) -> None:
+        if (streams is None) == (rng is None or route_rng is None):
+            raise ValueError("Pass either rng and route_rng or counter streams")
+        self.dims = dims
+        self.config = config
+        self.block_size = block_size
+        self.rng = rng
+        self.route_rng = route_rng
+        self.streams = streams
+        self.ride_base = ride_base
+        self.start_epoch = to_epoch(config.start)
+        self.end_epoch = to_epoch(config.end)
+        self.span_seconds = self.end_epoch - self.start_epoch
+        self.upgrade_epoch = to_epoch(UPGRADE_DATE)
+        self.switch_epoch = to_epoch(SWITCH_DATE)
+        self.improvement_epoch = to_epoch(EVENT_RATE_IMPROVEMENT_DATE)
+        self.is_t2 = config.name == "T2"
+
+    def random_state(self) -> Dict[str, dict]:
+        """Bit generator states of both streams (JSON-serialisable).
+
+        Counter streams have no state: draws depend on the ride ids only.
+        """
+        if self.streams is not None:
+            return {}
+        return {
+            "rng": self.rng.bit_generator.state,
+            "route_rng": self.route_rng.bit_generator.state,
+        }
+
+    def restore_random_state(self, state: Dict[str, dict]) -> None:
+        if self.streams is not None:
+            return
+        self.rng.bit_generator.state = state["rng"]
+        self.route_rng.bit_generator.state = state["route_rng"]
+
+    # ------------------------------------------------------------------
+    # Block generation
+    # ------------------------------------------------------------------
+
+    def blocks(
+        self,
+        ride_count: int,
+        first_ride_id: int,
+        first_section_id: int,
+        first_event_id: int,
+    ) -> Iterator[FactBlock]:
+        remaining = ride_count
+        ride_id, section_id, event_id = first_ride_id, first_section_id, first_event_id
+        while remaining > 0:
+            size = min(self.block_size, remaining)
+            block = self.generate_block(size, ride_id, section_id, event_id)
+            ride_id += block.ride_count
+            section_id += block.section_count
+            event_id += block.event_count
+            remaining -= size
+            yield block
+
+    def generate_block(
+        self,
+        ride_count: int,
+        first_ride_id: int,
+        first_section_id: int,
+        first_event_id: int,
+    ) -> FactBlock:
+        rides = first_ride_id - self.ride_base + np.arange(ride_count, dtype=np.int64)
+        return self._generate(rides, first_section_id, first_event_id)
+
+    def regenerate(self, rides: np.ndarray, first_section_ids: np.ndarray) -> FactBlock:
+        """Rides by snapshot index, independently of all other rides.
+
+        Needs counter streams.  ``first_section_ids`` holds the id of each
+        ride's first section (see ``routes``); events are numbered when
+        written, so regenerated events carry id 0.
+        """
+        if self.streams is None:
+            raise ValueError("Only counter streams regenerate rides in isolation")
+        return self._generate(rides, first_section_ids, None)
+
+    def routes(self, rides: np.ndarray) -> np.ndarray:
+        """Routes of rides by snapshot index (counter streams only)."""
+        return draw_routes(self._stream(ROUTE, rides), self.dims, len(rides))
+
+    def departures(self, rides: np.ndarray) -> np.ndarray:
+        """Departure times of rides by snapshot index (counter streams only)."""
+        return self._ride_departures(self.routes(rides), self._stream(RIDE, rides))
+
+    def _stream(
+        self, purpose: int, rides: np.ndarray, positions: Optional[np.ndarray] = None
+    ) -> Stream:
+        if self.streams is not None:
+            return self.streams.draws(purpose, rides, positions)
+        return self.route_rng if purpose == ROUTE else self.rng
+
+    def _generate(
+        self,
+        rides: np.ndarray,
+        first_section_id: Union[int, np.ndarray],
+        first_event_id: Optional[int],
+    ) -> FactBlock:
+        n = len(rides)
+
+        route = draw_routes(self._stream(ROUTE, rides), self.dims, n)
+        ride_rng = self._stream(RIDE, rides)
+        ride_departure = self._ride_departures(route, ride_rng)
+        train_id = self._select_trains(ride_departure, ride_rng)
+        driver_id = self._select_drivers(ride_departure, ride_rng)
+
+        # Expand rides into their sections.
+        lengths = self.dims.route_lengths[route]
+        total = int(lengths.sum())
+        ride_index = np.repeat(np.arange(n), lengths)
+        position = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        flat = np.repeat(self.dims.route_offsets[route], lengths) + position
+        dep_station = self.dims.section_dep[flat]
+        arr_station = self.dims.section_arr[flat]
+        departure = (
+            ride_departure[ride_index] + self.dims.section_start_minutes[flat] * MINUTE
+        )
+        arrival = departure + self.dims.section_minutes[flat] * MINUTE
+
+        bucket = self.dims.calendar.bucket(departure)
+        year = self.dims.calendar.year[bucket]
+        hour = self.dims.calendar.hour[bucket]
+        weekday = self.dims.calendar.weekday[bucket]
+
+        region = self.dims.section_region[flat]
+        temperature, precipitation, precip_type = self._sample_weather(
+            departure, region
+        )
+
+        section_rng = self._stream(SECTION, rides[ride_index], position)
+        section_train = train_id[ride_index]
+        is_polregio = self.dims.train_is_polregio[section_train]
+        is_cargo = self.dims.train_is_cargo[section_train]
+        experience = year - self.dims.driver_employment_year[driver_id][ride_index]
+
+        delay = self._delay_minutes(
+            section_rng,
+            self.dims.section_hotspot[flat],
+            hour,
+            weekday,
+            experience,
+            is_polregio,
+            is_cargo,
+            precip_type,
+            precipitation,
+        )
+
+        crossing = self._select_crossings(section_rng, region, departure)
+        has_event = self._event_mask(
+            section_rng,
+            crossing,
+            departure,
+            experience,
+            is_polregio,
+            is_cargo,
+            precip_type,
+            precipitation,
+        )
+        event_rows = np.flatnonzero(has_event)
+        event_rng = self._stream(
+            EVENT, rides[ride_index[event_rows]], position[event_rows]
+        )
+        events = self._build_events(
+            event_rng,
+            event_rows,
+            crossing,
+            departure,
+            section_train,
+            is_cargo,
+            precip_type,
+        )
+        event_delay = events.pop("delay")
+        delay[event_rows] = np.clip(delay[event_rows] + event_delay, -5.0, 240.0)
+
+        ride_delay = np.clip(
+            np.bincount(ride_index, weights=delay, minlength=n), -20.0, 360.0
+        )
+        if np.ndim(first_section_id):
+            section_id = np.repeat(first_section_id, lengths) + position
+        else:
+            section_id = first_section_id + np.arange(total, dtype=np.int64)
+        if first_event_id is None:
+            event_id = np.zeros(len(event_rows), dtype=np.int64)
+        else:
+            event_id = first_event_id + np.arange(len(event_rows), dtype=np.int64)
+
+        return FactBlock(
+            ride_id=self.ride_base + rides,
+            ride_route=route,
+            ride_delay=np.rint(ride_delay).astype(np.int64),
+            ride_departure=ride_departure,
+            ride_arrival=ride_departure + self.dims.route_total_minutes[route] * MINUTE,
+            ride_train_id=train_id,
+            ride_driver_id=driver_id,
+            section_id=section_id,
+            section_ride_id=self.ride_base + rides[ride_index],
+            section_number=position + 1,
+            section_departure_station=dep_station,
+            section_arrival_station=arr_station,
+            section_delay=np.rint(delay).astype(np.int64),
+            section_arrival=arrival,
+            section_departure=departure,
+            weather_temperature=temperature,
+            weather_precipitation=precipitation,
+            weather_type=precip_type,
+            event_id=event_id,
+            event_section_id=section_id[event_rows],
+            event_delay=np.rint(event_delay).astype(np.int64),
+            **events,
+        )
+
+    # ------------------------------------------------------------------
+    # Ride start, train and driver selection
+    # ------------------------------------------------------------------
+
+    def _ride_departures(self, route: np.ndarray, rng: Stream) -> np.ndarray:
+        n = len(route)
+        if not self.dims.repeating_timetable:
+            return self.start_epoch + rng.integers(0, self.span_seconds + 1, n)
+        first_day = self.start_epoch - self.start_epoch % DAY
+        day = rng.integers(0, (self.end_epoch - first_day) // DAY + 1, n)
+        slot = self.dims.route_departure_offsets[route] + (
+            rng.random(n) * self.dims.route_departure_counts[route]
+        ).astype(np.int64)
+        return first_day + day * DAY + self.dims.route_departures[slot] * MINUTE
+
+    def _select_trains(self, departure: np.ndarray, rng: Stream) -> np.ndarray:
+        candidate = self.dims.train_pool[
+            rng.integers(0, len(self.dims.train_pool), len(departure))
+        ]
+        if not self.is_t2:
+            return candidate
+        return np.where(
+            departure < self.switch_epoch,
+            self.dims.train_before_switch[candidate],
+            self.dims.train_after_switch[candidate],
+        )
+
+    def _select_drivers(self, departure: np.ndarray, rng: Stream) -> np.ndarray:
+        year = self.dims.calendar.year[self.dims.calendar.bucket(departure)]
+        return self.dims.driver_index.draw_many(rng, year)
+
+    # ------------------------------------------------------------------
+    # Weather, delays, crossings and events
+    # ------------------------------------------------------------------
+
+    def _sample_weather(
+        self, departure: np.ndarray, region: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.dims.weather.lookup(region, departure)
+
+    def _delay_minutes(
+        self,
+        rng: Stream,
+        hotspot: np.ndarray,
+        hour: np.ndarray,
+        weekday: np.ndarray,
+        experience: np.ndarray,
+        is_polregio: np.ndarray,
+        is_cargo: np.ndarray,
+        precip_type: np.ndarray,
+        precipitation: np.ndarray,
+    ) -> np.ndarray:
+        total = len(hour)
+        u = rng.random((8, total))
+
+        delay = rng.normal(0.0, 1.5, total)
+        delay += np.where(hotspot, 2.0 + 2.0 * u[0], 0.0)
+        rush = ((hour >= 7) & (hour <= 9)) | ((hour >= 16) & (hour <= 18))
+        delay += np.where(rush, 0.5 + 2.0 * u[1], 0.0)
+        delay += np.where(weekday == 4, 0.3 + 1.5 * u[2], 0.0)
+
+        delay *= np.where(
+            experience < 3,
+            1.12 + 0.16 * u[3],
+            np.where(experience > 5, 0.82 + 0.10 * u[3], 1.0),
+        )
+
+        delay += np.where(is_polregio, 0.5 + 1.5 * u[4], 0.0)
+        delay += np.where(is_cargo, -0.5 + 1.5 * u[5], 0.0)
+
+        delay += np.where(precip_type == SNIEG, 1.5 + 2.5 * u[6], 0.0)
+        heavy_rain = (precip_type == DESZCZ) & (precipitation >= 8.0)
+        delay += np.where(heavy_rain, 1.0 + 2.0 * u[7], 0.0)
+        delay += np.where(precip_type == GRAD, 0.5 + 1.5 * u[7], 0.0)
+        return delay
+
+    def _select_crossings(
+        self, rng: Stream, region: np.ndarray, departure: np.ndarray
+    ) -> np.ndarray:
+        counts = self.dims.region_crossing_counts[region]
+        pick = (rng.random(len(region)) * counts).astype(np.int64)
+        slot = np.minimum(
+            self.dims.region_crossing_offsets[region] + pick,
+            len(self.dims.region_crossings) - 1,
+        )
+        crossing = np.where(
+            departure >= self.upgrade_epoch,
+            self.dims.region_crossings_upgraded[slot],
+            self.dims.region_crossings[slot],
+        )
+        return np.where(counts > 0, crossing, 0)
+
+    def _event_mask(
+        self,
+        rng: Stream,
+        crossing: np.ndarray,
+        departure: np.ndarray,
+        experience: np.ndarray,
+        is_polregio: np.ndarray,
+        is_cargo: np.ndarray,
+        precip_type: np.ndarray,
+        precipitation: np.ndarray,
+    ) -> np.ndarray:
+        probability = np.full(len(crossing), self.config.base_event_rate)
+        probability *= np.where(self.dims.crossing_is_old[crossing], 1.45, 1.0)
+        pending_upgrade = (self.dims.crossing_upgrade_target[crossing] > 0) & (
+            departure >= self.upgrade_epoch
+        )
+        probability *= np.where(pending_upgrade, 0.8, 1.0)
+        wet = (precip_type == DESZCZ) | (precip_type == SNIEG)
+        probability *= np.where(wet, 1.2, 1.0)
+        probability *= np.where(precipitation >= 8.0, 1.3, 1.0)
+        probability *= np.where(
+            experience < 3, 1.2, np.where(experience > 5, 0.92, 1.0)
+        )
+        improved = (departure >= self.improvement_epoch) & (departure <= self.end_epoch)
+        probability *= np.where(improved, 0.95, 1.0)
+        probability *= np.where(is_polregio, 1.1, np.where(is_cargo, 0.95, 1.0))
+        probability = np.minimum(0.35, probability)
+        return rng.random(len(crossing)) < probability
+
+    def _build_events(
+        self,
+        rng: Stream,
+        rows: np.ndarray,
+        crossing: np.ndarray,
+        departure: np.ndarray,
+        section_train: np.ndarray,
+        is_cargo: np.ndarray,
+        precip_type: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        count = len(rows)
+        event_crossing = crossing[rows]
+        condition = (
+            np.where(self.dims.crossing_is_old[event_crossing], OLD_CROSSING, 0)
+            | np.where(precip_type[rows] == SNIEG, SNOW, 0)
+            | np.where(is_cargo[rows], CARGO_OPERATOR, 0)
+        )
+        u = rng.random((6, count))
+        event_type = SAMPLERS["event_type"].lookup(u[0], condition)
+        pick = (u[1] * self.dims.type_event_counts[event_type]).astype(np.int64)
+        definition = self.dims.type_event_ids[event_type, pick]
+
+        delay = (
+            self.dims.type_delay_low[event_type]
+            + self.dims.type_delay_span[event_type] * u[2]
+        )
+        cost = (
+            self.dims.type_cost_low[event_type]
+            + self.dims.type_cost_span[event_type] * u[3]
+        )
+
+        is_accident = event_type == WYPADEK
+        injured = np.where(
+            is_accident,
+            rng.integers(0, 6, count),
+            np.where((event_type == AWARIA) & (u[4] < 0.05), 1, 0),
+        )
+        deaths = np.where(is_accident & (u[4] < 0.05), 1, 0)
+        emergency = is_accident | (event_type == AWARIA)
+        event_time = departure[rows] + np.floor((2.0 + 8.0 * u[5]) * 60.0).astype(
+            np.int64
+        )
+
+        base_speed = np.where(
+            self.dims.train_is_passenger[section_train[rows]], 110, 90
+        )
+        limit = self.dims.crossing_speed_limit[event_crossing] + rng.integers(
+            -10, 6, count
+        )
+        speed = np.where(event_crossing > 0, np.minimum(base_speed, limit), base_speed)
+        speed = np.clip(speed, 30, 160)
+
+        return {
+            "event_crossing_id": event_crossing,
+            "event_definition_id": definition,
+            "delay": delay,
+            "event_injured": injured,
+            "event_deaths": deaths,
+            "event_repair_cost": cost,
+            "event_emergency": emergency,
+            "event_time": event_time,
+            "event_speed": speed,
+        }
@@ -0,0 +1,531 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# ---------------------------------------------------------------------------
+# Generator benchmark
+# Every scale runs in a fresh interpreter so sizes and peak RSS are per run.
+# ---------------------------------------------------------------------------
+
+DEFAULT_SCALES = ("2000:1000", "20000:10000")
+
+# Generator methods timed as stages, with the argument that names the snapshot.
+STAGES: Dict[str, Optional[int]] = {
+    "_build_dimensions": None,
+    "_build_stations": None,
+    "_build_crossings": None,
+    "_build_trains": None,
+    "_build_drivers": None,
+    "_build_events": None,
+    "_build_routes": None,
+    "_write_dimensions": 0,
+    "_generate_facts": 0,
+    "_augment_dimensions_for_t2": None,
+    "_write_dimension_changes": 0,
+}
+
+# Per-call hot paths of each fact engine, as (module, class, method).
+HOT_PATHS: Dict[str, Tuple[Tuple[str, str, str], ...]] = {
+    "scalar": (
+        ("main", "RailwayDataGenerator", "_build_sections_for_ride"),
+        ("main", "RailwayDataGenerator", "_maybe_create_event"),
+        ("main", "RailwayDataGenerator", "_sample_weather"),
+    ),
+    "batch": (
+        ("batch_engine", "BatchFactEngine", "generate_block"),
+        ("batch_engine", "BatchFactEngine", "_sample_weather"),
+        ("batch_engine", "BatchFactEngine", "_build_events"),
+    ),
+}
+
+
+def _parse_scale(text: str) -> Tuple[int, int]:
+    t1, _, t2 = text.partition(":")
+    try:
+        return int(t1), int(t2 or t1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected T1_RIDES[:T2_RIDES], got {text}")
+
+
+# ---------------------------------------------------------------------------
+# Child side: one generator run
+# ---------------------------------------------------------------------------
+
+
+class _Timers:
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def wrap(self, name: str, function: Callable, label_arg: Optional[int]) -> Callable:
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            key = name
+            if label_arg is not None and len(args) > label_arg:
+                label = args[label_arg]
+                key = f"{name}[{getattr(label, 'name', label)}]"
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[key] += time.perf_counter() - started
+                self.calls[key] += 1
+
+        return timed
+
+
+def _table_rows(path: Path) -> Tuple[int, int]:
+    """Rows of a table file and its uncompressed size in bytes."""
+    from compressed import is_csv, open_binary_reader
+
+    if is_csv(path):
+        lines = size = 0
+        with open_binary_reader(path) as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                lines += chunk.count(b"\n")
+                size += len(chunk)
+        return max(lines - 1, 0), size
+    if path.suffix == ".bcp":
+        from native import iter_raw_rows, native_columns
+
+        with path.open("rb") as handle:
+            rows = sum(1 for _ in iter_raw_rows(handle, native_columns(path)))
+        return rows, path.stat().st_size
+    from columnar import _pyarrow
+
+    pa = _pyarrow()
+    if path.suffix == ".parquet":
+        return pa.parquet.ParquetFile(path).metadata.num_rows, path.stat().st_size
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        rows = sum(
+            reader.get_batch(idx).num_rows for idx in range(reader.num_record_batches)
+        )
+    return rows, path.stat().st_size
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale / (1 << 20)
+
+
+def run_scale(args: argparse.Namespace, output_dir: Path) -> Dict[str, object]:
+    """Run the generator once in this process and measure it."""
+    import main
+    from output import DIMENSION_COLUMNS, OutputOptions
+
+    stage_timers, hot_timers = _Timers(), _Timers()
+    for module_name, class_name, method in HOT_PATHS[args.engine]:
+        owner = getattr(sys.modules[module_name], class_name)
+        setattr(
+            owner,
+            method,
+            hot_timers.wrap(f"{class_name}.{method}", getattr(owner, method), None),
+        )
+
+    generator = main.RailwayDataGenerator(
+        output_dir,
+        seed=args.seed,
+        engine=args.engine,
+        block_size=args.block_rides,
+        workers=args.workers,
+        output=OutputOptions(
+            format=args.format,
+            csv_compression=args.csv_compression,
+            compression_threads=args.compression_threads,
+            pipeline_depth=args.pipeline_depth,
+            flush_rows=args.flush_rows,
+        ),
+        t2_dimensions=args.t2_dimensions,
+        scale_factor=args.child_scale_factor,
+        random_streams=args.random_streams,
+    )
+    for stage, label_arg in STAGES.items():
+        method = getattr(generator, stage)
+        setattr(
+            generator, stage, stage_timers.wrap(stage.lstrip("_"), method, label_arg)
+        )
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    generator.generate()
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    tables: Dict[str, Dict[str, float]] = {}
+    bytes_written = raw_bytes = 0
+    for snapshot in ("T1", "T2"):
+        for path in sorted((output_dir / snapshot).glob("*.*")):
+            if path.suffix in (".xml", ".sh"):
+                continue  # bcp format files and load script
+            size = path.stat().st_size
+            bytes_written += size
+            rows, raw_size = _table_rows(path)
+            raw_bytes += raw_size
+            stage = "generate_facts"
+            if path.name.split(".")[0] in DIMENSION_COLUMNS:
+                stage = "write_dimensions"
+                if args.t2_dimensions == "delta" and snapshot == "T2":
+                    stage = "write_dimension_changes"
+            seconds = stage_timers.seconds.get(f"{stage}[{snapshot}]", 0.0)
+            tables[f"{snapshot}/{path.name}"] = {
+                "rows": rows,
+                "bytes": size,
+                "raw_bytes": raw_size,
+                "rows_per_second": rows / seconds if seconds else 0.0,
+            }
+
+    hot_paths = {
+        name: {"calls": hot_timers.calls[name], "seconds": seconds}
+        for name, seconds in hot_timers.seconds.items()
+    }
+    return {
+        "t1_rides": generator.t1_config.ride_count,
+        "t2_rides": generator.t2_config.ride_count,
+        "scale_factor": args.child_scale_factor,
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "stages": dict(stage_timers.seconds),
+        "hot_paths": hot_paths,
+        "tables": tables,
+        "bytes_written": bytes_written,
+        "compression_ratio": raw_bytes / bytes_written if bytes_written else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Parent side: scales, report and baseline comparison
+# ---------------------------------------------------------------------------
+
+
+def _child_argv(
+    args: argparse.Namespace,
+    output_dir: Path,
+    report: Path,
+    scale_factor: Optional[float],
+) -> List[str]:
+    argv = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--child-output",
+        str(output_dir),
+        "--child-report",
+        str(report),
+        "--seed",
+        str(args.seed),
+        "--engine",
+        args.engine,
+        "--block-rides",
+        str(args.block_rides),
+        "--workers",
+        str(args.workers),
+        "--format",
+        args.format,
+        "--t2-dimensions",
+        args.t2_dimensions,
+        "--csv-compression",
+        args.csv_compression,
+        "--compression-threads",
+        str(args.compression_threads),
+        "--pipeline-depth",
+        str(args.pipeline_depth),
+        "--flush-rows",
+        str(args.flush_rows),
+        "--random-streams",
+        args.random_streams,
+    ]
+    if scale_factor is not None:
+        argv += ["--child-scale-factor", str(scale_factor)]
+    return argv
+
+
+def _runs(
+    args: argparse.Namespace,
+) -> List[Tuple[str, Dict[str, str], Optional[float]]]:
+    """(label, environment overrides, scale factor) of every run."""
+    if args.scale_factor:
+        return [(f"SF={sf:g}", {}, sf) for sf in args.scale_factor]
+    return [
+        (
+            f"T1={t1_rides} T2={t2_rides}",
+            {"RAILGEN_T1_RIDES": str(t1_rides), "RAILGEN_T2_RIDES": str(t2_rides)},
+            None,
+        )
+        for t1_rides, t2_rides in args.scale
+    ]
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    work_root = Path(args.work_dir) if args.work_dir else None
+    if work_root is not None:
+        work_root.mkdir(parents=True, exist_ok=True)
+    results = []
+    for label, overrides, scale_factor in _runs(args):
+        scratch = Path(tempfile.mkdtemp(prefix="railgen-bench-", dir=work_root))
+        try:
+            output_dir = scratch / "output"
+            report = scratch / "scale.json"
+            env = dict(os.environ, **overrides)
+            subprocess.run(
+                _child_argv(args, output_dir, report, scale_factor),
+                env=env,
+                check=True,
+                cwd=Path(__file__).resolve().parent,
+            )
+            result = json.loads(report.read_text(encoding="utf-8"))
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        results.append(result)
+        print(
+            f"{label}: {result['wall_seconds']:.2f}s, "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB, "
+            f"{result['bytes_written'] / (1 << 20):.1f} MB written "
+            f"(ratio {result['compression_ratio']:.2f})"
+        )
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "engine": args.engine,
+        "workers": args.workers,
+        "format": args.format,
+        "csv_compression": args.csv_compression,
+        "pipeline_depth": args.pipeline_depth,
+        "flush_rows": args.flush_rows,
+        "random_streams": args.random_streams,
+        "t2_dimensions": args.t2_dimensions,
+        "seed": args.seed,
+        "scales": results,
+    }
+
+
+def compare(
+    report: Dict[str, object],
+    baseline: Dict[str, object],
+    tolerance: float,
+    min_seconds: float,
+) -> List[str]:
+    """Regressions of ``report`` against ``baseline``, as readable lines.
+
+    Stage and hot-path timings regress when they exceed the baseline by more
+    than ``tolerance`` (relative) and ``min_seconds`` (absolute, to ignore
+    noise on tiny stages); peak RSS only by the relative tolerance.
+    """
+    regressions = []
+    baseline_scales = {
+        (scale["t1_rides"], scale["t2_rides"]): scale for scale in baseline["scales"]
+    }
+    for scale in report["scales"]:
+        key = (scale["t1_rides"], scale["t2_rides"])
+        reference = baseline_scales.get(key)
+        if reference is None:
+            continue
+        label = f"T1={key[0]} T2={key[1]}"
+        timings = [("wall", scale["wall_seconds"], reference["wall_seconds"])]
+        timings += [
+            (f"stage {name}", seconds, reference["stages"].get(name))
+            for name, seconds in scale["stages"].items()
+        ]
+        timings += [
+            (
+                f"hot path {name}",
+                entry["seconds"],
+                reference["hot_paths"].get(name, {}).get("seconds"),
+            )
+            for name, entry in scale["hot_paths"].items()
+        ]
+        for name, current, previous in timings:
+            if previous is None:
+                continue
+            if (
+                current > previous * (1 + tolerance)
+                and current - previous > min_seconds
+            ):
+                regressions.append(
+                    f"{label}: {name} {current:.3f}s vs baseline {previous:.3f}s "
+                    f"(+{(current / previous - 1) * 100:.0f}%)"
+                )
+        if scale["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: peak RSS {scale['peak_rss_mb']:.0f} MB vs baseline "
+                f"{reference['peak_rss_mb']:.0f} MB"
+            )
+    return regressions
+
+
+def check_flat_rss(report: Dict[str, object], tolerance: float) -> List[str]:
+    """Scales whose peak RSS exceeds the smallest scale's by ``tolerance``.
+
+    Fact rows are generated and written block by block, so peak memory must
+    not grow with the number of rides; only dimensions scale with the data.
+    """
+    scales = sorted(report["scales"], key=lambda scale: scale["t1_rides"])
+    if len(scales) < 2:
+        return []
+    smallest = scales[0]
+    limit = smallest["peak_rss_mb"] * (1 + tolerance)
+    return [
+        f"T1={scale['t1_rides']} T2={scale['t2_rides']}: peak RSS "
+        f"{scale['peak_rss_mb']:.0f} MB vs {smallest['peak_rss_mb']:.0f} MB at "
+        f"T1={smallest['t1_rides']} T2={smallest['t2_rides']}"
+        for scale in scales[1:]
+        if scale["peak_rss_mb"] > limit
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    from compressed import CSV_CODECS
+    from config import _env_int
+    from main import FACT_ENGINES, T2_DIMENSION_MODES
+    from output import FLUSH_ROWS, OUTPUT_FORMATS
+    from streams import RANDOM_STREAM_MODES
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generator at several snapshot sizes."
+    )
+    parser.add_argument(
+        "--scale",
+        nargs="+",
+        type=_parse_scale,
+        default=[_parse_scale(scale) for scale in DEFAULT_SCALES],
+        help="T1_RIDES[:T2_RIDES] per run (default: %s)" % " ".join(DEFAULT_SCALES),
+    )
+    parser.add_argument(
+        "--scale-factor",
+        nargs="+",
+        type=float,
+        help="scale factors per run instead of --scale (rides and dimensions grow "
+        "together)",
+    )
+    parser.add_argument(
+        "--flat-rss",
+        type=float,
+        metavar="TOLERANCE",
+        help="exit with status 1 when a scale's peak RSS exceeds the smallest "
+        "scale's by more than this relative tolerance",
+    )
+    parser.add_argument("--report", default="benchmark.json", help="JSON report path")
+    parser.add_argument(
+        "--baseline", help="baseline report; regressions exit with status 1"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the report to --baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.getenv("RAILGEN_BENCH_TOLERANCE", "0.25")),
+        help="allowed relative slowdown before a timing counts as a regression",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.05,
+        help="ignore timing differences below this many seconds",
+    )
+    parser.add_argument("--work-dir", help="scratch directory for generated output")
+    parser.add_argument("--seed", type=int, default=_env_int("RAILGEN_SEED", 42))
+    parser.add_argument(
+        "--engine", choices=FACT_ENGINES, default=os.getenv("RAILGEN_ENGINE", "batch")
+    )
+    parser.add_argument(
+        "--block-rides", type=int, default=_env_int("RAILGEN_BLOCK_RIDES", 4096)
+    )
+    parser.add_argument("--workers", type=int, default=_env_int("RAILGEN_WORKERS", 1))
+    parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default=os.getenv("RAILGEN_FORMAT", "csv")
+    )
+    parser.add_argument(
+        "--csv-compression",
+        choices=CSV_CODECS,
+        default=os.getenv("RAILGEN_CSV_COMPRESSION", "none"),
+    )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=_env_int("RAILGEN_COMPRESSION_THREADS", 2),
+    )
+    parser.add_argument(
+        "--pipeline-depth", type=int, default=_env_int("RAILGEN_PIPELINE_DEPTH", 0)
+    )
+    parser.add_argument(
+        "--flush-rows",
+        type=int,
+        default=_env_int("RAILGEN_FLUSH_ROWS", FLUSH_ROWS),
+        help="rows buffered per CSV fact file before they are written",
+    )
+    parser.add_argument(
+        "--random-streams",
+        choices=RANDOM_STREAM_MODES,
+        default=os.getenv("RAILGEN_RANDOM_STREAMS", "sequential"),
+    )
+    parser.add_argument(
+        "--t2-dimensions",
+        choices=T2_DIMENSION_MODES,
+        default=os.getenv("RAILGEN_T2_DIMENSIONS", "full"),
+    )
+    parser.add_argument("--child-output", help=argparse.SUPPRESS)
+    parser.add_argument("--child-report", help=argparse.SUPPRESS)
+    parser.add_argument("--child-scale-factor", type=float, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    if args.child_output:
+        result = run_scale(args, Path(args.child_output))
+        Path(args.child_report).write_text(json.dumps(result), encoding="utf-8")
+        return
+
+    report = run_benchmark(args)
+    Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Report written to {args.report}")
+    if args.flat_rss is not None:
+        growth = check_flat_rss(report, args.flat_rss)
+        if growth:
+            print("Peak RSS grows with the scale:", file=sys.stderr)
+            for line in growth:
+                print(f"  {line}", file=sys.stderr)
+            raise SystemExit(1)
+        print("Peak RSS is flat across scales")
+    if not args.baseline:
+        return
+    baseline_path = Path(args.baseline)
+    if args.update_baseline or not baseline_path.exists():
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline written to {baseline_path}")
+        return
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(report, baseline, args.tolerance, args.min_seconds)
+    if regressions:
+        print("Performance regressions against the baseline:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        raise SystemExit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
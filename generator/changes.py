@@ -0,0 +1,66 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# ---------------------------------------------------------------------------
+# Dimension change tracking
+# T2 mutations are recorded so delta output ships only the changed rows.
+# ---------------------------------------------------------------------------
+
+DIMENSION_TABLES = ("Pociag", "Maszynista", "Przejazd", "Zdarzenie", "Stacja")
+
+INSERT_SUFFIX = ".insert"
+UPDATE_SUFFIX = ".update"
+SCD2_SUFFIX = ".scd2"
+
+
+class DimensionChangeLog:
+    """Ids inserted into, and rows updated in, each dimension table.
+
+    For updates the row as it was before the first change is kept, which is
+    what a type 2 consumer needs to close the old version. A row inserted
+    and later updated within the same period stays a plain insert.
+    """
+
+    def __init__(self) -> None:
+        self._inserted: Dict[str, List[int]] = defaultdict(list)
+        self._inserted_ids: Dict[str, set] = defaultdict(set)
+        self._updated: Dict[str, Dict[int, tuple]] = defaultdict(dict)
+
+    def record_insert(self, table: str, row_id: int) -> None:
+        if row_id not in self._inserted_ids[table]:
+            self._inserted_ids[table].add(row_id)
+            self._inserted[table].append(row_id)
+
+    def record_update(self, table: str, row_id: int, before: tuple) -> None:
+        if row_id in self._inserted_ids[table]:
+            return
+        self._updated[table].setdefault(row_id, before)
+
+    def inserts(self, table: str) -> List[int]:
+        return sorted(self._inserted.get(table, ()))
+
+    def updates(self, table: str) -> Dict[int, tuple]:
+        """Updated ids mapped to their row before the change, by id."""
+        updated = self._updated.get(table, {})
+        return {row_id: updated[row_id] for row_id in sorted(updated)}
+
+    def scd2_rows(
+        self, table: str, current: Dict[int, tuple]
+    ) -> List[Tuple[object, ...]]:
+        """Type 2 records: closed old versions (0) and current versions (1).
+
+        ``current`` maps ids to the rows as they are now; inserted rows only
+        get a current version.
+        """
+        rows = []
+        for row_id, before in self.updates(table).items():
+            rows.append((*before, 0))
+            rows.append((*current[row_id], 1))
+        for row_id in self.inserts(table):
+            rows.append((*current[row_id], 1))
+        return rows
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._inserted.values()) + sum(
+            len(rows) for rows in self._updated.values()
+        )
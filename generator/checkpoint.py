@@ -0,0 +1,105 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# ---------------------------------------------------------------------------
+# Checkpoints
+# Resuming truncates the fact files to the last checkpoint and restores
+# the generator state, so the output equals an uninterrupted run.
+# ---------------------------------------------------------------------------
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class Checkpointer:
+    """Progress file of one generator run.
+
+    ``fingerprint`` holds every setting that influences the output; a saved
+    checkpoint is only adopted when it was written with the same one.
+    """
+
+    def __init__(
+        self, path: Path, fingerprint: Dict[str, object], every_rides: int
+    ) -> None:
+        self.path = path
+        # Round-tripped so it compares equal to a fingerprint read back.
+        self.fingerprint = json.loads(json.dumps(fingerprint))
+        self.every_rides = every_rides
+        self.state: Dict[str, object] = {
+            "fingerprint": self.fingerprint,
+            "completed": {},
+            "current": None,
+        }
+        self._last_rides = 0
+
+    def load(self) -> bool:
+        """Adopt the saved checkpoint; False when there is none."""
+        if not self.path.exists():
+            return False
+        saved = json.loads(self.path.read_text(encoding="utf-8"))
+        if saved.get("fingerprint") != self.fingerprint:
+            raise ValueError(
+                f"{self.path} was written with different settings; rerun with "
+                "those settings or delete it to start over"
+            )
+        self.state = saved
+        return True
+
+    def completed(self, snapshot: str) -> Optional[Dict[str, object]]:
+        """Generator state after the facts of ``snapshot``, if they are done."""
+        return self.state["completed"].get(snapshot)
+
+    def progress(self, snapshot: str) -> Optional[Dict[str, object]]:
+        """The last checkpoint inside ``snapshot``, if any."""
+        current = self.state["current"]
+        if current is not None and current["snapshot"] == snapshot:
+            return current
+        return None
+
+    def start_snapshot(self, rides_done: int = 0) -> None:
+        self._last_rides = rides_done
+
+    def due(self, rides_done: int) -> bool:
+        return (
+            self.every_rides > 0 and rides_done - self._last_rides >= self.every_rides
+        )
+
+    def save_progress(
+        self,
+        snapshot: str,
+        rides_done: int,
+        files: Dict[str, int],
+        **state: object,
+    ) -> None:
+        self.state["current"] = {
+            "snapshot": snapshot,
+            "rides_done": rides_done,
+            "files": files,
+            **state,
+        }
+        self._last_rides = rides_done
+        self._write()
+
+    def save_completed(self, snapshot: str, generator: Dict[str, object]) -> None:
+        self.state["completed"][snapshot] = generator
+        self.state["current"] = None
+        self._write()
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def _write(self) -> None:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as handle:
+            json.dump(self.state, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self.path)
+
+
+def truncate_files(directory: Path, sizes: Dict[str, int]) -> None:
+    """Cut files back to the sizes recorded by a checkpoint."""
+    for name, size in sizes.items():
+        with (directory / name).open("r+b") as handle:
+            handle.truncate(size)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Integer epoch time
+# ---------------------------------------------------------------------------
+
+EPOCH = datetime(1970, 1, 1)
+HOUR = 3600
+DAY = 24 * HOUR
+MINUTE = 60
+
+
+def to_epoch(moment: datetime) -> int:
+    return int((moment - EPOCH).total_seconds())
+
+
+class CalendarIndex:
+    """Calendar fields per hour from the day of ``start`` through ``end``."""
+
+    def __init__(self, start: datetime, end: datetime) -> None:
+        first = to_epoch(start)
+        self.origin = first - first % DAY
+        self.hours = (to_epoch(end) - self.origin) // HOUR + 1
+        stamps = (self.origin + np.arange(self.hours, dtype=np.int64) * HOUR).astype(
+            "datetime64[s]"
+        )
+        days = stamps.astype("datetime64[D]").astype(np.int64)
+        self.hour = np.arange(self.hours, dtype=np.int64) % 24
+        self.weekday = (days + 3) % 7
+        self.year = stamps.astype("datetime64[Y]").astype(np.int64) + 1970
+        self.month = stamps.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        self._fields = list(
+            zip(self.hour.tolist(), self.weekday.tolist(), self.year.tolist())
+        )
+
+    def bucket(self, seconds: np.ndarray) -> np.ndarray:
+        return (seconds - self.origin) // HOUR
+
+    def fields(self, seconds: int) -> Tuple[int, int, int]:
+        """Hour of day, weekday (Monday is 0) and year of one timestamp."""
+        return self._fields[(seconds - self.origin) // HOUR]
@@ -0,0 +1,412 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from batch_engine import FactBlock
+from config import PRECIPITATION_TYPES
+from output import (
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+    OutputOptions,
+)
+
+# ---------------------------------------------------------------------------
+# Parquet / Arrow IPC output
+# pyarrow is imported on first use, so CSV runs never need it.
+# ---------------------------------------------------------------------------
+
+_pa = None
+
+
+def _pyarrow():
+    global _pa
+    if _pa is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as exc:
+            raise RuntimeError(
+                "Parquet/Arrow output requires pyarrow; install it with "
+                "`uv sync --extra columnar` or use --format csv"
+            ) from exc
+        _pa = pyarrow
+    return _pa
+
+
+def _labels():
+    pa = _pyarrow()
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def table_schema(table: str, event_ids: bool = True):
+    """Arrow schema of one dimension or fact table, matching ``00-schema.sql``."""
+    pa = _pyarrow()
+    int32, int64, text = pa.int32(), pa.int64(), pa.string()
+    stamp = pa.timestamp("s")
+    fields: Dict[str, List] = {
+        "Stacja": [("id", int32), ("nazwa", text), ("miasto", text)],
+        "Przejazd": [
+            ("id", int32),
+            ("czy_rogatki", pa.bool_()),
+            ("czy_sygnalizacja_swietlna", pa.bool_()),
+            ("czy_oswietlony", pa.bool_()),
+            ("dopuszczalna_predkosc", int32),
+        ],
+        "Pociag": [
+            ("id", int32),
+            ("nazwa", text),
+            ("typ_pociagu", _labels()),
+            ("operator", _labels()),
+        ],
+        "Maszynista": [
+            ("id", int32),
+            ("imie", _labels()),
+            ("nazwisko", text),
+            ("pesel", text),
+            ("plec", _labels()),
+            ("wiek", int32),
+            ("rok_zatrudnienia", int32),
+        ],
+        "Zdarzenie": [
+            ("id", int32),
+            ("typ_zdarzenia", _labels()),
+            ("kategoria", text),
+            ("skala_niebezpieczenstwa", int32),
+        ],
+        RIDE_TABLE: [
+            ("id", int32),
+            ("nazwa_trasy", _labels()),
+            ("roznica_czasu", int32),
+            ("planowa_data_odjazdu", stamp),
+            ("planowa_data_przyjazdu", stamp),
+            ("pociag_id", int32),
+            ("maszynista_id", int32),
+        ],
+        SECTION_TABLE: [
+            ("id", int64),
+            ("kurs_id", int32),
+            ("numer_etapu_kursu", int32),
+            ("stacja_wyjazdowa_id", int32),
+            ("stacja_wjazdowa_id", int32),
+            ("roznica_czasu", int32),
+            ("planowa_data_przyjazdu", stamp),
+            ("planowa_data_odjazdu", stamp),
+        ],
+        EVENT_TABLE: [
+            ("id", int64),
+            ("odcinek_kursu_id", int64),
+            ("przejazd_id", int32),
+            ("zdarzenie_id", int32),
+            ("wywolane_opoznienie", int32),
+            ("liczba_rannych", int32),
+            ("liczba_zgonow", int32),
+            ("koszt_naprawy", pa.decimal128(10, 2)),
+            ("czy_interwencja_sluzb", pa.bool_()),
+            ("data", stamp),
+            ("predkosc", int32),
+        ],
+        WEATHER_TABLE: [
+            ("id_odcinka", int64),
+            ("data_pomiaru", stamp),
+            ("temperatura", pa.decimal128(4, 1)),
+            ("ilosc_opadow", pa.decimal128(4, 1)),
+            ("typ_opadow", _labels()),
+        ],
+    }
+    columns = fields[table]
+    if table == EVENT_TABLE and not event_ids:
+        columns = columns[1:]
+    return pa.schema(
+        [pa.field(name, kind, nullable=name == "przejazd_id") for name, kind in columns]
+    )
+
+
+def _decimal(values: np.ndarray, kind):
+    """Exact ``decimal128`` column from floats, rounded to the type's scale."""
+    pa = _pyarrow()
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * 10**kind.scale).astype(
+        np.int64
+    )
+    # decimal128 is a little-endian two's complement pair of int64 words.
+    words = np.empty((len(scaled), 2), dtype=np.int64)
+    words[:, 0] = scaled
+    words[:, 1] = scaled >> 63
+    return pa.Array.from_buffers(kind, len(scaled), [None, pa.py_buffer(words)])
+
+
+def _dictionary(codes: np.ndarray, labels):
+    pa = _pyarrow()
+    return pa.DictionaryArray.from_arrays(
+        pa.array(np.asarray(codes, dtype=np.int32)), labels
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table writers
+# ---------------------------------------------------------------------------
+
+
+class ColumnarTableWriter:
+    """Streams record batches of one table into a Parquet or Arrow file."""
+
+    def __init__(self, path: Path, schema, options: OutputOptions) -> None:
+        pa = _pyarrow()
+        self.schema = schema
+        self.row_group_rows = options.row_group_rows
+        self.rows_written = 0
+        self._pending: List = []
+        self._pending_rows = 0
+        compression = options.columnar_compression
+        if options.format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(
+                str(path),
+                schema,
+                compression=compression or "none",
+                use_dictionary=[
+                    field.name for field in schema if pa.types.is_dictionary(field.type)
+                ],
+            )
+        else:
+            self._writer = pa.ipc.new_file(
+                str(path),
+                schema,
+                options=pa.ipc.IpcWriteOptions(compression=compression),
+            )
+
+    def write_arrays(self, arrays: Sequence) -> None:
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_arrays(list(arrays), schema=self.schema)
+        self.write_batch(batch)
+
+    def write_batch(self, batch) -> None:
+        if not batch.num_rows:
+            return
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        while self._pending_rows >= self.row_group_rows:
+            self._write_group(self.row_group_rows)
+
+    def flush(self) -> None:
+        if self._pending_rows:
+            self._write_group(self._pending_rows)
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+
+    def _write_group(self, rows: int) -> None:
+        pa = _pyarrow()
+        table = pa.Table.from_batches(self._pending, schema=self.schema)
+        group, rest = table.slice(0, rows), table.slice(rows)
+        if isinstance(self._writer, pa.parquet.ParquetWriter):
+            self._writer.write_table(group, row_group_size=rows)
+        else:
+            self._writer.write_batch(group.combine_chunks().to_batches()[0])
+        self.rows_written += rows
+        self._pending = rest.to_batches()
+        self._pending_rows = rest.num_rows
+
+
+def write_table(
+    path: Path,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence],
+    options: OutputOptions,
+) -> None:
+    """Write a small in-memory (dimension) table given as row tuples.
+
+    Columns beyond the table's schema (the ``czy_aktualne`` flag of type 2
+    change sets) are written as booleans.
+    """
+    pa = _pyarrow()
+    schema = table_schema(table)
+    for name in columns[len(schema) :]:
+        schema = schema.append(pa.field(name, pa.bool_(), nullable=False))
+    values_by_column = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, values_by_column):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values).cast(field.type))
+    writer = ColumnarTableWriter(path, schema, options)
+    writer.write_arrays(arrays)
+    writer.close()
+
+
+class ColumnarFactWriters:
+    """Parquet/Arrow counterpart of :class:`output.FactWriters`."""
+
+    def __init__(
+        self,
+        directory: Path,
+        options: OutputOptions,
+        event_ids: bool = True,
+        suffix: str = "",
+    ) -> None:
+        self.event_ids = event_ids
+
+        def _open(table: str) -> ColumnarTableWriter:
+            path = directory / f"{table}{suffix}{options.extension}"
+            return ColumnarTableWriter(path, table_schema(table, event_ids), options)
+
+        self.ride = _open(RIDE_TABLE)
+        self.section = _open(SECTION_TABLE)
+        self.event = _open(EVENT_TABLE)
+        self.weather = _open(WEATHER_TABLE)
+
+        pa = _pyarrow()
+        self.precipitation_labels = pa.array(PRECIPITATION_TYPES, type=pa.string())
+        self._route_labels = None
+        self._route_names: Optional[np.ndarray] = None
+
+    def __enter__(self) -> "ColumnarFactWriters":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        for writer in (self.ride, self.section, self.event, self.weather):
+            writer.flush()
+
+    def close(self) -> None:
+        for writer in (self.ride, self.section, self.event, self.weather):
+            writer.close()
+
+    def write_block(self, block: FactBlock, route_names: np.ndarray) -> None:
+        pa = _pyarrow()
+        if self._route_names is not route_names:
+            self._route_names = route_names
+            self._route_labels = pa.array(route_names.tolist(), type=pa.string())
+        stamp = pa.timestamp("s")
+        int32, int64 = pa.int32(), pa.int64()
+
+        def ints(values: np.ndarray, kind=int32):
+            return pa.array(values, type=kind)
+
+        section_departure = pa.array(block.section_departure, type=stamp)
+        self.ride.write_arrays(
+            [
+                ints(block.ride_id),
+                _dictionary(block.ride_route, self._route_labels),
+                ints(block.ride_delay),
+                pa.array(block.ride_departure, type=stamp),
+                pa.array(block.ride_arrival, type=stamp),
+                ints(block.ride_train_id),
+                ints(block.ride_driver_id),
+            ]
+        )
+        self.section.write_arrays(
+            [
+                ints(block.section_id, int64),
+                ints(block.section_ride_id),
+                ints(block.section_number),
+                ints(block.section_departure_station),
+                ints(block.section_arrival_station),
+                ints(block.section_delay),
+                pa.array(block.section_arrival, type=stamp),
+                section_departure,
+            ]
+        )
+        weather_schema = self.weather.schema
+        self.weather.write_arrays(
+            [
+                ints(block.section_id, int64),
+                section_departure,
+                _decimal(
+                    block.weather_temperature,
+                    weather_schema.field("temperatura").type,
+                ),
+                _decimal(
+                    block.weather_precipitation,
+                    weather_schema.field("ilosc_opadow").type,
+                ),
+                _dictionary(block.weather_type, self.precipitation_labels),
+            ]
+        )
+        crossing = block.event_crossing_id
+        event_arrays = [
+            ints(block.event_section_id, int64),
+            pa.array(crossing, type=int32, mask=crossing <= 0),
+            ints(block.event_definition_id),
+            ints(block.event_delay),
+            ints(block.event_injured),
+            ints(block.event_deaths),
+            _decimal(
+                block.event_repair_cost,
+                self.event.schema.field("koszt_naprawy").type,
+            ),
+            pa.array(block.event_emergency, type=pa.bool_()),
+            pa.array(block.event_time, type=stamp),
+            ints(block.event_speed),
+        ]
+        if self.event_ids:
+            event_arrays.insert(0, ints(block.event_id, int64))
+        self.event.write_arrays(event_arrays)
+
+
+# ---------------------------------------------------------------------------
+# Shard merging
+# ---------------------------------------------------------------------------
+
+
+def _read_batches(path: Path, options: OutputOptions):
+    pa = _pyarrow()
+    if options.format == "parquet":
+        parquet = pa.parquet.ParquetFile(str(path))
+        yield from parquet.iter_batches(batch_size=options.row_group_rows)
+        return
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+
+
+def merge_parts(
+    snapshot_dir: Path,
+    part_dir: Path,
+    shard_count: int,
+    first_event_id: int,
+    options: OutputOptions,
+    event_offsets: Optional[List[int]] = None,
+) -> None:
+    """Stream shard part files into the final tables, numbering events.
+
+    Parts are re-read one record batch at a time, so merging keeps the same
+    row-group bound as generation.  Parts that carry event ids (month
+    partitions) get ``event_offsets[shard]`` added instead; shards without
+    rows in a partition have no part files.
+    """
+    pa = _pyarrow()
+    for table in (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, EVENT_TABLE):
+        schema = table_schema(table)
+        writer = ColumnarTableWriter(
+            snapshot_dir / f"{table}{options.extension}", schema, options
+        )
+        next_id = first_event_id
+        for index in range(shard_count):
+            part = part_dir / f"{table}.{index:04d}{options.extension}"
+            if not part.exists():
+                continue
+            for batch in _read_batches(part, options):
+                columns = list(batch.columns)
+                if table == EVENT_TABLE and event_offsets is not None:
+                    ids = columns[0].to_numpy() + event_offsets[index]
+                    columns[0] = pa.array(ids.astype(np.int64))
+                elif table == EVENT_TABLE:
+                    ids = np.arange(next_id, next_id + batch.num_rows, dtype=np.int64)
+                    columns.insert(0, pa.array(ids))
+                    next_id += batch.num_rows
+                writer.write_arrays(
+                    [column.cast(field.type) for column, field in zip(columns, schema)]
+                )
+        writer.close()
@@ -0,0 +1,246 @@
+import gzip
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Deque, Dict, List, Optional, Tuple
+
+from instrumentation import INSTRUMENTATION
+
+# ---------------------------------------------------------------------------
+# Block-compressed CSV streams
+# Every block is a complete gzip member / zstd frame, compressed on a
+# shared thread pool and written in order.
+# ---------------------------------------------------------------------------
+
+CSV_CODECS = ("none", "gzip", "zstd")
+CSV_EXTENSIONS = {"none": ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+BLOCK_BYTES = 4 << 20
+
+_zstd = None
+_pools: Dict[Tuple[int, int], ThreadPoolExecutor] = {}
+
+
+def _zstd_module():
+    """``compression.zstd`` (Python 3.14+), else the ``zstandard`` package."""
+    global _zstd
+    if _zstd is None:
+        try:
+            from compression import zstd
+        except ImportError:
+            try:
+                import zstandard as zstd
+            except ImportError as exc:
+                raise RuntimeError(
+                    "zstd output requires Python 3.14 or the zstandard package; "
+                    "install it with `uv add zstandard` or use --csv-compression gzip"
+                ) from exc
+        _zstd = zstd
+    return _zstd
+
+
+def _shared_pool(threads: int) -> ThreadPoolExecutor:
+    # Keyed by pid as well: a pool inherited through fork has no live threads.
+    key = (os.getpid(), threads)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="railgen-compress"
+        )
+    return pool
+
+
+def compress_block(codec: str, level: int, data: bytes) -> bytes:
+    """One self-contained gzip member or zstd frame."""
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return _zstd_module().compress(data, level=level)
+
+
+def _timed_compress(codec: str, level: int, data: bytes) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    block = compress_block(codec, level, data)
+    return block, time.perf_counter() - started
+
+
+def csv_codec(path: Path) -> str:
+    """Codec of a CSV table file, from its extension."""
+    for codec in ("gzip", "zstd"):
+        if path.name.endswith(CSV_EXTENSIONS[codec]):
+            return codec
+    return "none"
+
+
+def is_csv(path: Path) -> bool:
+    return any(path.name.endswith(extension) for extension in CSV_EXTENSIONS.values())
+
+
+def csv_path(directory: Path, name: str) -> Path:
+    """The existing CSV file of a table in any codec (plain ``.csv`` if none)."""
+    for extension in CSV_EXTENSIONS.values():
+        path = directory / f"{name}{extension}"
+        if path.exists():
+            return path
+    return directory / f"{name}.csv"
+
+
+def snapshot_format(directory: Path) -> str:
+    """``csv``, or the format of a Parquet, Arrow or native (bcp) snapshot.
+
+    Readers that only handle CSV check this first: a snapshot without
+    ``.csv`` tables otherwise looks like a delta snapshot with missing files.
+    """
+    for extension in (".parquet", ".arrow", ".bcp"):
+        if next(directory.glob(f"*{extension}"), None) is not None:
+            return extension[1:]
+    return "csv"
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+class BlockCompressedWriter(io.RawIOBase):
+    """Binary file writer compressing fixed-size blocks on the shared pool.
+
+    ``flush`` ends the current block early and waits for all pending blocks,
+    so the file is a complete stream afterwards; regular writers only flush
+    on close.  Byte counts and compression time are added to the
+    ``compression_*`` instrumentation counters when the file is closed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        codec: str,
+        append: bool = False,
+        threads: int = 2,
+        level: Optional[int] = None,
+        block_bytes: int = BLOCK_BYTES,
+    ) -> None:
+        super().__init__()
+        if codec not in DEFAULT_LEVELS:
+            raise ValueError(f"Unknown CSV compression codec: {codec}")
+        if threads <= 0:
+            raise ValueError("Compression threads must be positive")
+        if codec == "zstd":
+            _zstd_module()
+        self.codec = codec
+        self.level = DEFAULT_LEVELS[codec] if level is None else level
+        self.block_bytes = block_bytes
+        self._raw = path.open("ab" if append else "wb")
+        self._pool = _shared_pool(threads)
+        self._max_pending = 2 * threads
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._pending: Deque[Future] = deque()
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.compress_seconds = 0.0
+
+    def writable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._raw.fileno()
+
+    def write(self, data) -> int:
+        size = len(data)
+        self._buffer.append(bytes(data))
+        self._buffered += size
+        if self._buffered >= self.block_bytes:
+            self._submit()
+        return size
+
+    def flush(self) -> None:
+        if self.closed:
+            return
+        self._submit()
+        while self._pending:
+            self._write_next()
+        self._raw.flush()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            super().close()  # flushes
+        finally:
+            self._raw.close()
+        INSTRUMENTATION.count("compression_input_bytes", self.input_bytes)
+        INSTRUMENTATION.count("compression_output_bytes", self.output_bytes)
+        INSTRUMENTATION.count(
+            "compression_microseconds", round(self.compress_seconds * 1e6)
+        )
+
+    def _submit(self) -> None:
+        if not self._buffered:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self.input_bytes += len(data)
+        self._pending.append(
+            self._pool.submit(_timed_compress, self.codec, self.level, data)
+        )
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        block, seconds = self._pending.popleft().result()
+        self._raw.write(block)
+        self.output_bytes += len(block)
+        self.compress_seconds += seconds
+
+
+def open_csv_writer(
+    path: Path, codec: str = "none", append: bool = False, threads: int = 2
+) -> IO[str]:
+    """Text handle for writing a CSV table, compressed by ``codec``."""
+    if codec == "none":
+        return path.open("a" if append else "w", newline="", encoding="utf-8")
+    return io.TextIOWrapper(
+        BlockCompressedWriter(path, codec, append=append, threads=threads),
+        encoding="utf-8",
+        newline="",
+    )
+
+
+def open_binary_writer(
+    path: Path, codec: str = "none", append: bool = False, threads: int = 2
+) -> IO[bytes]:
+    if codec == "none":
+        return path.open("ab" if append else "wb")
+    return BlockCompressedWriter(path, codec, append=append, threads=threads)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+def open_binary_reader(path: Path) -> IO[bytes]:
+    """Streaming binary reader over all members / frames of a table file."""
+    codec = csv_codec(path)
+    if codec == "none":
+        return path.open("rb", buffering=1 << 20)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    zstd = _zstd_module()
+    if zstd.__name__ == "zstandard":
+        reader = zstd.ZstdDecompressor().stream_reader(
+            path.open("rb"), read_across_frames=True
+        )
+        return io.BufferedReader(reader, buffer_size=1 << 20)
+    return zstd.open(path, "rb")
+
+
+def open_csv_reader(path: Path) -> IO[str]:
+    """Streaming text reader of a CSV table in any codec (for ``csv.reader``)."""
+    if csv_codec(path) == "none":
+        return path.open(newline="", encoding="utf-8", buffering=1 << 20)
+    return io.TextIOWrapper(open_binary_reader(path), encoding="utf-8", newline="")
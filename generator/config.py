@@ -0,0 +1,205 @@
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+# ---------------------------------------------------------------------------
+# Configuration structures
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class StationMeta:
+    station_id: int
+    name: str
+    city: str
+    voivodeship: str
+    region: str
+
+
+@dataclass(frozen=True, slots=True)
+class CrossingMeta:
+    crossing_id: int
+    has_barriers: bool
+    has_light_signals: bool
+    is_lit: bool
+    speed_limit: int
+    region: str
+    is_old: bool
+    upgrade_target: Optional[int]
+
+
+@dataclass(frozen=True)
+class RouteTemplate:
+    name: str
+    station_ids: Sequence[int]
+    section_minutes: Sequence[int]
+
+
+@dataclass(frozen=True)
+class SnapshotConfig:
+    name: str
+    start: datetime
+    end: datetime
+    ride_count: int
+    base_event_rate: float
+
+
+# ---------------------------------------------------------------------------
+# Constants aligned with the business specification
+# ---------------------------------------------------------------------------
+
+VOIVODESHIPS = [
+    "Dolnośląskie",
+    "Kujawsko-Pomorskie",
+    "Lubelskie",
+    "Lubuskie",
+    "Łódzkie",
+    "Małopolskie",
+    "Mazowieckie",
+    "Opolskie",
+    "Podkarpackie",
+    "Podlaskie",
+    "Pomorskie",
+    "Śląskie",
+    "Świętokrzyskie",
+    "Warmińsko-Mazurskie",
+    "Wielkopolskie",
+    "Zachodniopomorskie",
+]
+
+COASTAL = {"Pomorskie", "Zachodniopomorskie"}
+MOUNTAIN = {"Małopolskie", "Podkarpackie", "Śląskie"}
+
+REGIONS = ("central", "coastal", "mountain")
+REGION_CODES = {name: code for code, name in enumerate(REGIONS)}
+REGION_TEMPERATURE_OFFSET = {"coastal": 1.5, "mountain": -3.0, "central": 0.0}
+
+MONTH_MEAN_TEMPERATURE = {
+    1: -2.0,
+    2: 0.0,
+    3: 4.0,
+    4: 10.0,
+    5: 16.0,
+    6: 19.0,
+    7: 21.0,
+    8: 20.0,
+    9: 15.0,
+    10: 9.0,
+    11: 3.0,
+    12: -1.0,
+}
+
+PRECIPITATION_TYPES = ("brak", "deszcz", "snieg", "grad")
+
+EVENT_DEFINITIONS = [
+    ("wypadek", "potrącenie pieszego", 9),
+    ("wypadek", "zderzenie z samochodem", 8),
+    ("wypadek", "wykolejenie", 10),
+    ("wypadek", "zderzenie z innym pociągiem", 10),
+    ("incydent", "opóźnienie organizacyjne", 4),
+    ("incydent", "przekroczenie limitu prędkości", 5),
+    ("incydent", "problem z pasażerem", 3),
+    ("awaria", "usterka hamulców", 7),
+    ("awaria", "usterka sygnalizacji", 6),
+    ("awaria", "awaria lokomotywy", 7),
+    ("zdarzenie techniczne", "planowy postój", 2),
+    ("zdarzenie techniczne", "test systemu", 2),
+    ("zdarzenie techniczne", "brak maszynisty", 3),
+]
+
+# Base event type mix; crossing age, snow and cargo operators shift it.
+EVENT_TYPE_WEIGHTS = {
+    "wypadek": 0.06,
+    "incydent": 0.5,
+    "awaria": 0.22,
+    "zdarzenie techniczne": 0.22,
+}
+
+EVENT_DELAY_RANGES: Dict[str, Tuple[float, float]] = {
+    "wypadek": (25, 90),
+    "awaria": (10, 45),
+    "incydent": (5, 25),
+    "zdarzenie techniczne": (2, 12),
+}
+
+EVENT_REPAIR_COST_RANGES: Dict[str, Tuple[float, float]] = {
+    "wypadek": (40_000, 180_000),
+    "awaria": (10_000, 40_000),
+    "incydent": (1_000, 6_000),
+    "zdarzenie techniczne": (500, 3_000),
+}
+
+# Operator mix of the base train fleet.
+OPERATOR_WEIGHTS = {
+    "PKP Intercity": 0.22,
+    "POLREGIO": 0.24,
+    "PKP Cargo": 0.18,
+    "DB Cargo Polska": 0.1,
+    "Koleje Mazowieckie": 0.1,
+    "Koleje Śląskie": 0.08,
+    "Koleje Dolnośląskie": 0.08,
+}
+
+CARGO_OPERATORS = {"PKP Cargo", "DB Cargo Polska"}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        return default
+    return parsed if parsed > 0 else default
+
+
+T1_CONFIG = SnapshotConfig(
+    name="T1",
+    start=datetime(2023, 1, 1, 0, 0, 0),
+    end=datetime(2024, 6, 30, 23, 59, 59),
+    ride_count=_env_int("RAILGEN_T1_RIDES", 50_000),
+    base_event_rate=0.035,
+)
+
+T2_CONFIG = SnapshotConfig(
+    name="T2",
+    start=datetime(2024, 7, 1, 0, 0, 0),
+    end=datetime(2025, 10, 31, 23, 59, 59),
+    ride_count=_env_int("RAILGEN_T2_RIDES", 25_000),
+    base_event_rate=0.033,  # global improvement ~5%
+)
+
+# ---------------------------------------------------------------------------
+# Scale factor
+# Rides and the growing dimensions scale linearly with SF; SF 1 equals the
+# default sizes.
+# ---------------------------------------------------------------------------
+
+SCALE_FACTOR_RIDES = {"T1": 50_000, "T2": 25_000}
+
+# (low, high) draw range at scale factor 1 of each scaled dimension count.
+SCALED_COUNTS: Dict[str, Tuple[int, int]] = {
+    "crossings": (4_500, 5_750),
+    "crossing_upgrades": (320, 520),
+    "trains": (650, 825),
+    "train_switches": (32, 58),
+    "drivers": (2_250, 2_900),
+    "driver_hires": (250, 400),
+}
+
+
+def scaled_snapshot(config: SnapshotConfig, scale_factor: float) -> SnapshotConfig:
+    rides = max(1, round(SCALE_FACTOR_RIDES[config.name] * scale_factor))
+    return replace(config, ride_count=rides)
+
+
+def scaled_count_range(name: str, scale_factor: float) -> Tuple[int, int]:
+    low, high = SCALED_COUNTS[name]
+    return max(1, round(low * scale_factor)), max(1, round(high * scale_factor))
+
+
+UPGRADE_DATE = datetime(2025, 2, 1, 0, 0, 0)
+SWITCH_DATE = datetime(2025, 3, 1, 0, 0, 0)
+EVENT_RATE_IMPROVEMENT_DATE = datetime(2025, 1, 1, 0, 0, 0)
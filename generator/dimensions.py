@@ -0,0 +1,247 @@
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from config import (
+    CARGO_OPERATORS,
+    OPERATOR_WEIGHTS,
+    REGIONS,
+    CrossingMeta,
+    StationMeta,
+)
+
+# ---------------------------------------------------------------------------
+# Columnar dimension storage
+# Typed NumPy columns indexed by the dense row id.
+# ---------------------------------------------------------------------------
+
+OPERATORS = tuple(OPERATOR_WEIGHTS)
+OPERATOR_CODES = {name: code for code, name in enumerate(OPERATORS)}
+POLREGIO = OPERATOR_CODES["POLREGIO"]
+CARGO_CODES = frozenset(OPERATOR_CODES[name] for name in CARGO_OPERATORS)
+
+TRAIN_TYPES = ("passenger", "cargo")
+PASSENGER, CARGO = range(len(TRAIN_TYPES))
+
+GENDERS = ("man", "woman")
+
+# Crossing flag bits.
+BARRIERS = 1
+LIGHT_SIGNALS = 2
+LIT = 4
+OLD = 8
+
+
+class ColumnTable:
+    """Typed columns of one dimension, indexed by dense ids starting at 1.
+
+    Slot 0 of every column is unused, so ``column(name)[row_id]`` needs no
+    id-to-position mapping.  Columns grow by doubling.  ``values`` caches a
+    column as a Python list for row-at-a-time readers; any write drops the
+    cache.
+    """
+
+    COLUMNS: Tuple[Tuple[str, object], ...] = ()
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._size = 1
+        self._columns = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS
+        }
+        self._lists: Dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return self._size - 1
+
+    def __contains__(self, row_id: int) -> bool:
+        return 0 < row_id < self._size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids())
+
+    def ids(self) -> range:
+        return range(1, self._size)
+
+    @property
+    def next_id(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the used part of the columns (object columns count
+        their pointers only)."""
+        return sum(column[: self._size].nbytes for column in self._columns.values())
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][: self._size]
+
+    def values(self, name: str) -> list:
+        cached = self._lists.get(name)
+        if cached is None:
+            cached = self._lists[name] = self.column(name).tolist()
+        return cached
+
+    def append(self, **values: object) -> int:
+        row_id = self._size
+        self._reserve(1)
+        for name, value in values.items():
+            self._columns[name][row_id] = value
+        self._size += 1
+        self._lists.clear()
+        return row_id
+
+    def extend(self, count: int, **columns: object) -> range:
+        """Append ``count`` rows from column arrays; returns their ids."""
+        first = self._size
+        self._reserve(count)
+        for name, values in columns.items():
+            self._columns[name][first : first + count] = values
+        self._size += count
+        self._lists.clear()
+        return range(first, self._size)
+
+    def set(self, row_id: int, name: str, value: object) -> None:
+        self._columns[name][row_id] = value
+        self._lists.pop(name, None)
+
+    def _reserve(self, extra: int) -> None:
+        capacity = len(next(iter(self._columns.values())))
+        needed = self._size + extra
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self._size] = column[: self._size]
+            self._columns[name] = grown
+
+
+class StationTable(ColumnTable):
+    COLUMNS = (
+        ("name", object),
+        ("city", object),
+        ("voivodeship", object),
+        ("region", np.int8),
+    )
+
+    def view(self, station_id: int) -> StationMeta:
+        return StationMeta(
+            station_id=station_id,
+            name=self._columns["name"][station_id],
+            city=self._columns["city"][station_id],
+            voivodeship=self._columns["voivodeship"][station_id],
+            region=REGIONS[self._columns["region"][station_id]],
+        )
+
+    def rows(self) -> Dict[int, tuple]:
+        return {
+            station_id: (station_id, name, city)
+            for station_id, name, city in zip(
+                self.ids(), self.values("name")[1:], self.values("city")[1:]
+            )
+        }
+
+
+class CrossingTable(ColumnTable):
+    COLUMNS = (
+        ("flags", np.uint8),
+        ("speed_limit", np.int16),
+        ("region", np.int8),
+        # Id of the upgraded replacement of an old crossing, 0 if none.
+        ("upgrade_target", np.int32),
+    )
+
+    def view(self, crossing_id: int) -> CrossingMeta:
+        flags = int(self._columns["flags"][crossing_id])
+        target = int(self._columns["upgrade_target"][crossing_id])
+        return CrossingMeta(
+            crossing_id=crossing_id,
+            has_barriers=bool(flags & BARRIERS),
+            has_light_signals=bool(flags & LIGHT_SIGNALS),
+            is_lit=bool(flags & LIT),
+            speed_limit=int(self._columns["speed_limit"][crossing_id]),
+            region=REGIONS[self._columns["region"][crossing_id]],
+            is_old=bool(flags & OLD),
+            upgrade_target=target or None,
+        )
+
+    def row(self, crossing_id: int) -> tuple:
+        flags = int(self._columns["flags"][crossing_id])
+        return (
+            crossing_id,
+            int(bool(flags & BARRIERS)),
+            int(bool(flags & LIGHT_SIGNALS)),
+            int(bool(flags & LIT)),
+            int(self._columns["speed_limit"][crossing_id]),
+        )
+
+    def rows(self) -> Dict[int, tuple]:
+        return {crossing_id: self.row(crossing_id) for crossing_id in self.ids()}
+
+
+def crossing_flags(
+    has_barriers: bool, has_light_signals: bool, is_lit: bool, is_old: bool
+) -> int:
+    return (
+        (BARRIERS if has_barriers else 0)
+        | (LIGHT_SIGNALS if has_light_signals else 0)
+        | (LIT if is_lit else 0)
+        | (OLD if is_old else 0)
+    )
+
+
+class TrainTable(ColumnTable):
+    COLUMNS = (
+        ("name", object),
+        ("train_type", np.int8),
+        ("operator", np.int8),
+    )
+
+    def row(self, train_id: int) -> tuple:
+        return (
+            train_id,
+            self._columns["name"][train_id],
+            TRAIN_TYPES[self._columns["train_type"][train_id]],
+            OPERATORS[self._columns["operator"][train_id]],
+        )
+
+    def rows(self) -> Dict[int, tuple]:
+        return {train_id: self.row(train_id) for train_id in self.ids()}
+
+    def with_operator(self, operator: str) -> List[int]:
+        code = OPERATOR_CODES[operator]
+        return [
+            train_id
+            for train_id, value in zip(self.ids(), self.values("operator")[1:])
+            if value == code
+        ]
+
+
+class DriverTable(ColumnTable):
+    COLUMNS = (
+        ("first_name", object),
+        ("last_name", object),
+        ("pesel", object),
+        ("gender", np.int8),
+        ("age", np.int8),
+        ("employment_year", np.int16),
+    )
+
+    def row(self, driver_id: int) -> tuple:
+        columns = self._columns
+        return (
+            driver_id,
+            columns["first_name"][driver_id],
+            columns["last_name"][driver_id],
+            columns["pesel"][driver_id],
+            GENDERS[columns["gender"][driver_id]],
+            int(columns["age"][driver_id]),
+            int(columns["employment_year"][driver_id]),
+        )
+
+    def rows(self) -> Dict[int, tuple]:
+        return {driver_id: self.row(driver_id) for driver_id in self.ids()}
+
+    def employment_years(self) -> Dict[int, int]:
+        return dict(zip(self.ids(), self.values("employment_year")[1:]))
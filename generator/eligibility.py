@@ -0,0 +1,79 @@
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Time-indexed eligibility
+# Pools are resolved once per snapshot, so a selection is one uniform draw.
+# ---------------------------------------------------------------------------
+
+
+class EmploymentIndex:
+    """Driver ids ordered by employment year, with per-year prefix pools.
+
+    The drivers eligible in year ``y`` are the first ``count(y)`` ids, so a
+    uniform draw over them equals rejection sampling over all drivers.
+    """
+
+    def __init__(self, employment_years: Dict[int, int]) -> None:
+        ordered = sorted(employment_years, key=lambda d: (employment_years[d], d))
+        years = np.array([employment_years[d] for d in ordered], dtype=np.int64)
+        self.ids = np.array(ordered, dtype=np.int64)
+        self.first_year = int(years[0])
+        self.prefix = np.searchsorted(
+            years, np.arange(self.first_year, int(years[-1]) + 1), side="right"
+        )
+        self._ids = ordered
+        self._prefix = self.prefix.tolist()
+
+    def eligible(self, year: int) -> int:
+        if year < self.first_year:
+            return 0
+        return self._prefix[min(year - self.first_year, len(self._prefix) - 1)]
+
+    def eligible_many(self, years: np.ndarray) -> np.ndarray:
+        offset = np.minimum(years - self.first_year, len(self.prefix) - 1)
+        return np.where(offset < 0, 0, self.prefix[np.maximum(offset, 0)])
+
+    def draw(self, rng: random.Random, year: int) -> int:
+        count = self.eligible(year)
+        if not count:
+            raise ValueError(f"No driver employed by {year}")
+        return self._ids[rng.randrange(count)]
+
+    def draw_many(self, rng: np.random.Generator, years: np.ndarray) -> np.ndarray:
+        counts = self.eligible_many(years)
+        if len(counts) and not counts.min():
+            raise ValueError(f"No driver employed by {int(years[counts == 0][0])}")
+        return self.ids[rng.integers(0, counts)]
+
+
+def resolve_switch_pools(
+    train_ids: List[int], switch_pairs: Dict[int, int]
+) -> Tuple[List[int], List[int]]:
+    """Train pools before and after the operator switch.
+
+    Before the switch a replacement train stands in for its original;
+    afterwards the original hands its rides over to the replacement.
+    """
+    reverse = {new_id: old_id for old_id, new_id in switch_pairs.items()}
+    before = [reverse.get(train_id, train_id) for train_id in train_ids]
+    after = [switch_pairs.get(train_id, train_id) for train_id in train_ids]
+    return before, after
+
+
+def resolve_upgrade_pools(
+    crossings_by_region: Dict[str, List[int]], upgrade_targets: np.ndarray
+) -> Dict[str, Tuple[List[int], List[int]]]:
+    """Per-region crossing pools before and after the upgrade date.
+
+    ``upgrade_targets`` maps crossing ids to their upgraded replacement, 0
+    for crossings that are not upgraded.
+    """
+    targets = upgrade_targets.tolist()
+    pools = {}
+    for region, crossing_ids in crossings_by_region.items():
+        upgraded = [targets[crossing_id] or crossing_id for crossing_id in crossing_ids]
+        pools[region] = (list(crossing_ids), upgraded)
+    return pools
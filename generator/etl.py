@@ -0,0 +1,569 @@
+import argparse
+import csv
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from changes import INSERT_SUFFIX, UPDATE_SUFFIX
+from compressed import csv_path, open_csv_reader, snapshot_format
+from config import T1_CONFIG, T2_CONFIG
+from output import (
+    DIMENSION_COLUMNS,
+    EVENT_COLUMNS,
+    EVENT_TABLE,
+    RIDE_COLUMNS,
+    RIDE_TABLE,
+    SECTION_COLUMNS,
+    SECTION_TABLE,
+    WEATHER_COLUMNS,
+    WEATHER_TABLE,
+)
+from partitions import read_manifest
+
+# ---------------------------------------------------------------------------
+# OLTP -> star schema (warehouse/create.sql)
+# Facts are merge-joined in one pass over files written in id order.
+# ---------------------------------------------------------------------------
+
+WAREHOUSE_COLUMNS: Dict[str, List[str]] = {
+    "Pociag": ["id", "nazwa", "typ_pociagu", "przewoznik"],
+    "Maszynista": [
+        "id",
+        "imie",
+        "nazwisko",
+        "plec",
+        "kategoria_wiekowa",
+        "doswiadczenie_pracy",
+        "pesel",
+        "czy_aktualne",
+    ],
+    "Stacja": ["id", "nazwa", "miasto"],
+    "Kurs": ["id", "nazwa_trasy", "kategoria_opoznienia"],
+    "Przejazd": [
+        "id",
+        "czy_rogatki",
+        "czy_sygnalizacja_swietlna",
+        "czy_oswietlony",
+        "dopuszczalna_predkosc",
+    ],
+    "Zdarzenie": ["id", "typ_zdarzenia", "kategoria", "skala_niebezpieczenstwa"],
+    "Data": [
+        "id",
+        "rok",
+        "miesiac",
+        "numer_miesiaca",
+        "pora_roku",
+        "dzien_tygodnia",
+        "dzien",
+    ],
+    "Czas": ["id", "godzina", "minuta", "pora_dnia"],
+    "Junk_odcinek_kursu": ["id", "typ_opadow"],
+    "Junk_zdarzenie": ["id", "czy_interwencja_sluzb"],
+    "Kolejnosc_odcinkow": ["id", "numer_etapu"],
+    "Odcinek_kursu": [
+        "id",
+        "id_kurs",
+        "id_pociag",
+        "id_stacja_wyjazdowa",
+        "id_stacja_wjazdowa",
+        "id_maszynista",
+        "id_planowa_data_przyjazdu",
+        "id_planowa_data_odjazdu",
+        "id_planowy_czas_przyjazdu",
+        "id_planowy_czas_odjazdu",
+        "id_junk",
+        "id_kolejnosc_odcinkow",
+        "temperatura",
+        "roznica_czasu",
+        "ilosc_opadow",
+    ],
+    "Zdarzenie_na_trasie": [
+        "id_odcinek_kursu",
+        "id_przejazd",
+        "id_zdarzenie",
+        "id_junk",
+        "id_data_zdarzenia",
+        "id_czas_zdarzenia",
+        "koszt_naprawy",
+        "predkosc",
+        "wywolane_opoznienie",
+        "liczba_rannych",
+        "liczba_zgonow",
+    ],
+}
+
+MONTH_NAMES = (
+    "Styczeń",
+    "Luty",
+    "Marzec",
+    "Kwiecień",
+    "Maj",
+    "Czerwiec",
+    "Lipiec",
+    "Sierpień",
+    "Wrzesień",
+    "Październik",
+    "Listopad",
+    "Grudzień",
+)
+WEEKDAY_NAMES = (
+    "Poniedziałek",
+    "Wtorek",
+    "Środa",
+    "Czwartek",
+    "Piątek",
+    "Sobota",
+    "Niedziela",
+)
+
+# Year the driver experience is measured against, per snapshot.
+SNAPSHOT_REFERENCE_YEAR = {
+    T1_CONFIG.name: T1_CONFIG.end.year,
+    T2_CONFIG.name: T2_CONFIG.end.year,
+}
+
+# ---------------------------------------------------------------------------
+# Banding
+# ---------------------------------------------------------------------------
+
+
+def delay_category(minutes: int) -> str:
+    if minutes <= 5:
+        return "Brak opóźnienia"
+    if minutes <= 15:
+        return "Małe opóźnienie"
+    if minutes <= 45:
+        return "Średnie opóźnienie"
+    return "Duże opóźnienie"
+
+
+def age_category(age: int) -> str:
+    for upper, label in ((25, "18-25"), (35, "25-35"), (45, "35-45"), (55, "45-55")):
+        if age < upper:
+            return label
+    return "55-65" if age < 65 else "65+"
+
+
+def experience_category(years: int) -> str:
+    if years < 1:
+        return "poniżej 1 roku"
+    if years < 5:
+        return "1-5 lat"
+    if years >= 30:
+        return "30+ lat"
+    lower = years // 5 * 5
+    return f"{lower}-{lower + 5} lat"
+
+
+def speed_band(limit: int) -> str:
+    if limit <= 40:
+        return "do 40 km/h"
+    if limit > 80:
+        return "80+ km/h"
+    lower = (limit - 1) // 10 * 10
+    return f"{lower}-{lower + 10} km/h"
+
+
+def danger_scale(level: int) -> str:
+    if level <= 4:
+        return "niska"
+    return "średnia" if level <= 6 else "wysoka"
+
+
+def season(month: int) -> str:
+    return ("Zima", "Wiosna", "Lato", "Jesień")[month % 12 // 3]
+
+
+def time_of_day(hour: int) -> str:
+    if 5 <= hour < 12:
+        return "Rano"
+    if hour == 12:
+        return "Południe"
+    if 13 <= hour < 18:
+        return "Popołudnie"
+    if 18 <= hour < 22:
+        return "Wieczór"
+    return "Noc"
+
+
+# ---------------------------------------------------------------------------
+# Dimension tables
+# ---------------------------------------------------------------------------
+
+
+class KeyedDimension:
+    """Surrogate keys for a dimension keyed by a natural key (type 1)."""
+
+    def __init__(self) -> None:
+        self.keys: Dict[object, int] = {}
+        self.rows: List[list] = []
+
+    def upsert(self, natural_key: object, attributes: Sequence) -> int:
+        key = self.keys.get(natural_key)
+        if key is None:
+            key = len(self.rows) + 1
+            self.keys[natural_key] = key
+            self.rows.append([key, *attributes])
+        else:
+            self.rows[key - 1][1:] = attributes
+        return key
+
+    def key(self, natural_key: object) -> int:
+        key = self.keys.get(natural_key)
+        if key is None:
+            key = self.upsert(natural_key, self.attributes(natural_key))
+        return key
+
+    def attributes(self, natural_key: object) -> Sequence:
+        raise KeyError(natural_key)
+
+
+class DriverDimension(KeyedDimension):
+    """``Maszynista`` as a type 2 dimension flagged by ``czy_aktualne``."""
+
+    def upsert(self, natural_key: object, attributes: Sequence) -> int:
+        key = self.keys.get(natural_key)
+        if key is not None:
+            if self.rows[key - 1][1:-1] == list(attributes):
+                return key
+            self.rows[key - 1][-1] = 0
+        key = len(self.rows) + 1
+        self.keys[natural_key] = key
+        self.rows.append([key, *attributes, 1])
+        return key
+
+
+class DateDimension(KeyedDimension):
+    def attributes(self, day: str) -> Sequence:
+        value = date.fromisoformat(day)
+        return (
+            value.year,
+            MONTH_NAMES[value.month - 1],
+            value.month,
+            season(value.month),
+            WEEKDAY_NAMES[value.weekday()],
+            value.day,
+        )
+
+
+class TimeDimension(KeyedDimension):
+    def attributes(self, hour_minute: Tuple[int, int]) -> Sequence:
+        hour, minute = hour_minute
+        return (hour, minute, time_of_day(hour))
+
+
+class ValueDimension(KeyedDimension):
+    """Junk and ordering dimensions whose only attribute is the key itself."""
+
+    def attributes(self, value: object) -> Sequence:
+        return (value,)
+
+
+# ---------------------------------------------------------------------------
+# Streaming ETL
+# ---------------------------------------------------------------------------
+
+
+def _read_rows(path: Path, columns: Sequence[str]) -> Iterator[List[str]]:
+    with open_csv_reader(path) as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header != list(columns):
+            raise ValueError(f"{path}: unexpected header {header}")
+        yield from reader
+
+
+def _dimension_rows(snapshot_dir: Path, table: str) -> Iterator[List[str]]:
+    """Rows of a full dimension file, or of its insert/update change sets."""
+    columns = DIMENSION_COLUMNS[table]
+    path = csv_path(snapshot_dir, table)
+    if path.exists():
+        yield from _read_rows(path, columns)
+        return
+    for suffix in (INSERT_SUFFIX, UPDATE_SUFFIX):
+        yield from _read_rows(csv_path(snapshot_dir, f"{table}{suffix}"), columns)
+
+
+class StarSchemaEtl:
+    """Turns generator snapshots into warehouse dimension and fact files.
+
+    Snapshots must be processed in order. Facts already seen in an earlier
+    snapshot (ids not above the last processed id) are skipped, so a
+    snapshot that replays history is not loaded twice.
+    """
+
+    def __init__(self, output_dir: Path) -> None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = output_dir
+        self.trains = KeyedDimension()
+        self.drivers = DriverDimension()
+        self.driver_sources: Dict[int, List[str]] = {}
+        self.stations = KeyedDimension()
+        self.crossings = KeyedDimension()
+        self.events = KeyedDimension()
+        self.dates = DateDimension()
+        self.times = TimeDimension()
+        self.section_junk = ValueDimension()
+        self.event_junk = ValueDimension()
+        self.section_order = ValueDimension()
+        self.counts: Dict[str, int] = {
+            "Kurs": 0,
+            "Odcinek_kursu": 0,
+            "Zdarzenie_na_trasie": 0,
+            "skipped_events": 0,
+        }
+        self._last_ride_id = 0
+        self._last_section_id = 0
+        self._files: List[TextIO] = []
+        self._ride_writer = self._open("Kurs")
+        self._section_writer = self._open("Odcinek_kursu")
+        self._event_writer = self._open("Zdarzenie_na_trasie")
+
+    def __enter__(self) -> "StarSchemaEtl":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _open(self, table: str):
+        handle = (self.output_dir / f"{table}.csv").open(
+            "w", newline="", encoding="utf-8", buffering=1 << 20
+        )
+        self._files.append(handle)
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(WAREHOUSE_COLUMNS[table])
+        return writer
+
+    # ------------------------------------------------------------------
+    # Dimensions
+    # ------------------------------------------------------------------
+
+    def load_dimensions(self, snapshot_dir: Path, reference_year: int) -> None:
+        for row in _dimension_rows(snapshot_dir, "Pociag"):
+            self.trains.upsert(int(row[0]), row[1:])
+        for row in _dimension_rows(snapshot_dir, "Stacja"):
+            self.stations.upsert(int(row[0]), row[1:])
+        for row in _dimension_rows(snapshot_dir, "Przejazd"):
+            self.crossings.upsert(int(row[0]), [*row[1:4], speed_band(int(row[4]))])
+        for row in _dimension_rows(snapshot_dir, "Zdarzenie"):
+            self.events.upsert(int(row[0]), [row[1], row[2], danger_scale(int(row[3]))])
+        # Experience bands depend on the snapshot year, so every known driver
+        # is re-banded, including those a delta snapshot does not mention.
+        for row in _dimension_rows(snapshot_dir, "Maszynista"):
+            self.driver_sources[int(row[0])] = row
+        for row in self.driver_sources.values():
+            driver_id, first, last, pesel, gender, age, employed = row
+            self.drivers.upsert(
+                int(driver_id),
+                [
+                    first,
+                    last,
+                    gender,
+                    age_category(int(age)),
+                    experience_category(reference_year - int(employed)),
+                    pesel,
+                ],
+            )
+
+    # ------------------------------------------------------------------
+    # Facts
+    # ------------------------------------------------------------------
+
+    def _date_time(self, stamp: str) -> Tuple[int, int]:
+        """(Data key, Czas key) of a ``YYYY-MM-DD HH:MM:SS`` timestamp."""
+        return self.dates.key(stamp[:10]), self.times.key(
+            (int(stamp[11:13]), int(stamp[14:16]))
+        )
+
+    def process_facts(self, snapshot_dir: Path) -> None:
+        rides = _read_rows(csv_path(snapshot_dir, RIDE_TABLE), RIDE_COLUMNS)
+        weather = _read_rows(csv_path(snapshot_dir, WEATHER_TABLE), WEATHER_COLUMNS)
+        events = _read_rows(csv_path(snapshot_dir, EVENT_TABLE), EVENT_COLUMNS)
+        previous_section_id = self._last_section_id
+        write_section = self._section_writer.writerow
+        write_ride = self._ride_writer.writerow
+
+        ride_id, ride_key, train_key, driver_key = 0, 0, 0, 0
+        event = next(events, None)
+        for section in _read_rows(
+            csv_path(snapshot_dir, SECTION_TABLE), SECTION_COLUMNS
+        ):
+            section_id = int(section[0])
+            measurement = next(weather, None)
+            if measurement is None or int(measurement[0]) != section_id:
+                raise ValueError(
+                    f"{WEATHER_TABLE}.csv is not aligned with section {section_id}"
+                )
+            if section_id <= previous_section_id:
+                continue
+
+            ride_ref = int(section[1])
+            while ride_id < ride_ref:
+                ride = next(rides, None)
+                if ride is None:
+                    raise ValueError(f"section {section_id}: unknown ride {ride_ref}")
+                ride_id = int(ride[0])
+                if ride_id <= self._last_ride_id:
+                    continue
+                self.counts["Kurs"] += 1
+                ride_key = self.counts["Kurs"]
+                write_ride((ride_key, ride[1], delay_category(int(ride[2]))))
+                train_key = self.trains.keys[int(ride[5])]
+                driver_key = self.drivers.keys[int(ride[6])]
+                self._last_ride_id = ride_id
+            if ride_id != ride_ref:
+                raise ValueError(
+                    f"{SECTION_TABLE}.csv is not ordered by ride (section {section_id})"
+                )
+
+            arrival_date, arrival_time = self._date_time(section[6])
+            departure_date, departure_time = self._date_time(section[7])
+            self.counts["Odcinek_kursu"] += 1
+            fact_key = self.counts["Odcinek_kursu"]
+            write_section(
+                (
+                    fact_key,
+                    ride_key,
+                    train_key,
+                    self.stations.keys[int(section[3])],
+                    self.stations.keys[int(section[4])],
+                    driver_key,
+                    arrival_date,
+                    departure_date,
+                    arrival_time,
+                    departure_time,
+                    self.section_junk.key(measurement[4]),
+                    self.section_order.key(int(section[2])),
+                    measurement[2],
+                    section[5],
+                    round(float(measurement[3])),
+                )
+            )
+            self._last_section_id = section_id
+
+            while event is not None and int(event[1]) <= section_id:
+                event_section = int(event[1])
+                if event_section == section_id:
+                    self._write_event(event, fact_key)
+                elif event_section > previous_section_id:
+                    raise ValueError(
+                        f"{EVENT_TABLE}.csv is not ordered by section "
+                        f"(event {event[0]})"
+                    )
+                event = next(events, None)
+
+        if event is not None:
+            raise ValueError(f"event {event[0]} references unknown section {event[1]}")
+
+    def _write_event(self, event: List[str], section_key: int) -> None:
+        if not event[2]:
+            # The warehouse fact requires a crossing; events off crossings
+            # have no place in it.
+            self.counts["skipped_events"] += 1
+            return
+        event_date, event_time = self._date_time(event[9])
+        self.counts["Zdarzenie_na_trasie"] += 1
+        self._event_writer.writerow(
+            (
+                section_key,
+                self.crossings.keys[int(event[2])],
+                self.events.keys[int(event[3])],
+                self.event_junk.key(int(event[8])),
+                event_date,
+                event_time,
+                event[7],
+                event[10],
+                event[4],
+                event[5],
+                event[6],
+            )
+        )
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def close(self) -> None:
+        if not self._files:
+            return
+        for handle in self._files:
+            handle.close()
+        self._files = []
+        for table, dimension in (
+            ("Pociag", self.trains),
+            ("Maszynista", self.drivers),
+            ("Stacja", self.stations),
+            ("Przejazd", self.crossings),
+            ("Zdarzenie", self.events),
+            ("Data", self.dates),
+            ("Czas", self.times),
+            ("Junk_odcinek_kursu", self.section_junk),
+            ("Junk_zdarzenie", self.event_junk),
+            ("Kolejnosc_odcinkow", self.section_order),
+        ):
+            with (self.output_dir / f"{table}.csv").open(
+                "w", newline="", encoding="utf-8"
+            ) as fh:
+                writer = csv.writer(fh, lineterminator="\n")
+                writer.writerow(WAREHOUSE_COLUMNS[table])
+                writer.writerows(dimension.rows)
+
+
+def run_etl(
+    input_dir: Path, output_dir: Path, snapshots: Sequence[str] = ("T1", "T2")
+) -> Dict[str, int]:
+    for snapshot in snapshots:
+        output_format = snapshot_format(input_dir / snapshot)
+        if output_format != "csv":
+            raise ValueError(
+                f"{snapshot}: {output_format} snapshots are not supported, "
+                "etl.py reads CSV output (generate with --format csv)"
+            )
+        if read_manifest(input_dir / snapshot) is not None:
+            raise ValueError(
+                f"{snapshot}: partitioned snapshots are not supported, etl.py "
+                "reads facts in id order (generate without --partition-by)"
+            )
+    with StarSchemaEtl(output_dir) as etl:
+        for snapshot in snapshots:
+            reference_year = SNAPSHOT_REFERENCE_YEAR.get(snapshot, date.today().year)
+            etl.load_dimensions(input_dir / snapshot, reference_year)
+            etl.process_facts(input_dir / snapshot)
+    return etl.counts
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Transform generated snapshots into star-schema files.",
+    )
+    parser.add_argument(
+        "--input-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=os.getenv("RAILGEN_WAREHOUSE_DIR", "output/warehouse"),
+    )
+    parser.add_argument("--snapshot", nargs="+", default=["T1", "T2"])
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    here = Path(__file__).resolve().parent
+    input_path, output_path = Path(args.input_dir), Path(args.output_dir)
+    if not input_path.is_absolute():
+        input_path = here / input_path
+    if not output_path.is_absolute():
+        output_path = here / output_path
+    for table, rows in run_etl(input_path, output_path, args.snapshot).items():
+        print(f"{table}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import functools
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Run instrumentation
+# Disabled, a stage is a shared ``nullcontext`` and a counter a flag test.
+# ---------------------------------------------------------------------------
+
+INSTRUMENT_MODES = ("off", "on", "profile")
+
+_DISABLED = nullcontext()
+
+
+class SamplingProfiler:
+    """Periodically samples one thread's Python stack."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._target = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="railgen-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, object]]:
+        """Functions by self samples, with inclusive samples alongside."""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        return [
+            {"function": function, "self": count, "total": inclusive[function]}
+            for function, count in own.most_common(limit)
+        ]
+
+    def write_folded(self, path: Path) -> None:
+        """Collapsed stacks, the input format of flame graph tools."""
+        with path.open("w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{';'.join(stack)} {count}\n")
+
+
+class Instrumentation:
+    def __init__(self) -> None:
+        self.mode = "off"
+        self.enabled = False
+        self.profile_interval = 0.01
+        self.profiler: Optional[SamplingProfiler] = None
+        self.counters: Counter = Counter()
+        self._stages: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+        self._started: Tuple[float, float] = (0.0, 0.0)
+
+    def configure(self, mode: str, profile_interval: float = 0.01) -> None:
+        if mode not in INSTRUMENT_MODES:
+            raise ValueError(f"Unknown instrumentation mode: {mode}")
+        self.mode = mode
+        self.enabled = mode != "off"
+        self.profile_interval = profile_interval
+
+    def start(self) -> None:
+        self._started = (time.perf_counter(), time.process_time())
+        if self.mode == "profile":
+            self.profiler = SamplingProfiler(self.profile_interval)
+            self.profiler.start()
+
+    def stop(self) -> None:
+        if self.profiler is not None:
+            self.profiler.stop()
+
+    # -- collection -----------------------------------------------------
+
+    def stage(self, name: str):
+        """Context manager timing one stage; free when disabled."""
+        if not self.enabled:
+            return _DISABLED
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            entry = self._stages[name]
+            entry[0] += 1
+            entry[1] += time.perf_counter() - wall
+            entry[2] += time.process_time() - cpu
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += amount
+
+    def take_counters(self) -> Dict[str, int]:
+        """Counters collected so far, resetting them (used by shard workers)."""
+        counters = dict(self.counters)
+        self.counters.clear()
+        return counters
+
+    def merge_counters(self, counters: Dict[str, int]) -> None:
+        self.counters.update(counters)
+
+    # -- reporting ------------------------------------------------------
+
+    def report(self) -> Dict[str, object]:
+        wall, cpu = self._started
+        report: Dict[str, object] = {
+            "mode": self.mode,
+            "wall_seconds": time.perf_counter() - wall,
+            "cpu_seconds": time.process_time() - cpu,
+            "stages": {
+                name: {
+                    "calls": calls,
+                    "wall_seconds": stage_wall,
+                    "cpu_seconds": stage_cpu,
+                }
+                for name, (calls, stage_wall, stage_cpu) in self._stages.items()
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+        compressed = self.counters.get("compression_output_bytes")
+        if compressed:
+            raw = self.counters["compression_input_bytes"]
+            seconds = self.counters["compression_microseconds"] / 1e6
+            report["compression"] = {
+                "input_bytes": raw,
+                "output_bytes": compressed,
+                "ratio": raw / compressed,
+                "compress_seconds": seconds,
+                "input_mb_per_second": raw / (1 << 20) / seconds if seconds else 0.0,
+            }
+        pipeline = self._pipeline_report()
+        if pipeline:
+            report["pipeline"] = pipeline
+        if self.profiler is not None:
+            report["profile"] = {
+                "interval_seconds": self.profiler.interval,
+                "samples": self.profiler.samples,
+                "top_functions": self.profiler.top_functions(),
+            }
+        return report
+
+    def _pipeline_report(self) -> Dict[str, Dict[str, object]]:
+        """Per writer queue: fill level and where each side waited.
+
+        A producer blocked on a full queue means the writer (disk,
+        compression) is the bottleneck; a writer waiting on an empty queue
+        means generation is.
+        """
+        queues: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for name, amount in self.counters.items():
+            if name.startswith("pipeline_") and name.endswith("]"):
+                field, _, table = name[len("pipeline_") : -1].partition("[")
+                queues[table][field] = amount
+        report = {}
+        for table, fields in sorted(queues.items()):
+            producer_wait = fields.get("producer_wait_us", 0) / 1e6
+            writer_wait = fields.get("writer_wait_us", 0) / 1e6
+            slots = fields.get("slots", 0)
+            report[table] = {
+                "batches": fields.get("batches", 0),
+                "utilization": fields.get("queued", 0) / slots if slots else 0.0,
+                "producer_blocked_seconds": producer_wait,
+                "writer_idle_seconds": writer_wait,
+                "bound": "io" if producer_wait > writer_wait else "cpu",
+            }
+        return report
+
+    def write_report(self, path: Path) -> None:
+        report = self.report()
+        if self.profiler is not None:
+            folded = path.with_suffix(".folded")
+            self.profiler.write_folded(folded)
+            report["profile"]["folded_stacks"] = str(folded)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+INSTRUMENTATION = Instrumentation()
+
+
+def timed(name: str, label_arg: Optional[int] = None) -> Callable:
+    """Decorate a method as an instrumented stage.
+
+    With ``label_arg`` the stage name is suffixed with that positional
+    argument (after ``self``), or its ``name`` attribute, e.g.
+    ``generate_facts[T1]``.
+    """
+
+    def decorate(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return function(self, *args, **kwargs)
+            stage = name
+            if label_arg is not None:
+                label = args[label_arg] if len(args) > label_arg else None
+                stage = f"{name}[{getattr(label, 'name', label)}]"
+            with INSTRUMENTATION.stage(stage):
+                return function(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,545 @@
+import argparse
+import csv
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from changes import INSERT_SUFFIX, UPDATE_SUFFIX
+from compressed import csv_path, open_csv_reader, snapshot_format
+from config import _env_int
+from output import EVENT_TABLE, RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE
+from partitions import FACT_TABLES, read_manifest
+
+# ---------------------------------------------------------------------------
+# OLTP table layout (database/00-schema.sql)
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    sql_type: str
+    nullable: bool = False
+    references: Optional[str] = None
+
+    @property
+    def kind(self) -> str:
+        sql_type = self.sql_type.upper()
+        if sql_type.startswith(("INT", "BIGINT")):
+            return "int"
+        if sql_type == "BIT":
+            return "bit"
+        if sql_type.startswith("DECIMAL"):
+            return "decimal"
+        if sql_type == "DATETIME":
+            return "datetime"
+        return "text"
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    name: str
+    columns: Tuple[Column, ...]
+    key: Tuple[str, ...] = ("id",)
+    identity: bool = True
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
+
+
+TABLES: Dict[str, TableSpec] = {
+    spec.name: spec
+    for spec in (
+        TableSpec(
+            "Pociag",
+            (
+                Column("id", "INT"),
+                Column("nazwa", "VARCHAR(20)"),
+                Column("typ_pociagu", "VARCHAR(30)"),
+                Column("operator", "VARCHAR(40)"),
+            ),
+        ),
+        TableSpec(
+            "Maszynista",
+            (
+                Column("id", "INT"),
+                Column("imie", "VARCHAR(30)"),
+                Column("nazwisko", "VARCHAR(30)"),
+                Column("pesel", "CHAR(11)"),
+                Column("plec", "VARCHAR(10)"),
+                Column("wiek", "INT"),
+                Column("rok_zatrudnienia", "INT"),
+            ),
+        ),
+        TableSpec(
+            "Przejazd",
+            (
+                Column("id", "INT"),
+                Column("czy_rogatki", "BIT"),
+                Column("czy_sygnalizacja_swietlna", "BIT"),
+                Column("czy_oswietlony", "BIT"),
+                Column("dopuszczalna_predkosc", "INT"),
+            ),
+        ),
+        TableSpec(
+            "Zdarzenie",
+            (
+                Column("id", "INT"),
+                Column("typ_zdarzenia", "VARCHAR(30)"),
+                Column("kategoria", "VARCHAR(40)"),
+                Column("skala_niebezpieczenstwa", "INT"),
+            ),
+        ),
+        TableSpec(
+            "Stacja",
+            (
+                Column("id", "INT"),
+                Column("nazwa", "VARCHAR(40)"),
+                Column("miasto", "VARCHAR(40)"),
+            ),
+        ),
+        TableSpec(
+            RIDE_TABLE,
+            (
+                Column("id", "INT"),
+                Column("nazwa_trasy", "VARCHAR(40)"),
+                Column("roznica_czasu", "INT"),
+                Column("planowa_data_odjazdu", "DATETIME"),
+                Column("planowa_data_przyjazdu", "DATETIME", nullable=True),
+                Column("pociag_id", "INT", references="Pociag"),
+                Column("maszynista_id", "INT", references="Maszynista"),
+            ),
+        ),
+        TableSpec(
+            SECTION_TABLE,
+            (
+                Column("id", "BIGINT"),
+                Column("kurs_id", "INT", references=RIDE_TABLE),
+                Column("numer_etapu_kursu", "INT"),
+                Column("stacja_wyjazdowa_id", "INT", True, references="Stacja"),
+                Column("stacja_wjazdowa_id", "INT", references="Stacja"),
+                Column("roznica_czasu", "INT"),
+                Column("planowa_data_przyjazdu", "DATETIME"),
+                Column("planowa_data_odjazdu", "DATETIME", nullable=True),
+            ),
+        ),
+        TableSpec(
+            EVENT_TABLE,
+            (
+                Column("id", "BIGINT"),
+                Column("odcinek_kursu_id", "BIGINT", references=SECTION_TABLE),
+                Column("przejazd_id", "INT", True, references="Przejazd"),
+                Column("zdarzenie_id", "INT", references="Zdarzenie"),
+                Column("wywolane_opoznienie", "INT"),
+                Column("liczba_rannych", "INT"),
+                Column("liczba_zgonow", "INT"),
+                Column("koszt_naprawy", "DECIMAL(10, 2)"),
+                Column("czy_interwencja_sluzb", "BIT"),
+                Column("data", "DATETIME"),
+                Column("predkosc", "INT"),
+            ),
+        ),
+        TableSpec(
+            WEATHER_TABLE,
+            (
+                Column("id_odcinka", "BIGINT", references=SECTION_TABLE),
+                Column("data_pomiaru", "DATETIME"),
+                Column("temperatura", "DECIMAL(4, 1)"),
+                Column("ilosc_opadow", "DECIMAL(4, 1)"),
+                Column("typ_opadow", "VARCHAR(10)"),
+            ),
+            key=("id_odcinka", "data_pomiaru"),
+            identity=False,
+        ),
+    )
+}
+
+# Tables in one stage only reference tables of earlier stages, so a stage's
+# tables can load concurrently once the previous stage has committed.
+LOAD_STAGES: Tuple[Tuple[str, ...], ...] = (
+    ("Pociag", "Maszynista", "Przejazd", "Zdarzenie", "Stacja"),
+    (RIDE_TABLE,),
+    (SECTION_TABLE,),
+    (EVENT_TABLE, WEATHER_TABLE),
+)
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / "database" / "00-schema.sql"
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+
+class ConnectionPool:
+    """Fixed-size pool of DB-API connections shared by the load threads."""
+
+    def __init__(self, connect: Callable[[], object], size: int) -> None:
+        self.size = size
+        self._connect = connect
+        self._idle: "queue.LifoQueue[object]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[object]:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            conn = self._connect() if can_open else self._idle.get()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+def _optional(convert: Callable[[str], object]) -> Callable[[str], object]:
+    return lambda value: convert(value) if value != "" else None
+
+
+class SqliteBackend:
+    """SQLite target, mainly for testing loads without SQL Server."""
+
+    name = "sqlite"
+    converters: Dict[str, Callable[[str], object]] = {
+        "int": int,
+        "bit": int,
+        # NUMERIC affinity turns the decimal text into a number; timestamps
+        # stay as ISO text, SQLite's native date representation.
+        "decimal": str,
+        "datetime": str,
+        "text": str,
+    }
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=300, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def create_schema(self, conn: sqlite3.Connection) -> None:
+        for stage in reversed(LOAD_STAGES):
+            for table in stage:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        for stage in LOAD_STAGES:
+            for table in stage:
+                conn.execute(self._create_table(TABLES[table]))
+        conn.commit()
+
+    def load(
+        self,
+        conn: sqlite3.Connection,
+        spec: TableSpec,
+        batches: Iterator[List[tuple]],
+        merge: bool,
+    ) -> int:
+        columns = spec.column_names
+        sql = (
+            f"INSERT INTO {spec.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        if merge:
+            updates = [name for name in columns if name not in spec.key]
+            sql += f" ON CONFLICT ({', '.join(spec.key)}) DO " + (
+                "UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates)
+                if updates
+                else "NOTHING"
+            )
+        rows = 0
+        for batch in batches:
+            conn.executemany(sql, batch)
+            rows += len(batch)
+        conn.commit()
+        return rows
+
+    @staticmethod
+    def _create_table(spec: TableSpec) -> str:
+        lines = [
+            f"{column.name} {column.sql_type}"
+            + ("" if column.nullable else " NOT NULL")
+            + (f" REFERENCES {column.references} (id)" if column.references else "")
+            for column in spec.columns
+        ]
+        lines.append(f"PRIMARY KEY ({', '.join(spec.key)})")
+        return f"CREATE TABLE {spec.name} (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+class SqlServerBackend:
+    """SQL Server target over pyodbc with ``fast_executemany`` batches.
+
+    Plain loads insert explicit ids under ``IDENTITY_INSERT``; merge loads
+    stage each batch in a session temp table and ``MERGE`` it into the
+    target, like ``database/02-bulk-update-T2.sql``.
+    """
+
+    name = "mssql"
+    converters: Dict[str, Callable[[str], object]] = {
+        "int": int,
+        "bit": lambda value: value == "1",
+        "decimal": Decimal,
+        "datetime": datetime.fromisoformat,
+        "text": str,
+    }
+
+    def __init__(self, connection_string: str) -> None:
+        try:
+            import pyodbc
+        except ImportError as exc:
+            raise RuntimeError(
+                "SQL Server loads require pyodbc and an ODBC driver"
+            ) from exc
+        self._pyodbc = pyodbc
+        self.connection_string = connection_string
+
+    def connect(self):
+        return self._pyodbc.connect(self.connection_string, autocommit=False)
+
+    def create_schema(self, conn) -> None:
+        script = SCHEMA_SQL.read_text(encoding="utf-8")
+        cursor = conn.cursor()
+        for statement in script.split("\nGO"):
+            if statement.strip():
+                cursor.execute(statement)
+        conn.commit()
+
+    def load(self, conn, spec: TableSpec, batches: Iterator[List[tuple]], merge: bool):
+        columns = spec.column_names
+        column_list = ", ".join(columns)
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        target = f"#stage_{spec.name}" if merge else spec.name
+        if merge:
+            cursor.execute(
+                f"CREATE TABLE {target} ("
+                + ", ".join(f"{c.name} {c.sql_type}" for c in spec.columns)
+                + ")"
+            )
+        if spec.identity:
+            cursor.execute(f"SET IDENTITY_INSERT {spec.name} ON")
+        insert = (
+            f"INSERT INTO {target} ({column_list}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        rows = 0
+        for batch in batches:
+            cursor.executemany(insert, batch)
+            if merge:
+                cursor.execute(self._merge_sql(spec, target))
+                cursor.execute(f"TRUNCATE TABLE {target}")
+            rows += len(batch)
+        if spec.identity:
+            cursor.execute(f"SET IDENTITY_INSERT {spec.name} OFF")
+        if merge:
+            cursor.execute(f"DROP TABLE {target}")
+        conn.commit()
+        return rows
+
+    @staticmethod
+    def _merge_sql(spec: TableSpec, stage: str) -> str:
+        columns = spec.column_names
+        match = " AND ".join(f"target.{c} = source.{c}" for c in spec.key)
+        updates = ", ".join(f"{c} = source.{c}" for c in columns if c not in spec.key)
+        return (
+            f"MERGE INTO {spec.name} AS target USING {stage} AS source ON {match} "
+            f"WHEN MATCHED THEN UPDATE SET {updates} "
+            f"WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) "
+            f"VALUES ({', '.join('source.' + c for c in columns)});"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+
+def read_batches(
+    path: Path, spec: TableSpec, converters: Dict[str, Callable], batch_rows: int
+) -> Iterator[List[tuple]]:
+    """Stream a snapshot CSV as lists of converted row tuples."""
+    convert = [
+        _optional(converters[c.kind]) if c.nullable else converters[c.kind]
+        for c in spec.columns
+    ]
+    with open_csv_reader(path) as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header != spec.column_names:
+            raise ValueError(f"{path}: unexpected header {header}")
+        batch: List[tuple] = []
+        for row in reader:
+            batch.append(tuple([fn(value) for fn, value in zip(convert, row)]))
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def check_csv_snapshot(snapshot_dir: Path) -> None:
+    """Reject Parquet, Arrow and native snapshots up front."""
+    output_format = snapshot_format(snapshot_dir)
+    if output_format != "csv":
+        raise ValueError(
+            f"{snapshot_dir}: {output_format} snapshots are not supported, "
+            "loader.py reads CSV output (bcp snapshots come with load.sh)"
+        )
+
+
+def load_snapshot(
+    backend,
+    pool: ConnectionPool,
+    snapshot_dir: Path,
+    merge: bool = False,
+    batch_rows: int = 10_000,
+) -> Dict[str, int]:
+    """Load one snapshot directory stage by stage; returns rows per table."""
+    check_csv_snapshot(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+
+    def _load(table: str) -> int:
+        spec = TABLES[table]
+        path = csv_path(snapshot_dir, table)
+        if manifest is not None and table in FACT_TABLES:
+            # Month partitions (--partition-by month) load one after another.
+            parts = [
+                (csv_path(snapshot_dir / partition["path"], table), merge)
+                for partition in manifest["partitions"]
+            ]
+        elif path.exists():
+            parts = [(path, merge)]
+        else:
+            # Delta snapshot: new rows are inserted, changed rows merged.
+            parts = [
+                (csv_path(snapshot_dir, f"{table}{INSERT_SUFFIX}"), False),
+                (csv_path(snapshot_dir, f"{table}{UPDATE_SUFFIX}"), True),
+            ]
+        rows = 0
+        with pool.connection() as conn:
+            for part, merge_part in parts:
+                batches = read_batches(part, spec, backend.converters, batch_rows)
+                rows += backend.load(conn, spec, batches, merge_part)
+        return rows
+
+    counts: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        for stage in LOAD_STAGES:
+            futures = {table: executor.submit(_load, table) for table in stage}
+            for table, future in futures.items():
+                counts[table] = future.result()
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load generated snapshots into the OLTP schema.",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--odbc",
+        default=os.getenv("RAILGEN_ODBC"),
+        help="pyodbc connection string of the SQL Server database",
+    )
+    target.add_argument(
+        "--sqlite",
+        default=os.getenv("RAILGEN_SQLITE"),
+        help="SQLite database file",
+    )
+    parser.add_argument(
+        "--input-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument(
+        "--snapshot",
+        nargs="+",
+        default=["T1", "T2"],
+        help="snapshots to load in order; T1 is inserted, later ones merged",
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=_env_int("RAILGEN_LOAD_BATCH_ROWS", 10_000),
+        help="rows sent per executemany batch",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=_env_int("RAILGEN_LOAD_CONNECTIONS", 5),
+        help="pooled connections, i.e. tables loaded concurrently",
+    )
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="(re)create the OLTP tables before loading",
+    )
+    args = parser.parse_args(argv)
+    if not args.odbc and not args.sqlite:
+        parser.error("one of --odbc or --sqlite is required")
+    return args
+
+
+def run_loader(argv: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, int]]:
+    args = _parse_args(argv)
+    input_path = Path(args.input_dir)
+    if not input_path.is_absolute():
+        input_path = Path(__file__).resolve().parent / input_path
+    backend = (
+        SqlServerBackend(args.odbc) if args.odbc else SqliteBackend(Path(args.sqlite))
+    )
+    pool = ConnectionPool(backend.connect, args.connections)
+    loaded: Dict[str, Dict[str, int]] = {}
+    try:
+        if args.create_schema:
+            with pool.connection() as conn:
+                backend.create_schema(conn)
+        for index, snapshot in enumerate(args.snapshot):
+            loaded[snapshot] = load_snapshot(
+                backend,
+                pool,
+                input_path / snapshot,
+                merge=index > 0 or snapshot != "T1",
+                batch_rows=args.batch_rows,
+            )
+            for table, rows in loaded[snapshot].items():
+                print(f"{snapshot} {table}: {rows} rows")
+    finally:
+        pool.close()
+    return loaded
+
+
+if __name__ == "__main__":
+    run_loader()
@@ -1,153 +1,192 @@
+import argparse
 import csv
 import os
 import random
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import asdict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Iterator, List, Optional, Sequence, Tuple
-
-from faker import Faker
-
-# ---------------------------------------------------------------------------
-# Configuration structures
-# ---------------------------------------------------------------------------
-
-
-@dataclass(frozen=True)
-class StationMeta:
-    station_id: int
-    name: str
-    city: str
-    voivodeship: str
-    region: str
-
-
-@dataclass(frozen=True)
-class CrossingMeta:
-    crossing_id: int
-    has_barriers: bool
-    has_light_signals: bool
-    is_lit: bool
-    speed_limit: int
-    region: str
-    is_old: bool
-    upgrade_target: Optional[int]
-
-
-@dataclass(frozen=True)
-class RouteTemplate:
-    name: str
-    station_ids: Sequence[int]
-    section_minutes: Sequence[int]
-
-
-@dataclass(frozen=True)
-class SnapshotConfig:
-    name: str
-    start: datetime
-    end: datetime
-    ride_count: int
-    base_event_rate: float
-
-
-# ---------------------------------------------------------------------------
-# Constants aligned with the business specification
-# ---------------------------------------------------------------------------
-
-VOIVODESHIPS = [
-    "Dolnośląskie",
-    "Kujawsko-Pomorskie",
-    "Lubelskie",
-    "Lubuskie",
-    "Łódzkie",
-    "Małopolskie",
-    "Mazowieckie",
-    "Opolskie",
-    "Podkarpackie",
-    "Podlaskie",
-    "Pomorskie",
-    "Śląskie",
-    "Świętokrzyskie",
-    "Warmińsko-Mazurskie",
-    "Wielkopolskie",
-    "Zachodniopomorskie",
-]
-
-COASTAL = {"Pomorskie", "Zachodniopomorskie"}
-MOUNTAIN = {"Małopolskie", "Podkarpackie", "Śląskie"}
-
-EVENT_DEFINITIONS = [
-    ("wypadek", "potrącenie pieszego", 9),
-    ("wypadek", "zderzenie z samochodem", 8),
-    ("wypadek", "wykolejenie", 10),
-    ("wypadek", "zderzenie z innym pociągiem", 10),
-    ("incydent", "opóźnienie organizacyjne", 4),
-    ("incydent", "przekroczenie limitu prędkości", 5),
-    ("incydent", "problem z pasażerem", 3),
-    ("awaria", "usterka hamulców", 7),
-    ("awaria", "usterka sygnalizacji", 6),
-    ("awaria", "awaria lokomotywy", 7),
-    ("zdarzenie techniczne", "planowy postój", 2),
-    ("zdarzenie techniczne", "test systemu", 2),
-    ("zdarzenie techniczne", "brak maszynisty", 3),
-]
-
-
-def _env_int(name: str, default: int) -> int:
-    value = os.getenv(name)
-    if value is None:
-        return default
-    try:
-        parsed = int(value)
-    except ValueError:
-        return default
-    return parsed if parsed > 0 else default
-
-
-T1_CONFIG = SnapshotConfig(
-    name="T1",
-    start=datetime(2023, 1, 1, 0, 0, 0),
-    end=datetime(2024, 6, 30, 23, 59, 59),
-    ride_count=_env_int("RAILGEN_T1_RIDES", 50_000),
-    base_event_rate=0.035,
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import parallel
+from batch_engine import CompiledDimensions
+from changes import (
+    DIMENSION_TABLES,
+    INSERT_SUFFIX,
+    SCD2_SUFFIX,
+    UPDATE_SUFFIX,
+    DimensionChangeLog,
 )
-
-T2_CONFIG = SnapshotConfig(
-    name="T2",
-    start=datetime(2024, 7, 1, 0, 0, 0),
-    end=datetime(2025, 10, 31, 23, 59, 59),
-    ride_count=_env_int("RAILGEN_T2_RIDES", 25_000),
-    base_event_rate=0.033,  # global improvement ~5%
+from checkpoint import CHECKPOINT_FILE, Checkpointer, truncate_files
+from clock import DAY, MINUTE, CalendarIndex, to_epoch
+from compressed import CSV_CODECS
+from config import (
+    COASTAL,
+    EVENT_DEFINITIONS,
+    EVENT_DELAY_RANGES,
+    EVENT_RATE_IMPROVEMENT_DATE,
+    EVENT_REPAIR_COST_RANGES,
+    MOUNTAIN,
+    REGION_CODES,
+    REGIONS,
+    SWITCH_DATE,
+    T1_CONFIG,
+    T2_CONFIG,
+    UPGRADE_DATE,
+    VOIVODESHIPS,
+    RouteTemplate,
+    SnapshotConfig,
+    _env_int,
+    scaled_count_range,
+    scaled_snapshot,
 )
-
-UPGRADE_DATE = datetime(2025, 2, 1, 0, 0, 0)
-SWITCH_DATE = datetime(2025, 3, 1, 0, 0, 0)
-
+from dimensions import (
+    CARGO,
+    CARGO_CODES,
+    GENDERS,
+    OLD,
+    OPERATOR_CODES,
+    PASSENGER,
+    POLREGIO,
+    CrossingTable,
+    DriverTable,
+    StationTable,
+    TrainTable,
+    crossing_flags,
+)
+from eligibility import (
+    EmploymentIndex,
+    resolve_switch_pools,
+    resolve_upgrade_pools,
+)
+from instrumentation import INSTRUMENT_MODES, INSTRUMENTATION, timed
+from names import NameSampler
+from output import (
+    COMPRESSION_CODECS,
+    DIMENSION_COLUMNS,
+    FLUSH_ROWS,
+    OUTPUT_FORMATS,
+    PARTITION_MODES,
+    FactWriters,
+    OutputOptions,
+    TimestampFormatter,
+    write_table,
+)
+from sampling import (
+    CARGO_OPERATOR,
+    OLD_CROSSING,
+    SAMPLERS,
+    SNOW,
+    event_ids_by_type,
+)
+from streams import RANDOM_STREAM_MODES
+from timetable import TIMETABLE_MODES, RouteTimetable, compile_timetables
+from weather import WeatherField
 
 # ---------------------------------------------------------------------------
 # Generator implementation
 # ---------------------------------------------------------------------------
 
 
+FACT_ENGINES = ("batch", "scalar")
+T2_DIMENSION_MODES = ("full", "delta")
+# Id counters saved with checkpoints.
+_ID_COUNTERS = (
+    "next_train_id",
+    "next_crossing_id",
+    "next_driver_id",
+    "next_event_id",
+    "next_ride_id",
+    "next_section_id",
+    "next_event_on_route_id",
+)
+
+
 class RailwayDataGenerator:
-    def __init__(self, output_root: Path, seed: int = 42) -> None:
+    def __init__(
+        self,
+        output_root: Path,
+        seed: int = 42,
+        engine: str = "batch",
+        block_size: int = 4096,
+        workers: int = 1,
+        output: OutputOptions = OutputOptions(),
+        t2_dimensions: str = "full",
+        timetable: str = "random",
+        scale_factor: Optional[float] = None,
+        checkpoint_rides: int = 0,
+        resume: bool = False,
+        random_streams: str = "sequential",
+    ) -> None:
+        if engine not in FACT_ENGINES:
+            raise ValueError(f"Unknown fact engine: {engine}")
+        if t2_dimensions not in T2_DIMENSION_MODES:
+            raise ValueError(f"Unknown T2 dimension mode: {t2_dimensions}")
+        if timetable not in TIMETABLE_MODES:
+            raise ValueError(f"Unknown timetable mode: {timetable}")
+        if engine == "scalar" and output.format != "csv":
+            raise ValueError("The scalar engine only writes CSV output")
+        if engine == "scalar" and output.partition_by != "none":
+            raise ValueError("Partitioned output needs the batch engine")
+        if engine == "scalar" and workers != 1:
+            raise ValueError("--workers needs the batch engine")
+        if random_streams not in RANDOM_STREAM_MODES:
+            raise ValueError(f"Unknown random stream mode: {random_streams}")
+        if engine == "scalar" and random_streams != "sequential":
+            raise ValueError("Counter random streams need the batch engine")
+        if scale_factor is not None and scale_factor <= 0:
+            raise ValueError(f"Scale factor must be positive: {scale_factor}")
+        if checkpoint_rides < 0:
+            raise ValueError("checkpoint_rides must not be negative")
+        if (checkpoint_rides or resume) and (workers != 1 or output.format != "csv"):
+            raise ValueError("Checkpoints need --workers 1 and CSV output")
+        if (checkpoint_rides or resume) and output.partition_by != "none":
+            raise ValueError("Checkpoints need unpartitioned output")
         self.output_root = output_root
+        self.seed = seed
+        self.engine = engine
+        self.block_size = block_size
+        self.workers = workers
+        self.output = output
+        self.t2_dimensions = t2_dimensions
+        self.timetable = timetable
+        self.scale_factor = scale_factor
+        self.random_streams = random_streams
+        self.t1_config, self.t2_config = T1_CONFIG, T2_CONFIG
+        if scale_factor is not None:
+            self.t1_config = scaled_snapshot(T1_CONFIG, scale_factor)
+            self.t2_config = scaled_snapshot(T2_CONFIG, scale_factor)
         self.rng = random.Random(seed)
-        self.fake = Faker("pl_PL")
-        Faker.seed(seed)
+        self.names = NameSampler(seed)
 
-        self.stations: List[StationMeta] = []
+        self.stations = StationTable()
         self.hotspot_station_ids: set[int] = set()
-        self.crossings: Dict[int, CrossingMeta] = {}
+        self.crossings = CrossingTable()
         self.crossings_by_region: Dict[str, List[int]] = defaultdict(list)
         self.crossing_upgrade_map: Dict[int, int] = {}
-        self.trains: Dict[int, Dict[str, str]] = {}
+        self.trains = TrainTable()
         self.train_switch_pairs: Dict[int, int] = {}
-        self.train_switch_reverse: Dict[int, int] = {}
-        self.drivers: Dict[int, Dict[str, object]] = {}
+        self.drivers = DriverTable()
         self.events: Dict[int, Tuple[str, str, int]] = {}
+        self.event_pools: Dict[str, List[int]] = {}
         self.routes: List[RouteTemplate] = []
+        self.timetables: List[RouteTimetable] = []
+        self.weather: Optional[WeatherField] = None
+        self.calendar: Optional[CalendarIndex] = None
+        self.timestamps = TimestampFormatter()
+        self.upgrade_epoch = to_epoch(UPGRADE_DATE)
+        self.switch_epoch = to_epoch(SWITCH_DATE)
+        self.improvement_epoch = to_epoch(EVENT_RATE_IMPROVEMENT_DATE)
+        self.changes = DimensionChangeLog()
+
+        # Selection pools of the scalar engine, see _index_eligibility.
+        self.train_pool: List[int] = []
+        self.trains_before_switch: List[int] = []
+        self.trains_after_switch: List[int] = []
+        self.crossing_pools: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.driver_index: Optional[EmploymentIndex] = None
 
         self.next_train_id = 1
         self.next_crossing_id = 1
@@ -158,30 +197,118 @@ class RailwayDataGenerator:
         self.next_section_id = 1
         self.next_event_on_route_id = 1
 
+        self.resume = resume
+        self.checkpoints: Optional[Checkpointer] = None
+        if checkpoint_rides or resume:
+            self.checkpoints = Checkpointer(
+                output_root / CHECKPOINT_FILE,
+                self._fingerprint(checkpoint_rides),
+                checkpoint_rides,
+            )
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
     def generate(self) -> None:
+        if self.resume:
+            self.checkpoints.load()
         self._prepare_output_dirs()
         self._build_dimensions()
         self._write_dimensions("T1")
-        self._generate_facts(T1_CONFIG, snapshot_dir=self._snapshot_dir("T1"))
+        self._generate_facts(self.t1_config, snapshot_dir=self._snapshot_dir("T1"))
+        self._write_load_script("T1")
         self._augment_dimensions_for_t2()
-        self._write_dimensions("T2")
+        if self.t2_dimensions == "delta":
+            self._write_dimension_changes("T2")
+        else:
+            self._write_dimensions("T2")
         self._generate_facts(
-            T2_CONFIG, snapshot_dir=self._snapshot_dir("T2"), append=False
+            self.t2_config, snapshot_dir=self._snapshot_dir("T2"), append=False
         )
+        self._write_load_script("T2")
+        if self.checkpoints is not None:
+            self.checkpoints.remove()
+
+    def compiled_dimensions(self) -> Dict[str, CompiledDimensions]:
+        """Both snapshots' dimensions as the batch engine sees them.
+
+        Builds the dimensions exactly as ``generate`` does, without writing
+        anything; used to regenerate rides (see ``regenerate``).
+        """
+        self._build_dimensions()
+        dims = {"T1": CompiledDimensions(self)}
+        self._augment_dimensions_for_t2()
+        dims["T2"] = CompiledDimensions(self)
+        return dims
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    def _fingerprint(self, checkpoint_rides: int) -> Dict[str, object]:
+        """Settings that determine the output, see ``Checkpointer``."""
+        return {
+            "seed": self.seed,
+            "engine": self.engine,
+            "block_size": self.block_size,
+            "rides": [self.t1_config.ride_count, self.t2_config.ride_count],
+            "scale_factor": self.scale_factor,
+            "output": asdict(self.output),
+            "t2_dimensions": self.t2_dimensions,
+            "timetable": self.timetable,
+            "random_streams": self.random_streams,
+            # Compressed files end a block at every checkpoint.
+            "checkpoint_rides": checkpoint_rides,
+        }
+
+    def _progress_state(self) -> Dict[str, object]:
+        version, internal, gauss_next = self.rng.getstate()
+        return {
+            "rng": [version, list(internal), gauss_next],
+            "next_ids": {name: getattr(self, name) for name in _ID_COUNTERS},
+        }
+
+    def _restore_progress_state(self, state: Dict[str, object]) -> None:
+        version, internal, gauss_next = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss_next))
+        for name, value in state["next_ids"].items():
+            setattr(self, name, value)
+
+    def _checkpoint_hook(self, snapshot: str) -> Callable:
+        """Callback saving a checkpoint whenever one is due.
+
+        It takes the open fact writers and the engine's progress: the rides
+        written so far and, for the batch engine, its ``run_shard`` state.
+        """
+        checkpoints = self.checkpoints
+
+        def save(writers: FactWriters, engine: Dict[str, object]) -> None:
+            if checkpoints.due(engine["rides"]):
+                checkpoints.save_progress(
+                    snapshot,
+                    engine["rides"],
+                    writers.sync(),
+                    generator=self._progress_state(),
+                    engine=engine,
+                )
+
+        return save
 
     # ------------------------------------------------------------------
     # Dimension preparation
     # ------------------------------------------------------------------
 
+    def _count_range(self, name: str) -> Tuple[int, int]:
+        """Draw range of a scaled dimension count (see ``SCALED_COUNTS``)."""
+        return scaled_count_range(name, self.scale_factor or 1.0)
+
     def _prepare_output_dirs(self) -> None:
         self.output_root.mkdir(parents=True, exist_ok=True)
         for name in ("T1", "T2"):
             (self.output_root / name).mkdir(parents=True, exist_ok=True)
 
+    @timed("build_dimensions")
     def _build_dimensions(self) -> None:
         self._build_stations()
         self._build_crossings()
@@ -189,8 +316,12 @@ class RailwayDataGenerator:
         self._build_drivers()
         self._build_events()
         self._build_routes()
+        self._build_weather()
+        self._build_calendar()
 
+    @timed("augment_dimensions_for_t2")
     def _augment_dimensions_for_t2(self) -> None:
+        self.changes = DimensionChangeLog()
         self._apply_crossing_upgrades()
         self._apply_train_switches()
         self._add_new_drivers_for_t2()
@@ -200,45 +331,31 @@ class RailwayDataGenerator:
     # Station generation
     # ------------------------------------------------------------------
 
+    @timed("build_stations")
     def _build_stations(self) -> None:
         target_count = self.rng.randint(200, 280)
-        used_pairs: set[str] = set()
+        cities, voivodeships = self.names.city_pairs(target_count, VOIVODESHIPS)
         used_station_names: set[str] = set()
-        station_id = 1
 
-        for _ in range(target_count):
-            city, voivodeship = self._unique_city(used_pairs)
+        for city, voivodeship in zip(cities.tolist(), voivodeships.tolist()):
             region = self._classify_region(voivodeship)
             name = f"Stacja {city}"
             if name in used_station_names:
                 suffix = self.rng.randint(1, 9)
                 name = f"Stacja {city} {suffix}"
             used_station_names.add(name)
-            station = StationMeta(
-                station_id=station_id,
+            self.stations.append(
                 name=name,
                 city=city,
                 voivodeship=voivodeship,
-                region=region,
+                region=REGION_CODES[region],
             )
-            self.stations.append(station)
-            station_id += 1
 
         hotspot_count = self.rng.randint(12, 18)
         self.hotspot_station_ids = set(
-            self.rng.sample([s.station_id for s in self.stations], hotspot_count)
+            self.rng.sample(list(self.stations.ids()), hotspot_count)
         )
 
-    def _unique_city(self, used_pairs: set[str]) -> Tuple[str, str]:
-        for _ in range(10_000):
-            city = self.fake.city()
-            voivodeship = self.rng.choice(VOIVODESHIPS)
-            key = f"{city}-{voivodeship}"
-            if key not in used_pairs:
-                used_pairs.add(key)
-                return city, voivodeship
-        raise RuntimeError("Unable to generate unique city names")
-
     def _classify_region(self, voivodeship: str) -> str:
         if voivodeship in COASTAL:
             return "coastal"
@@ -250,9 +367,12 @@ class RailwayDataGenerator:
     # Crossing generation and upgrades
     # ------------------------------------------------------------------
 
+    @timed("build_crossings")
     def _build_crossings(self) -> None:
-        crossing_count = self.rng.randint(4_500, 5_750)
+        crossing_count = self.rng.randint(*self._count_range("crossings"))
         old_share = 0.55
+        station_ids = list(self.stations.ids())
+        station_regions = self.stations.values("region")
 
         for _ in range(crossing_count):
             is_old = self.rng.random() < old_share
@@ -260,104 +380,72 @@ class RailwayDataGenerator:
             has_light = False if is_old else self.rng.random() < 0.85
             is_lit = False if is_old else self.rng.random() < 0.9
             speed_limit = self.rng.randint(30, 100)
-            station = self.rng.choice(self.stations)
-            crossing = CrossingMeta(
-                crossing_id=self.next_crossing_id,
-                has_barriers=has_barriers,
-                has_light_signals=has_light,
-                is_lit=is_lit,
+            station_id = self.rng.choice(station_ids)
+            region = station_regions[station_id]
+            self.crossings.append(
+                flags=crossing_flags(has_barriers, has_light, is_lit, is_old),
                 speed_limit=speed_limit,
-                region=station.region,
-                is_old=is_old,
-                upgrade_target=None,
+                region=region,
             )
-            self.crossings[self.next_crossing_id] = crossing
-            self.crossings_by_region[crossing.region].append(self.next_crossing_id)
+            self.crossings_by_region[REGIONS[region]].append(self.next_crossing_id)
             self.next_crossing_id += 1
 
-        eligible = [
-            cid
-            for cid, meta in self.crossings.items()
-            if meta.is_old and meta.upgrade_target is None
-        ]
-        upgrade_count = self.rng.randint(320, 520)
+        flags = self.crossings.column("flags")
+        upgrade_target = self.crossings.column("upgrade_target")
+        eligible = np.flatnonzero(((flags & OLD) > 0) & (upgrade_target == 0)).tolist()
+        upgrade_count = min(
+            len(eligible), self.rng.randint(*self._count_range("crossing_upgrades"))
+        )
         for cid in self.rng.sample(eligible, upgrade_count):
             self.crossing_upgrade_map[cid] = -1  # placeholder updated later
 
     def _apply_crossing_upgrades(self) -> None:
         for old_id in list(self.crossing_upgrade_map):
-            old_meta = self.crossings[old_id]
-            upgraded = CrossingMeta(
-                crossing_id=self.next_crossing_id,
-                has_barriers=True,
-                has_light_signals=True,
-                is_lit=True,
+            old_meta = self.crossings.view(old_id)
+            self.crossings.append(
+                flags=crossing_flags(True, True, True, False),
                 speed_limit=min(100, old_meta.speed_limit + self.rng.randint(0, 5)),
-                region=old_meta.region,
-                is_old=False,
-                upgrade_target=None,
+                region=REGION_CODES[old_meta.region],
             )
-            self.crossings[self.next_crossing_id] = upgraded
-            self.crossings_by_region[upgraded.region].append(self.next_crossing_id)
+            self.crossings_by_region[old_meta.region].append(self.next_crossing_id)
+            self.changes.record_insert("Przejazd", self.next_crossing_id)
             self.crossing_upgrade_map[old_id] = self.next_crossing_id
-            # mark old meta with pointer for clarity
-            self.crossings[old_id] = CrossingMeta(
-                crossing_id=old_meta.crossing_id,
-                has_barriers=old_meta.has_barriers,
-                has_light_signals=old_meta.has_light_signals,
-                is_lit=old_meta.is_lit,
-                speed_limit=old_meta.speed_limit,
-                region=old_meta.region,
-                is_old=old_meta.is_old,
-                upgrade_target=self.next_crossing_id,
-            )
+            # point the old crossing at its replacement
+            self.crossings.set(old_id, "upgrade_target", self.next_crossing_id)
             self.next_crossing_id += 1
 
     # ------------------------------------------------------------------
     # Train generation and operator switches
     # ------------------------------------------------------------------
 
+    @timed("build_trains")
     def _build_trains(self) -> None:
-        base_count = self.rng.randint(650, 825)
-        operator_weights = {
-            "PKP Intercity": 0.22,
-            "POLREGIO": 0.24,
-            "PKP Cargo": 0.18,
-            "DB Cargo Polska": 0.1,
-            "Koleje Mazowieckie": 0.1,
-            "Koleje Śląskie": 0.08,
-            "Koleje Dolnośląskie": 0.08,
-        }
+        base_count = self.rng.randint(*self._count_range("trains"))
+        operators = SAMPLERS["operator"]
 
         for _ in range(base_count):
-            operator = self._weighted_choice(operator_weights)
-            train_type = "cargo" if "Cargo" in operator else "passenger"
+            operator = operators.draw(self.rng)
+            train_type = CARGO if "Cargo" in operator else PASSENGER
             name = self._build_train_name(operator)
-            self.trains[self.next_train_id] = {
-                "id": self.next_train_id,
-                "name": name,
-                "train_type": train_type,
-                "operator_name": operator,
-            }
+            self.trains.append(
+                name=name, train_type=train_type, operator=OPERATOR_CODES[operator]
+            )
             self.next_train_id += 1
 
     def _apply_train_switches(self) -> None:
-        candidates = [
-            tid for tid, t in self.trains.items() if t["operator_name"] == "PKP Cargo"
-        ]
-        switch_count = min(len(candidates), self.rng.randint(32, 58))
+        candidates = self.trains.with_operator("PKP Cargo")
+        switch_count = min(
+            len(candidates), self.rng.randint(*self._count_range("train_switches"))
+        )
         switched = self.rng.sample(candidates, switch_count)
         for old_id in switched:
-            old_train = self.trains[old_id]
-            new_train = {
-                "id": self.next_train_id,
-                "name": f"{old_train['name']}-DB",
-                "train_type": old_train["train_type"],
-                "operator_name": "DB Cargo Polska",
-            }
-            self.trains[self.next_train_id] = new_train
+            self.trains.append(
+                name=f"{self.trains.values('name')[old_id]}-DB",
+                train_type=self.trains.values("train_type")[old_id],
+                operator=OPERATOR_CODES["DB Cargo Polska"],
+            )
+            self.changes.record_insert("Pociag", self.next_train_id)
             self.train_switch_pairs[old_id] = self.next_train_id
-            self.train_switch_reverse[self.next_train_id] = old_id
             self.next_train_id += 1
 
     def _build_train_name(self, operator: str) -> str:
@@ -381,19 +469,32 @@ class RailwayDataGenerator:
     # Driver dimension and augmentation
     # ------------------------------------------------------------------
 
+    @timed("build_drivers")
     def _build_drivers(self) -> None:
-        base_count = self.rng.randint(2_250, 2_900)
-        for _ in range(base_count):
-            record = self._make_driver()
-            self.drivers[self.next_driver_id] = record
-            self.next_driver_id += 1
+        base_count = self.rng.randint(*self._count_range("drivers"))
+        self._add_drivers(base_count)
 
     def _add_new_drivers_for_t2(self) -> None:
-        hires = self.rng.randint(250, 400)
-        for _ in range(hires):
-            record = self._make_driver(min_employment_year=2023)
-            self.drivers[self.next_driver_id] = record
+        hires = self.rng.randint(*self._count_range("driver_hires"))
+        for driver_id in self._add_drivers(hires, min_employment_year=2023):
+            self.changes.record_insert("Maszynista", driver_id)
+
+    def _add_drivers(self, count: int, min_employment_year: int = 1990) -> range:
+        """Create ``count`` drivers with pre-drawn names; returns their ids."""
+        male = self.names.rng.random(count) < 0.82
+        first_names = self.names.first_names(male).tolist()
+        last_names = self.names.surnames(count).tolist()
+        first_id = self.next_driver_id
+        for idx in range(count):
+            self.drivers.append(
+                first_name=first_names[idx],
+                last_name=last_names[idx],
+                **self._make_driver(
+                    "man" if male[idx] else "woman", min_employment_year
+                ),
+            )
             self.next_driver_id += 1
+        return range(first_id, self.next_driver_id)
 
     def _update_driver_surnames_for_t2(self) -> None:
         """Update some driver surnames in T2 to simulate data changes over time.
@@ -408,8 +509,8 @@ class RailwayDataGenerator:
         # Get all drivers that existed in T1 (employment_year < 2023)
         t1_driver_ids = [
             driver_id
-            for driver_id, driver in self.drivers.items()
-            if int(driver["employment_year"]) < 2023
+            for driver_id, year in self.drivers.employment_years().items()
+            if year < 2023
         ]
 
         if not t1_driver_ids:
@@ -421,19 +522,18 @@ class RailwayDataGenerator:
             t1_driver_ids, min(update_count, len(t1_driver_ids))
         )
 
-        for driver_id in drivers_to_update:
-            driver = self.drivers[driver_id]
+        new_surnames = self.names.surnames(len(drivers_to_update)).tolist()
+        for driver_id, surname in zip(drivers_to_update, new_surnames):
+            self.changes.record_update(
+                "Maszynista", driver_id, self.drivers.row(driver_id)
+            )
             # Generate a new surname (simulating name change)
-            driver["last_name"] = self.fake.last_name()
-
-    def _make_driver(self, min_employment_year: int = 1990) -> Dict[str, object]:
-        gender = "man" if self.rng.random() < 0.82 else "woman"
-        first_name = (
-            self.fake.first_name_male()
-            if gender == "man"
-            else self.fake.first_name_female()
-        )
-        last_name = self.fake.last_name()
+            self.drivers.set(driver_id, "last_name", surname)
+
+    def _make_driver(
+        self, gender: str, min_employment_year: int = 1990
+    ) -> Dict[str, object]:
+        """Drawn attributes of one driver other than the name."""
         age = self.rng.randint(23, 62)
         current_year = 2025
         max_year = min(current_year, current_year - (age - 21))
@@ -449,10 +549,7 @@ class RailwayDataGenerator:
         pesel = self._generate_pesel(birth_date, gender)
 
         return {
-            "id": self.next_driver_id,
-            "first_name": first_name,
-            "last_name": last_name,
-            "gender": gender,
+            "gender": GENDERS.index(gender),
             "age": age,
             "employment_year": employment_year,
             "pesel": pesel,
@@ -517,18 +614,21 @@ class RailwayDataGenerator:
     # Event dimension
     # ------------------------------------------------------------------
 
+    @timed("build_events")
     def _build_events(self) -> None:
         for event_type, category, danger in EVENT_DEFINITIONS:
             self.events[self.next_event_id] = (event_type, category, danger)
             self.next_event_id += 1
+        self.event_pools = event_ids_by_type(self.events)
 
     # ------------------------------------------------------------------
     # Route preparation
     # ------------------------------------------------------------------
 
+    @timed("build_routes")
     def _build_routes(self) -> None:
         route_count = self.rng.randint(120, 170)
-        station_ids = [s.station_id for s in self.stations]
+        station_ids = list(self.stations.ids())
         used_pairs: set[str] = set()
 
         for _ in range(route_count):
@@ -548,195 +648,204 @@ class RailwayDataGenerator:
                 )
             )
 
+        departures_rng = None
+        if self.timetable == "repeating":
+            departures_rng = np.random.Generator(
+                np.random.PCG64(np.random.SeedSequence([self.seed, 0x74696D65]))
+            )
+        self.timetables = compile_timetables(
+            self.routes,
+            self.stations.column("region"),
+            self.hotspot_station_ids,
+            departures_rng,
+        )
+
+    def _fact_window(self) -> Tuple[datetime, datetime]:
+        """First and last moment any scheduled section departure can have."""
+        longest = max(timetable.total_minutes for timetable in self.timetables)
+        return self.t1_config.start, self.t2_config.end + timedelta(minutes=longest)
+
+    @timed("build_weather")
+    def _build_weather(self) -> None:
+        start, end = self._fact_window()
+        self.weather = WeatherField(self.seed, start=start, end=end)
+
+    @timed("build_calendar")
+    def _build_calendar(self) -> None:
+        self.calendar = CalendarIndex(*self._fact_window())
+
     # ------------------------------------------------------------------
     # Dimensions writing
     # ------------------------------------------------------------------
 
+    @timed("write_dimensions", label_arg=0)
     def _write_dimensions(self, snapshot: str) -> None:
         snapshot_dir = self._snapshot_dir(snapshot)
-        self._write_station_csv(snapshot_dir)
-        self._write_crossing_csv(snapshot_dir)
-        self._write_train_csv(snapshot_dir)
-        self._write_driver_csv(snapshot_dir)
-        self._write_event_csv(snapshot_dir)
-
-    def _write_station_csv(self, snapshot_dir: Path) -> None:
-        path = snapshot_dir / "Stacja.csv"
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh, lineterminator="\n")
-            writer.writerow(["id", "nazwa", "miasto"])
-            for station in self.stations:
-                writer.writerow([station.station_id, station.name, station.city])
-
-    def _write_crossing_csv(self, snapshot_dir: Path) -> None:
-        path = snapshot_dir / "Przejazd.csv"
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh, lineterminator="\n")
-            writer.writerow(
-                [
-                    "id",
-                    "czy_rogatki",
-                    "czy_sygnalizacja_swietlna",
-                    "czy_oswietlony",
-                    "dopuszczalna_predkosc",
-                ]
+        for table, records in self._dimension_records().items():
+            write_table(
+                snapshot_dir,
+                table,
+                DIMENSION_COLUMNS[table],
+                [records[row_id] for row_id in sorted(records)],
+                self.output,
             )
-            for crossing in sorted(
-                self.crossings.values(), key=lambda c: c.crossing_id
+
+    @timed("write_dimension_changes", label_arg=0)
+    def _write_dimension_changes(self, snapshot: str) -> None:
+        """Write only the rows changed since the previous snapshot."""
+        snapshot_dir = self._snapshot_dir(snapshot)
+        records = self._dimension_records()
+        for table in DIMENSION_TABLES:
+            columns = DIMENSION_COLUMNS[table]
+            for suffix, ids in (
+                (INSERT_SUFFIX, self.changes.inserts(table)),
+                (UPDATE_SUFFIX, self.changes.updates(table)),
             ):
-                writer.writerow(
-                    [
-                        crossing.crossing_id,
-                        int(crossing.has_barriers),
-                        int(crossing.has_light_signals),
-                        int(crossing.is_lit),
-                        crossing.speed_limit,
-                    ]
-                )
+                rows = [records[table][row_id] for row_id in ids]
+                write_table(snapshot_dir, table, columns, rows, self.output, suffix)
+        write_table(
+            snapshot_dir,
+            "Maszynista",
+            DIMENSION_COLUMNS["Maszynista"] + ["czy_aktualne"],
+            self.changes.scd2_rows("Maszynista", records["Maszynista"]),
+            self.output,
+            SCD2_SUFFIX,
+        )
 
-    def _write_train_csv(self, snapshot_dir: Path) -> None:
-        path = snapshot_dir / "Pociag.csv"
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh, lineterminator="\n")
-            writer.writerow(["id", "nazwa", "typ_pociagu", "operator"])
-            for train_id in sorted(self.trains):
-                train = self.trains[train_id]
-                writer.writerow(
-                    [
-                        train["id"],
-                        train["name"],
-                        train["train_type"],
-                        train["operator_name"],
-                    ]
-                )
+    def _write_load_script(self, snapshot: str) -> None:
+        """``load.sh`` bulk inserting a snapshot's native files (bcp output)."""
+        if self.output.format == "bcp":
+            from native import write_load_script
 
-    def _write_driver_csv(self, snapshot_dir: Path) -> None:
-        path = snapshot_dir / "Maszynista.csv"
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh, lineterminator="\n")
-            writer.writerow(
-                ["id", "imie", "nazwisko", "pesel", "plec", "wiek", "rok_zatrudnienia"]
-            )
-            for driver_id in sorted(self.drivers):
-                driver = self.drivers[driver_id]
-                writer.writerow(
-                    [
-                        driver["id"],
-                        driver["first_name"],
-                        driver["last_name"],
-                        driver["pesel"],
-                        driver["gender"],
-                        driver["age"],
-                        driver["employment_year"],
-                    ]
-                )
+            write_load_script(self._snapshot_dir(snapshot), snapshot, self.output)
 
-    def _write_event_csv(self, snapshot_dir: Path) -> None:
-        path = snapshot_dir / "Zdarzenie.csv"
-        with path.open("w", newline="", encoding="utf-8") as fh:
-            writer = csv.writer(fh, lineterminator="\n")
-            writer.writerow(
-                ["id", "typ_zdarzenia", "kategoria", "skala_niebezpieczenstwa"]
-            )
-            for event_id in sorted(self.events):
-                event_type, category, danger = self.events[event_id]
-                writer.writerow([event_id, event_type, category, danger])
+    def _dimension_records(self) -> Dict[str, Dict[int, tuple]]:
+        """Exported rows of every dimension table, keyed by id."""
+        return {
+            "Stacja": self.stations.rows(),
+            "Przejazd": self.crossings.rows(),
+            "Pociag": self.trains.rows(),
+            "Maszynista": self.drivers.rows(),
+            "Zdarzenie": {
+                event_id: (event_id, *self.events[event_id]) for event_id in self.events
+            },
+        }
 
     # ------------------------------------------------------------------
     # Fact generation driver
     # ------------------------------------------------------------------
 
+    @timed("generate_facts", label_arg=0)
     def _generate_facts(
         self,
         config: SnapshotConfig,
         snapshot_dir: Path,
         append: bool = False,
     ) -> None:
-        ride_mode = "a" if append else "w"
-        section_mode = "a" if append else "w"
-        event_mode = "a" if append else "w"
-        weather_mode = "a" if append else "w"
-
-        ride_path = snapshot_dir / "Kurs.csv"
-        section_path = snapshot_dir / "Odcinek_kursu.csv"
-        event_path = snapshot_dir / "Zdarzenie_na_trasie.csv"
-        weather_path = snapshot_dir / "Weather.csv"
-
-        ride_file = ride_path.open(ride_mode, newline="", encoding="utf-8")
-        section_file = section_path.open(section_mode, newline="", encoding="utf-8")
-        event_file = event_path.open(event_mode, newline="", encoding="utf-8")
-        weather_file = weather_path.open(weather_mode, newline="", encoding="utf-8")
-
-        ride_writer = csv.writer(ride_file, lineterminator="\n")
-        section_writer = csv.writer(section_file, lineterminator="\n")
-        event_writer = csv.writer(event_file, lineterminator="\n")
-        weather_writer = csv.writer(weather_file, lineterminator="\n")
-
-        if not append:
-            ride_writer.writerow(
-                [
-                    "id",
-                    "nazwa_trasy",
-                    "roznica_czasu",
-                    "planowa_data_odjazdu",
-                    "planowa_data_przyjazdu",
-                    "pociag_id",
-                    "maszynista_id",
-                ]
-            )
-            section_writer.writerow(
-                [
-                    "id",
-                    "kurs_id",
-                    "numer_etapu_kursu",
-                    "stacja_wyjazdowa_id",
-                    "stacja_wjazdowa_id",
-                    "roznica_czasu",
-                    "planowa_data_przyjazdu",
-                    "planowa_data_odjazdu",
-                ]
-            )
-            event_writer.writerow(
-                [
-                    "id",
-                    "odcinek_kursu_id",
-                    "przejazd_id",
-                    "zdarzenie_id",
-                    "wywolane_opoznienie",
-                    "liczba_rannych",
-                    "liczba_zgonow",
-                    "koszt_naprawy",
-                    "czy_interwencja_sluzb",
-                    "data",
-                    "predkosc",
-                ]
-            )
-            weather_writer.writerow(
-                [
-                    "id_odcinka",
-                    "data_pomiaru",
-                    "temperatura",
-                    "ilosc_opadow",
-                    "typ_opadow",
-                ]
-            )
+        progress = None
+        if self.checkpoints is not None:
+            completed = self.checkpoints.completed(config.name)
+            if completed is not None:
+                self._restore_progress_state(completed)
+                return
+            progress = self.checkpoints.progress(config.name)
+            if progress is not None:
+                self._restore_progress_state(progress["generator"])
+                truncate_files(snapshot_dir, progress["files"])
+                append = True
+            self.checkpoints.start_snapshot(progress["rides_done"] if progress else 0)
+
+        first_ids = (
+            self.next_ride_id,
+            self.next_section_id,
+            self.next_event_on_route_id,
+        )
+        if self.engine == "scalar":
+            on_ride = None
+            if self.checkpoints is not None:
+                save = self._checkpoint_hook(config.name)
+
+                def on_ride(rides: int) -> None:
+                    save(writers, {"rides": rides})
+
+            with FactWriters(
+                snapshot_dir,
+                append=append,
+                flush_rows=self.output.flush_rows,
+                compression=self.output.csv_compression,
+                compression_threads=self.output.compression_threads,
+                pipeline_depth=self.output.pipeline_depth,
+            ) as writers:
+                self._generate_facts_scalar(
+                    config,
+                    writers.ride,
+                    writers.section,
+                    writers.event,
+                    writers.weather,
+                    first_ride=progress["rides_done"] if progress else 0,
+                    on_ride=on_ride,
+                )
+            self._count_facts(*first_ids)
+            self._complete_snapshot(config.name)
+            return
 
-        routes_pool = self.routes
-        trains_pool = list(self.trains.keys())
-        drivers_pool = list(self.drivers.keys())
+        rides, sections, events = parallel.generate_facts(
+            CompiledDimensions(self),
+            config,
+            snapshot_dir,
+            seed=self.seed,
+            workers=self.workers,
+            block_size=self.block_size,
+            first_ride_id=self.next_ride_id,
+            first_section_id=self.next_section_id,
+            first_event_id=self.next_event_on_route_id,
+            append=append,
+            output=self.output,
+            resume=progress["engine"] if progress else None,
+            on_block=self._checkpoint_hook(config.name) if self.checkpoints else None,
+            random_streams=self.random_streams,
+        )
+        self.next_ride_id += rides
+        self.next_section_id += sections
+        self.next_event_on_route_id += events
+        self._count_facts(*first_ids)
+        self._complete_snapshot(config.name)
+
+    def _complete_snapshot(self, snapshot: str) -> None:
+        if self.checkpoints is not None:
+            self.checkpoints.save_completed(snapshot, self._progress_state())
+
+    def _count_facts(
+        self, first_ride_id: int, first_section_id: int, first_event_id: int
+    ) -> None:
+        INSTRUMENTATION.count("rides", self.next_ride_id - first_ride_id)
+        INSTRUMENTATION.count("sections", self.next_section_id - first_section_id)
+        INSTRUMENTATION.count("events", self.next_event_on_route_id - first_event_id)
 
-        for _ in range(config.ride_count):
-            route = self.rng.choice(routes_pool)
-            schedule_start = self._random_datetime(config.start, config.end)
+    def _generate_facts_scalar(
+        self,
+        config: SnapshotConfig,
+        ride_writer: csv.writer,
+        section_writer: csv.writer,
+        event_writer: csv.writer,
+        weather_writer: csv.writer,
+        first_ride: int = 0,
+        on_ride: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        """Write rides ``first_ride`` onwards; ``on_ride`` gets the count done."""
+        timetables = self.timetables
+        self._index_eligibility()
+        snapshot_start, snapshot_end = to_epoch(config.start), to_epoch(config.end)
+        stamp = self.timestamps.format_one
+
+        for ride_index in range(first_ride, config.ride_count):
+            route = self.rng.choice(timetables)
+            schedule_start = self._ride_start(snapshot_start, snapshot_end, route)
             train_id = self._select_train_for_snapshot(
                 snapshot_name=config.name,
                 schedule_start=schedule_start,
-                trains_pool=trains_pool,
-            )
-            driver_id = self._select_driver_for_snapshot(
-                schedule_start=schedule_start,
-                drivers_pool=drivers_pool,
             )
+            driver_id = self._select_driver_for_snapshot(schedule_start)
             ride_total_delay = 0.0
 
             ride_sections = self._build_sections_for_ride(
@@ -749,7 +858,7 @@ class RailwayDataGenerator:
                 weather_writer=weather_writer,
                 section_writer=section_writer,
                 event_writer=event_writer,
-                snapshot_end=config.end,
+                snapshot_end=snapshot_end,
             )
 
             ride_total_delay = sum(
@@ -763,19 +872,16 @@ class RailwayDataGenerator:
                     self.next_ride_id,
                     route.name,
                     int(round(ride_total_delay)),
-                    schedule_start.strftime("%Y-%m-%d %H:%M:%S"),
-                    scheduled_arrival.strftime("%Y-%m-%d %H:%M:%S"),
+                    stamp(schedule_start),
+                    stamp(scheduled_arrival),
                     train_id,
                     driver_id,
                 ]
             )
 
             self.next_ride_id += 1
-
-        ride_file.close()
-        section_file.close()
-        event_file.close()
-        weather_file.close()
+            if on_ride is not None:
+                on_ride(ride_index + 1)
 
     # ------------------------------------------------------------------
     # Section, event, and weather generation per ride
@@ -783,31 +889,38 @@ class RailwayDataGenerator:
 
     def _build_sections_for_ride(
         self,
-        route: RouteTemplate,
+        route: RouteTimetable,
         ride_id: int,
         train_id: int,
         driver_id: int,
-        schedule_start: datetime,
+        schedule_start: int,
         base_event_rate: float,
         weather_writer: csv.writer,
         section_writer: csv.writer,
         event_writer: csv.writer,
-        snapshot_end: datetime,
+        snapshot_end: int,
     ) -> List[Dict[str, object]]:
-        driver = self.drivers[driver_id]
-        train = self.trains[train_id]
-        schedule_cursor = schedule_start
+        stamp = self.timestamps.format_one
+        operator = self.trains.values("operator")[train_id]
+        is_passenger = self.trains.values("train_type")[train_id] == PASSENGER
+        employment_year = self.drivers.values("employment_year")[driver_id]
         sections_meta: List[Dict[str, object]] = []
 
-        for idx, (dep, arr, minutes) in enumerate(self._sections_iter(route)):
-            scheduled_departure = schedule_cursor
-            scheduled_arrival = scheduled_departure + timedelta(minutes=minutes)
-            weather = self._sample_weather(scheduled_departure, arr)
+        for idx, (
+            dep,
+            arr,
+            is_hotspot,
+            region,
+            departure_offset,
+            arrival_offset,
+        ) in enumerate(route.section_rows):
+            scheduled_departure = schedule_start + departure_offset
+            scheduled_arrival = schedule_start + arrival_offset
+            weather = self._sample_weather(scheduled_departure, region)
             delay_minutes = self._calculate_delay_minutes(
-                dep_station_id=dep,
-                arr_station_id=arr,
-                train=train,
-                driver=driver,
+                is_hotspot=is_hotspot,
+                operator=operator,
+                employment_year=employment_year,
                 weather=weather,
                 scheduled_departure=scheduled_departure,
             )
@@ -816,8 +929,9 @@ class RailwayDataGenerator:
             event_data = self._maybe_create_event(
                 base_event_rate=base_event_rate,
                 crossing_id=crossing_choice,
-                train=train,
-                driver=driver,
+                operator=operator,
+                is_passenger=is_passenger,
+                employment_year=employment_year,
                 weather=weather,
                 scheduled_departure=scheduled_departure,
                 snapshot_end=snapshot_end,
@@ -840,7 +954,7 @@ class RailwayDataGenerator:
                         event_data["death_count"],
                         f"{event_data['repair_cost']:.2f}",
                         int(event_data["emergency_intervention"]),
-                        event_data["event_date"].strftime("%Y-%m-%d %H:%M:%S"),
+                        stamp(event_data["event_date"]),
                         event_data["train_speed"],
                     ]
                 )
@@ -854,15 +968,15 @@ class RailwayDataGenerator:
                     dep,
                     arr,
                     int(round(delay_minutes)),
-                    scheduled_arrival.strftime("%Y-%m-%d %H:%M:%S"),
-                    scheduled_departure.strftime("%Y-%m-%d %H:%M:%S"),
+                    stamp(scheduled_arrival),
+                    stamp(scheduled_departure),
                 ]
             )
 
             weather_writer.writerow(
                 [
                     self.next_section_id,
-                    scheduled_departure.strftime("%Y-%m-%d %H:%M:%S"),
+                    stamp(scheduled_departure),
                     f"{weather['temperature']:.1f}",
                     f"{weather['precipitation_amount']:.1f}",
                     weather["precipitation_type"],
@@ -877,55 +991,40 @@ class RailwayDataGenerator:
             )
 
             self.next_section_id += 1
-            schedule_cursor = scheduled_arrival
 
         return sections_meta
 
-    def _sections_iter(self, route: RouteTemplate) -> Iterator[Tuple[int, int, int]]:
-        for idx in range(len(route.station_ids) - 1):
-            yield (
-                route.station_ids[idx],
-                route.station_ids[idx + 1],
-                route.section_minutes[idx],
-            )
-
     # ------------------------------------------------------------------
     # Delay calculation and contributing factors
     # ------------------------------------------------------------------
 
     def _calculate_delay_minutes(
         self,
-        dep_station_id: int,
-        arr_station_id: int,
-        train: Dict[str, object],
-        driver: Dict[str, object],
+        is_hotspot: bool,
+        operator: int,
+        employment_year: int,
         weather: Dict[str, object],
-        scheduled_departure: datetime,
+        scheduled_departure: int,
     ) -> float:
-        is_hotspot = (
-            dep_station_id in self.hotspot_station_ids
-            or arr_station_id in self.hotspot_station_ids
-        )
+        hour, weekday, year = self.calendar.fields(scheduled_departure)
         base_noise = self.rng.gauss(0.0, 1.5)
         delay = base_noise + (self.rng.uniform(2, 4) if is_hotspot else 0.0)
 
-        hour = scheduled_departure.hour
         if 7 <= hour <= 9 or 16 <= hour <= 18:
             delay += self.rng.uniform(0.5, 2.5)
 
-        if scheduled_departure.weekday() == 4:
+        if weekday == 4:
             delay += self.rng.uniform(0.3, 1.8)
 
-        experience = scheduled_departure.year - int(driver["employment_year"])
+        experience = year - employment_year
         if experience < 3:
             delay *= self.rng.uniform(1.12, 1.28)
         elif experience > 5:
             delay *= self.rng.uniform(0.82, 0.92)
 
-        operator = train["operator_name"]
-        if operator == "POLREGIO":
+        if operator == POLREGIO:
             delay += self.rng.uniform(0.5, 2.0)
-        elif operator in {"PKP Cargo", "DB Cargo Polska"}:
+        elif operator in CARGO_CODES:
             delay += self.rng.uniform(-0.5, 1.0)
 
         weather_type = weather["precipitation_type"]
@@ -947,22 +1046,23 @@ class RailwayDataGenerator:
         self,
         base_event_rate: float,
         crossing_id: Optional[int],
-        train: Dict[str, object],
-        driver: Dict[str, object],
+        operator: int,
+        is_passenger: bool,
+        employment_year: int,
         weather: Dict[str, object],
-        scheduled_departure: datetime,
-        snapshot_end: datetime,
+        scheduled_departure: int,
+        snapshot_end: int,
     ) -> Optional[Dict[str, object]]:
         probability = base_event_rate
-        crossing_meta = self.crossings.get(crossing_id) if crossing_id else None
+        if crossing_id:
+            flags = self.crossings.values("flags")[crossing_id]
+            upgrade_target = self.crossings.values("upgrade_target")[crossing_id]
+        else:
+            flags = upgrade_target = 0
 
-        if crossing_meta is not None and crossing_meta.is_old:
+        if flags & OLD:
             probability *= 1.45
-        if (
-            crossing_meta is not None
-            and crossing_meta.upgrade_target is not None
-            and scheduled_departure >= UPGRADE_DATE
-        ):
+        if upgrade_target and scheduled_departure >= self.upgrade_epoch:
             probability *= 0.8
 
         if weather["precipitation_type"] in {"deszcz", "snieg"}:
@@ -970,34 +1070,35 @@ class RailwayDataGenerator:
         if weather["precipitation_amount"] >= 8.0:
             probability *= 1.3
 
-        experience = scheduled_departure.year - int(driver["employment_year"])
+        _, _, year = self.calendar.fields(scheduled_departure)
+        experience = year - employment_year
         if experience < 3:
             probability *= 1.2
         elif experience > 5:
             probability *= 0.92
 
         if (
-            scheduled_departure >= datetime(2025, 1, 1)
+            scheduled_departure >= self.improvement_epoch
             and scheduled_departure <= snapshot_end
         ):
             probability *= 0.95
 
-        if train["operator_name"] == "POLREGIO":
+        if operator == POLREGIO:
             probability *= 1.1
-        elif train["operator_name"] in {"DB Cargo Polska", "PKP Cargo"}:
+        elif operator in CARGO_CODES:
             probability *= 0.95
 
         probability = min(0.35, probability)
         if self.rng.random() >= probability:
             return None
 
-        event_id, event_type = self._pick_event_type(weather, train, crossing_meta)
+        event_id, event_type = self._pick_event_type(weather, operator, flags)
         caused_delay = self._event_delay_minutes(event_type)
         injured, deaths = self._event_casualties(event_type)
         repair_cost = self._event_repair_cost(event_type)
         emergency = event_type in {"wypadek", "awaria"}
-        event_time = scheduled_departure + timedelta(minutes=self.rng.uniform(2, 10))
-        train_speed = self._event_speed(train, crossing_meta)
+        event_time = scheduled_departure + int(self.rng.uniform(2, 10) * MINUTE)
+        train_speed = self._event_speed(is_passenger, crossing_id)
 
         return {
             "crossing_id": crossing_id,
@@ -1014,38 +1115,24 @@ class RailwayDataGenerator:
     def _pick_event_type(
         self,
         weather: Dict[str, object],
-        train: Dict[str, object],
-        crossing_meta: Optional[CrossingMeta],
+        operator: int,
+        crossing_flags: int,
     ) -> Tuple[int, str]:
-        weights = {
-            "wypadek": 0.06,
-            "incydent": 0.5,
-            "awaria": 0.22,
-            "zdarzenie techniczne": 0.22,
-        }
-        if crossing_meta is not None and crossing_meta.is_old:
-            weights["wypadek"] += 0.04
-            weights["awaria"] += 0.03
+        condition = 0
+        if crossing_flags & OLD:
+            condition |= OLD_CROSSING
         if weather["precipitation_type"] == "snieg":
-            weights["incydent"] += 0.05
-            weights["awaria"] += 0.04
-        if train["operator_name"] in {"PKP Cargo", "DB Cargo Polska"}:
-            weights["awaria"] += 0.04
-            weights["incydent"] -= 0.02
-
-        event_type = self._weighted_choice(weights)
-        candidates = [eid for eid, data in self.events.items() if data[0] == event_type]
-        event_id = self.rng.choice(candidates)
+            condition |= SNOW
+        if operator in CARGO_CODES:
+            condition |= CARGO_OPERATOR
+
+        event_type = SAMPLERS["event_type"].draw(self.rng, condition)
+        event_id = self.rng.choice(self.event_pools[event_type])
         return event_id, event_type
 
     def _event_delay_minutes(self, event_type: str) -> float:
-        if event_type == "wypadek":
-            return self.rng.uniform(25, 90)
-        if event_type == "awaria":
-            return self.rng.uniform(10, 45)
-        if event_type == "incydent":
-            return self.rng.uniform(5, 25)
-        return self.rng.uniform(2, 12)
+        low, high = EVENT_DELAY_RANGES[event_type]
+        return self.rng.uniform(low, high)
 
     def _event_casualties(self, event_type: str) -> Tuple[int, int]:
         if event_type == "wypadek":
@@ -1057,22 +1144,14 @@ class RailwayDataGenerator:
         return 0, 0
 
     def _event_repair_cost(self, event_type: str) -> float:
-        if event_type == "wypadek":
-            return self.rng.uniform(40_000, 180_000)
-        if event_type == "awaria":
-            return self.rng.uniform(10_000, 40_000)
-        if event_type == "incydent":
-            return self.rng.uniform(1_000, 6_000)
-        return self.rng.uniform(500, 3_000)
-
-    def _event_speed(
-        self, train: Dict[str, object], crossing_meta: Optional[CrossingMeta]
-    ) -> int:
-        base_speed = 110 if train["train_type"] == "passenger" else 90
-        if crossing_meta is not None:
-            base_speed = min(
-                base_speed, crossing_meta.speed_limit + self.rng.randint(-10, 5)
-            )
+        low, high = EVENT_REPAIR_COST_RANGES[event_type]
+        return self.rng.uniform(low, high)
+
+    def _event_speed(self, is_passenger: bool, crossing_id: Optional[int]) -> int:
+        base_speed = 110 if is_passenger else 90
+        if crossing_id:
+            speed_limit = self.crossings.values("speed_limit")[crossing_id]
+            base_speed = min(base_speed, speed_limit + self.rng.randint(-10, 5))
         return max(30, min(160, base_speed))
 
     # ------------------------------------------------------------------
@@ -1080,155 +1159,70 @@ class RailwayDataGenerator:
     # ------------------------------------------------------------------
 
     def _select_crossing(
-        self, weather: Dict[str, object], scheduled_departure: datetime
+        self, weather: Dict[str, object], scheduled_departure: int
     ) -> Optional[int]:
-        region = weather["region"]
-        if region not in self.crossings_by_region:
+        pools = self.crossing_pools.get(weather["region"])
+        if pools is None:
             return None
-        crossing_id = self.rng.choice(self.crossings_by_region[region])
-        crossing_meta = self.crossings[crossing_id]
-        if (
-            crossing_meta.is_old
-            and crossing_meta.upgrade_target
-            and scheduled_departure >= UPGRADE_DATE
-        ):
-            return crossing_meta.upgrade_target
-        return crossing_id
+        before, after = pools
+        return self.rng.choice(
+            after if scheduled_departure >= self.upgrade_epoch else before
+        )
 
     # ------------------------------------------------------------------
     # Train and driver selection under constraints
     # ------------------------------------------------------------------
 
+    def _index_eligibility(self) -> None:
+        """Resolve the time-dependent selection pools of the current dimensions."""
+        self.train_pool = list(self.trains)
+        self.trains_before_switch, self.trains_after_switch = resolve_switch_pools(
+            self.train_pool, self.train_switch_pairs
+        )
+        self.crossing_pools = resolve_upgrade_pools(
+            self.crossings_by_region, self.crossings.column("upgrade_target")
+        )
+        self.driver_index = EmploymentIndex(self.drivers.employment_years())
+
     def _select_train_for_snapshot(
-        self,
-        snapshot_name: str,
-        schedule_start: datetime,
-        trains_pool: List[int],
+        self, snapshot_name: str, schedule_start: int
     ) -> int:
-        candidate = self.rng.choice(trains_pool)
-
         if snapshot_name != "T2":
-            return candidate
+            return self.rng.choice(self.train_pool)
+        if schedule_start < self.switch_epoch:
+            return self.rng.choice(self.trains_before_switch)
+        return self.rng.choice(self.trains_after_switch)
 
-        if schedule_start < SWITCH_DATE:
-            if candidate in self.train_switch_pairs.values():
-                return self.train_switch_reverse.get(candidate, candidate)
-            return candidate
-
-        if candidate in self.train_switch_pairs:
-            return self.train_switch_pairs[candidate]
-        if candidate in self.train_switch_pairs.values():
-            return candidate
-
-        reverse_candidate = self.train_switch_reverse.get(candidate)
-        if reverse_candidate and schedule_start >= SWITCH_DATE:
-            if self.rng.random() < 0.7:
-                return candidate
-        return candidate
-
-    def _select_driver_for_snapshot(
-        self,
-        schedule_start: datetime,
-        drivers_pool: List[int],
-    ) -> int:
-        while True:
-            candidate = self.rng.choice(drivers_pool)
-            driver = self.drivers[candidate]
-            employment_year = int(driver["employment_year"])
-            if employment_year <= schedule_start.year:
-                return candidate
+    def _select_driver_for_snapshot(self, schedule_start: int) -> int:
+        _, _, year = self.calendar.fields(schedule_start)
+        return self.driver_index.draw(self.rng, year)
 
     # ------------------------------------------------------------------
     # Weather sampling respecting seasonality and region effects
     # ------------------------------------------------------------------
 
-    def _sample_weather(
-        self, timestamp: datetime, station_id: int
-    ) -> Dict[str, object]:
-        station = self._station_by_id(station_id)
-        month = timestamp.month
-        base_temp = self._base_temperature(month)
-        region_offset = {"coastal": 1.5, "mountain": -3.0, "central": 0.0}
-        mean_temp = base_temp + region_offset.get(station.region, 0.0)
-        temperature = self.rng.gauss(mean_temp, 4.0)
-        temperature = max(-30.0, min(temperature, 40.0))
-
-        precipitation_amount = self._precipitation_amount(month, station.region)
-        precipitation_type = self._precipitation_type(month, precipitation_amount)
-
+    def _sample_weather(self, seconds: int, region: str) -> Dict[str, object]:
+        temperature, amount, precipitation_type = self.weather.at(
+            REGION_CODES[region], seconds
+        )
         return {
             "temperature": temperature,
-            "precipitation_amount": precipitation_amount,
+            "precipitation_amount": amount,
             "precipitation_type": precipitation_type,
-            "region": station.region,
-        }
-
-    def _base_temperature(self, month: int) -> float:
-        month_means = {
-            1: -2.0,
-            2: 0.0,
-            3: 4.0,
-            4: 10.0,
-            5: 16.0,
-            6: 19.0,
-            7: 21.0,
-            8: 20.0,
-            9: 15.0,
-            10: 9.0,
-            11: 3.0,
-            12: -1.0,
+            "region": region,
         }
-        return month_means[month]
-
-    def _precipitation_amount(self, month: int, region: str) -> float:
-        summer_boost = 1.2 if month in {6, 7, 8} else 1.0
-        winter_snow = 0.8 if month in {12, 1, 2} else 1.0
-        base = self.rng.gammavariate(2.0, 2.0) * summer_boost * winter_snow
-        if region == "mountain":
-            base *= 1.2
-        if region == "coastal" and month in {10, 11, 12, 1, 2}:
-            base *= 1.15
-        base = min(base, 25.0)
-        return round(base, 1)
-
-    def _precipitation_type(self, month: int, amount: float) -> str:
-        if month in {12, 1, 2}:
-            if amount < 1.0:
-                return "brak"
-            if amount < 6.0:
-                return "snieg"
-            if self.rng.random() < 0.2:
-                return "snieg"
-            return "deszcz"
-        if amount >= 10.0 and self.rng.random() < 0.05:
-            return "grad"
-        if amount < 1.0:
-            return "brak"
-        if month in {3, 4, 10, 11} and self.rng.random() < 0.2:
-            return "snieg"
-        return "deszcz"
 
     # ------------------------------------------------------------------
     # Utility helpers
     # ------------------------------------------------------------------
 
-    def _random_datetime(self, start: datetime, end: datetime) -> datetime:
-        delta_seconds = int((end - start).total_seconds())
-        offset = self.rng.randint(0, delta_seconds)
-        return start + timedelta(seconds=offset)
-
-    def _station_by_id(self, station_id: int) -> StationMeta:
-        return self.stations[station_id - 1]
-
-    def _weighted_choice(self, weights: Dict[str, float]) -> str:
-        total = sum(weights.values())
-        threshold = self.rng.random() * total
-        cumulative = 0.0
-        for key, weight in weights.items():
-            cumulative += weight
-            if cumulative >= threshold:
-                return key
-        raise RuntimeError("Weighted choice failed")
+    def _ride_start(self, start: int, end: int, route: RouteTimetable) -> int:
+        if self.timetable == "random":
+            return start + self.rng.randint(0, end - start)
+        first_day = start - start % DAY
+        day = self.rng.randrange((end - first_day) // DAY + 1)
+        minute = int(self.rng.choice(route.departures))
+        return first_day + day * DAY + minute * MINUTE
 
     def _snapshot_dir(self, name: str) -> Path:
         return self.output_root / name
@@ -1238,14 +1232,185 @@ class RailwayDataGenerator:
     # ------------------------------------------------------------------
 
 
-def run_generator() -> None:
-    output_setting = os.getenv("RAILGEN_OUTPUT_DIR", "output")
-    output_path = Path(output_setting)
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate the T1/T2 railway snapshots.",
+        epilog="Every option falls back to its RAILGEN_* environment variable.",
+    )
+    parser.add_argument(
+        "--output-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument("--seed", type=int, default=_env_int("RAILGEN_SEED", 42))
+    parser.add_argument(
+        "--engine",
+        choices=FACT_ENGINES,
+        default=os.getenv("RAILGEN_ENGINE", "batch"),
+    )
+    parser.add_argument(
+        "--block-rides",
+        type=int,
+        default=_env_int("RAILGEN_BLOCK_RIDES", 4096),
+        help="rides generated per batch engine block",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=_env_int("RAILGEN_WORKERS", 1),
+        help="worker processes generating fact shards (batch engine only)",
+    )
+    parser.add_argument(
+        "--random-streams",
+        choices=RANDOM_STREAM_MODES,
+        default=os.getenv("RAILGEN_RANDOM_STREAMS", "sequential"),
+        help="counter streams key every draw by ride, so any ride can be "
+        "regenerated on its own (batch engine only)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default=os.getenv("RAILGEN_FORMAT", "csv"),
+        help="table file format; parquet and arrow require pyarrow, bcp writes "
+        "SQL Server native files with format files and a load script",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_CODECS,
+        default=os.getenv("RAILGEN_COMPRESSION", "zstd"),
+        help="parquet/arrow compression codec",
+    )
+    parser.add_argument(
+        "--row-group-rows",
+        type=int,
+        default=_env_int("RAILGEN_ROW_GROUP_ROWS", 1_000_000),
+        help="rows per parquet row group / arrow record batch",
+    )
+    parser.add_argument(
+        "--csv-compression",
+        choices=CSV_CODECS,
+        default=os.getenv("RAILGEN_CSV_COMPRESSION", "none"),
+        help="compress CSV tables as independent gzip members / zstd frames",
+    )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=_env_int("RAILGEN_COMPRESSION_THREADS", 2),
+        help="threads compressing CSV blocks (per process)",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=_env_int("RAILGEN_PIPELINE_DEPTH", 0),
+        help="write each CSV fact file on its own thread through a queue of this "
+        "many batches (0 writes inline)",
+    )
+    parser.add_argument(
+        "--flush-rows",
+        type=int,
+        default=_env_int("RAILGEN_FLUSH_ROWS", FLUSH_ROWS),
+        help="rows buffered per CSV fact file before they are written",
+    )
+    parser.add_argument(
+        "--bcp-files",
+        type=int,
+        default=_env_int("RAILGEN_BCP_FILES", 1),
+        help="split every bcp fact table into this many files loaded concurrently",
+    )
+    parser.add_argument(
+        "--partition-by",
+        choices=PARTITION_MODES,
+        default=os.getenv("RAILGEN_PARTITION_BY", "none"),
+        help="write fact tables into one folder per ride departure month, "
+        "with a partitions.json manifest",
+    )
+    parser.add_argument(
+        "--checkpoint-rides",
+        type=int,
+        default=_env_int("RAILGEN_CHECKPOINT_RIDES", 0),
+        help="save a checkpoint every N rides (0 disables checkpoints)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the checkpoint in the output folder, if there is one",
+    )
+    parser.add_argument(
+        "--t2-dimensions",
+        choices=T2_DIMENSION_MODES,
+        default=os.getenv("RAILGEN_T2_DIMENSIONS", "full"),
+        help="write full T2 dimension tables or only insert/update change sets",
+    )
+    parser.add_argument(
+        "--timetable",
+        choices=TIMETABLE_MODES,
+        default=os.getenv("RAILGEN_TIMETABLE", "random"),
+        help="ride start times: uniformly random or fixed daily departures per route",
+    )
+    parser.add_argument(
+        "--scale-factor",
+        type=float,
+        default=os.getenv("RAILGEN_SCALE_FACTOR"),
+        help="grow rides and dimensions together; overrides RAILGEN_T1/T2_RIDES",
+    )
+    parser.add_argument(
+        "--instrument",
+        choices=INSTRUMENT_MODES,
+        default=os.getenv("RAILGEN_INSTRUMENT", "off"),
+        help="collect stage timers and counters; profile also samples stacks",
+    )
+    parser.add_argument(
+        "--instrument-report",
+        default=os.getenv("RAILGEN_INSTRUMENT_REPORT"),
+        help="instrumentation report path (default: <output-dir>/instrumentation.json)",
+    )
+    parser.add_argument(
+        "--profile-interval-ms",
+        type=int,
+        default=_env_int("RAILGEN_PROFILE_INTERVAL_MS", 10),
+        help="sampling profiler interval",
+    )
+    return parser.parse_args(argv)
+
+
+def run_generator(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    output_path = Path(args.output_dir)
     if not output_path.is_absolute():
         output_path = Path(__file__).resolve().parent / output_path
-    seed = _env_int("RAILGEN_SEED", 42)
-    generator = RailwayDataGenerator(output_path, seed=seed)
-    generator.generate()
+    INSTRUMENTATION.configure(args.instrument, args.profile_interval_ms / 1000)
+    INSTRUMENTATION.start()
+    generator = RailwayDataGenerator(
+        output_path,
+        seed=args.seed,
+        engine=args.engine,
+        block_size=args.block_rides,
+        workers=args.workers,
+        output=OutputOptions(
+            format=args.format,
+            compression=args.compression,
+            row_group_rows=args.row_group_rows,
+            csv_compression=args.csv_compression,
+            compression_threads=args.compression_threads,
+            pipeline_depth=args.pipeline_depth,
+            flush_rows=args.flush_rows,
+            bcp_files=args.bcp_files,
+            partition_by=args.partition_by,
+        ),
+        t2_dimensions=args.t2_dimensions,
+        timetable=args.timetable,
+        scale_factor=args.scale_factor,
+        checkpoint_rides=args.checkpoint_rides,
+        resume=args.resume,
+        random_streams=args.random_streams,
+    )
+    try:
+        generator.generate()
+    finally:
+        INSTRUMENTATION.stop()
+        if INSTRUMENTATION.enabled:
+            report_path = Path(
+                args.instrument_report or output_path / "instrumentation.json"
+            )
+            INSTRUMENTATION.write_report(report_path)
 
 
 if __name__ == "__main__":
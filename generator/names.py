@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Polish name and city pools
+# Faker's pl_PL word lists, sampled in vectorised batches.
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class NamePools:
+    male_first_names: np.ndarray
+    female_first_names: np.ndarray
+    surnames: np.ndarray
+    cities: np.ndarray
+
+
+def _unique(values: Sequence[str]) -> np.ndarray:
+    return np.array(list(dict.fromkeys(values)), dtype=object)
+
+
+@lru_cache(maxsize=1)
+def load_name_pools() -> NamePools:
+    from faker.providers.address.pl_PL import Provider as AddressProvider
+    from faker.providers.person.pl_PL import Provider as PersonProvider
+
+    return NamePools(
+        male_first_names=_unique(PersonProvider.first_names_male),
+        female_first_names=_unique(PersonProvider.first_names_female),
+        surnames=_unique(PersonProvider.unisex_last_names),
+        cities=_unique(AddressProvider.cities),
+    )
+
+
+class NameSampler:
+    """Seeded, vectorised draws from :class:`NamePools`."""
+
+    def __init__(self, seed: int, pools: Optional[NamePools] = None) -> None:
+        self.pools = pools if pools is not None else load_name_pools()
+        self.rng = np.random.Generator(
+            np.random.PCG64(np.random.SeedSequence([seed, 0x6E616D6573]))
+        )
+
+    def first_names(self, male: np.ndarray) -> np.ndarray:
+        """One first name per entry of the boolean ``male`` mask."""
+        names = np.empty(len(male), dtype=object)
+        names[male] = self._draw(self.pools.male_first_names, int(male.sum()))
+        names[~male] = self._draw(self.pools.female_first_names, int((~male).sum()))
+        return names
+
+    def surnames(self, count: int) -> np.ndarray:
+        return self._draw(self.pools.surnames, count)
+
+    def city_pairs(
+        self, count: int, regions: Sequence[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``count`` distinct (city, region) pairs, drawn without replacement."""
+        space = len(self.pools.cities) * len(regions)
+        if count > space:
+            raise ValueError(f"Only {space} distinct city pairs, {count} requested")
+        city, region = np.divmod(
+            self.rng.choice(space, size=count, replace=False), len(regions)
+        )
+        return self.pools.cities[city], np.asarray(regions, dtype=object)[region]
+
+    def _draw(self, pool: np.ndarray, count: int) -> np.ndarray:
+        return pool[self.rng.integers(0, len(pool), count)]
@@ -0,0 +1,750 @@
+import io
+import re
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_engine import FactBlock
+from changes import DIMENSION_TABLES, INSERT_SUFFIX, UPDATE_SUFFIX
+from clock import DAY
+from config import PRECIPITATION_TYPES
+from output import (
+    DIMENSION_COLUMNS,
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+    OutputOptions,
+)
+
+# ---------------------------------------------------------------------------
+# SQL Server native (bcp) output
+# Values in the server's binary layout with an XML format file; fact
+# tables are split into ``bcp_files`` parts by ride range.
+# ---------------------------------------------------------------------------
+
+NATIVE_EXTENSION = ".bcp"
+FORMAT_EXTENSION = ".xml"
+LOAD_SCRIPT = "load.sh"
+# Day number of 1970-01-01 in SQL Server's datetime epoch (1900-01-01).
+_DAYS_1900_TO_1970 = 25567
+_TICKS_PER_SECOND = 300
+_DECIMAL_BYTES = 19
+_NULL_PREFIX = {1: 0xFF, 2: 0xFFFF}
+_FIXED_WIDTHS = {"int": 4, "bigint": 8, "bit": 1, "datetime": 8}
+_SQL_TYPES = {
+    "int": "SQLINT",
+    "bigint": "SQLBIGINT",
+    "bit": "SQLBIT",
+    "datetime": "SQLDATETIME",
+    "decimal": "SQLDECIMAL",
+    "varchar": "SQLNVARCHAR",
+    "char": "SQLNCHAR",
+}
+_SPEC = re.compile(r"(\w+)(?:\((\d+)(?:,(\d+))?\))?( null)?$")
+_LOAD_BATCH_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class NativeColumn:
+    """One column of a native file, parsed from a spec such as ``int null``,
+    ``varchar(40)`` or ``decimal(10,2)`` that mirrors ``00-schema.sql``."""
+
+    name: str
+    type: str
+    length: int = 0
+    scale: int = 0
+    nullable: bool = False
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "NativeColumn":
+        match = _SPEC.match(spec)
+        if match is None or match.group(1) not in _SQL_TYPES:
+            raise ValueError(f"Unsupported native column type: {spec}")
+        kind, length, scale, nullable = match.groups()
+        return cls(name, kind, int(length or 0), int(scale or 0), bool(nullable))
+
+    @property
+    def text(self) -> bool:
+        return self.type in ("varchar", "char")
+
+    @property
+    def prefix(self) -> int:
+        """Length prefix in bytes; 0 for fixed-width values."""
+        if self.text:
+            return 2
+        return 1 if self.nullable or self.type == "decimal" else 0
+
+    @property
+    def width(self) -> int:
+        """Bytes of a non-NULL value after the prefix (the most, for text)."""
+        if self.text:
+            return 2 * self.length
+        return _DECIMAL_BYTES if self.type == "decimal" else _FIXED_WIDTHS[self.type]
+
+    def field_xml(self, index: int) -> str:
+        if self.text:
+            kind = f'"NCharPrefix" PREFIX_LENGTH="2" MAX_LENGTH="{self.width}"'
+        elif self.prefix:
+            kind = '"NativePrefix" PREFIX_LENGTH="1"'
+        else:
+            kind = f'"NativeFixed" LENGTH="{self.width}"'
+        return f'<FIELD ID="{index}" xsi:type={kind}/>'
+
+    def column_xml(self, index: int) -> str:
+        kind = f'"{_SQL_TYPES[self.type]}"'
+        if self.type == "decimal":
+            kind += f' PRECISION="{self.length}" SCALE="{self.scale}"'
+        nullable = "YES" if self.nullable else "NO"
+        return (
+            f'<COLUMN SOURCE="{index}" NAME="{self.name}" xsi:type={kind} '
+            f'NULLABLE="{nullable}"/>'
+        )
+
+
+_TABLE_SPECS: Dict[str, List[Tuple[str, str]]] = {
+    "Stacja": [("id", "int"), ("nazwa", "varchar(40)"), ("miasto", "varchar(40)")],
+    "Przejazd": [
+        ("id", "int"),
+        ("czy_rogatki", "bit"),
+        ("czy_sygnalizacja_swietlna", "bit"),
+        ("czy_oswietlony", "bit"),
+        ("dopuszczalna_predkosc", "int"),
+    ],
+    "Pociag": [
+        ("id", "int"),
+        ("nazwa", "varchar(20)"),
+        ("typ_pociagu", "varchar(30)"),
+        ("operator", "varchar(40)"),
+    ],
+    "Maszynista": [
+        ("id", "int"),
+        ("imie", "varchar(30)"),
+        ("nazwisko", "varchar(30)"),
+        ("pesel", "char(11)"),
+        ("plec", "varchar(10)"),
+        ("wiek", "int"),
+        ("rok_zatrudnienia", "int"),
+    ],
+    "Zdarzenie": [
+        ("id", "int"),
+        ("typ_zdarzenia", "varchar(30)"),
+        ("kategoria", "varchar(40)"),
+        ("skala_niebezpieczenstwa", "int"),
+    ],
+    RIDE_TABLE: [
+        ("id", "int"),
+        ("nazwa_trasy", "varchar(40)"),
+        ("roznica_czasu", "int"),
+        ("planowa_data_odjazdu", "datetime"),
+        ("planowa_data_przyjazdu", "datetime null"),
+        ("pociag_id", "int"),
+        ("maszynista_id", "int"),
+    ],
+    SECTION_TABLE: [
+        ("id", "bigint"),
+        ("kurs_id", "int"),
+        ("numer_etapu_kursu", "int"),
+        ("stacja_wyjazdowa_id", "int null"),
+        ("stacja_wjazdowa_id", "int"),
+        ("roznica_czasu", "int"),
+        ("planowa_data_przyjazdu", "datetime"),
+        ("planowa_data_odjazdu", "datetime null"),
+    ],
+    EVENT_TABLE: [
+        ("id", "bigint"),
+        ("odcinek_kursu_id", "bigint"),
+        ("przejazd_id", "int null"),
+        ("zdarzenie_id", "int"),
+        ("wywolane_opoznienie", "int"),
+        ("liczba_rannych", "int"),
+        ("liczba_zgonow", "int"),
+        ("koszt_naprawy", "decimal(10,2)"),
+        ("czy_interwencja_sluzb", "bit"),
+        ("data", "datetime"),
+        ("predkosc", "int"),
+    ],
+    WEATHER_TABLE: [
+        ("id_odcinka", "bigint"),
+        ("data_pomiaru", "datetime"),
+        ("temperatura", "decimal(4,1)"),
+        ("ilosc_opadow", "decimal(4,1)"),
+        ("typ_opadow", "varchar(10)"),
+    ],
+}
+FACT_TABLES = (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, EVENT_TABLE)
+IDENTITY_TABLES = set(_TABLE_SPECS) - {WEATHER_TABLE}
+
+
+def table_columns(
+    table: str, event_ids: bool = True, extra: Sequence[str] = ()
+) -> List[NativeColumn]:
+    """Native columns of a table, matching ``00-schema.sql``.
+
+    ``extra`` columns (the ``czy_aktualne`` flag of type 2 change sets) are
+    appended as ``bit``.
+    """
+    columns = [NativeColumn.parse(name, spec) for name, spec in _TABLE_SPECS[table]]
+    if table == EVENT_TABLE and not event_ids:
+        columns = columns[1:]
+    return columns + [NativeColumn(name, "bit") for name in extra]
+
+
+def format_file(columns: Sequence[NativeColumn]) -> str:
+    """XML format file (``bcp ... -x``) describing rows of ``columns``."""
+    fields = [column.field_xml(i) for i, column in enumerate(columns, 1)]
+    row = [column.column_xml(i) for i, column in enumerate(columns, 1)]
+    return "\n".join(
+        [
+            '<?xml version="1.0"?>',
+            '<BCPFORMAT xmlns="http://schemas.microsoft.com/sqlserver/2004/'
+            'bulkload/format" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">',
+            " <RECORD>",
+            *(f"  {field}" for field in fields),
+            " </RECORD>",
+            " <ROW>",
+            *(f"  {column}" for column in row),
+            " </ROW>",
+            "</BCPFORMAT>",
+            "",
+        ]
+    )
+
+
+def part_path(
+    directory: Path, table: str, part: int, files: int, suffix: str = ""
+) -> Path:
+    """Native file of one part of a fact table (no part number for one file)."""
+    number = f".{part:04d}" if files > 1 else ""
+    return directory / f"{table}{suffix}{number}{NATIVE_EXTENSION}"
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+
+class TextLabels:
+    """Length-prefixed UTF-16 encodings of a label set, indexed by code."""
+
+    def __init__(self, labels: Sequence[str], column: NativeColumn) -> None:
+        encoded = [str(label).encode("utf-16-le") for label in labels]
+        too_long = [
+            label for label, raw in zip(labels, encoded) if len(raw) > column.width
+        ]
+        if too_long:
+            raise ValueError(
+                f"{column.name} holds at most {column.length} characters: "
+                f"{too_long[0]!r}"
+            )
+        width = 2 + max((len(raw) for raw in encoded), default=0)
+        self.matrix = np.zeros((len(encoded), width), dtype=np.uint8)
+        self.lengths = np.empty(len(encoded), dtype=np.int64)
+        for row, raw in enumerate(encoded):
+            self.matrix[row, :2] = np.frombuffer(
+                len(raw).to_bytes(2, "little"), np.uint8
+            )
+            self.matrix[row, 2 : 2 + len(raw)] = np.frombuffer(raw, np.uint8)
+            self.lengths[row] = 2 + len(raw)
+
+
+def _little_endian(values: np.ndarray, dtype: str) -> np.ndarray:
+    data = np.ascontiguousarray(values, dtype=dtype)
+    return data.view(np.uint8).reshape(len(data), -1)
+
+
+def _datetimes(seconds: np.ndarray) -> np.ndarray:
+    seconds = np.asarray(seconds, dtype=np.int64)
+    words = np.empty((len(seconds), 2), dtype="<i4")
+    words[:, 0] = seconds // DAY + _DAYS_1900_TO_1970
+    words[:, 1] = seconds % DAY * _TICKS_PER_SECOND
+    return words.view(np.uint8).reshape(len(seconds), 8)
+
+
+def _decimals(values: np.ndarray, column: NativeColumn) -> np.ndarray:
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * 10**column.scale)
+    scaled = scaled.astype(np.int64)
+    matrix = np.zeros((len(scaled), _DECIMAL_BYTES), dtype=np.uint8)
+    matrix[:, 0] = column.length
+    matrix[:, 1] = column.scale
+    matrix[:, 2] = scaled >= 0
+    matrix[:, 3:11] = _little_endian(np.abs(scaled), "<u8")
+    return matrix
+
+
+def _column_bytes(
+    column: NativeColumn, values
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(rows, width) byte matrix of one column and the bytes used per row
+    (``None`` when every row uses the full width).
+
+    Text takes a ``(TextLabels, codes)`` pair, or a list of strings;
+    ``NULL`` is a masked entry of a ``numpy.ma`` array; ``datetime`` values
+    are epoch seconds.
+    """
+    if column.text:
+        if isinstance(values, tuple):
+            labels, codes = values
+        else:
+            names, codes = np.unique(
+                np.asarray(values, dtype=object), return_inverse=True
+            )
+            labels = TextLabels(names.tolist(), column)
+        return labels.matrix[codes], labels.lengths[codes]
+
+    nulls = np.ma.getmaskarray(values)
+    data = np.ma.getdata(values)
+    if column.type == "decimal":
+        matrix = _decimals(data, column)
+    elif column.type == "datetime":
+        matrix = _datetimes(data)
+    elif column.type == "bit":
+        matrix = _little_endian(np.asarray(data, dtype=bool), "u1")
+    else:
+        matrix = _little_endian(data, "<i4" if column.type == "int" else "<i8")
+    if not column.prefix:
+        return matrix, None
+    prefixed = np.empty((len(matrix), 1 + column.width), dtype=np.uint8)
+    prefixed[:, 0] = np.where(nulls, _NULL_PREFIX[1], column.width)
+    prefixed[:, 1:] = matrix
+    lengths = np.where(nulls, 1, 1 + column.width) if nulls.any() else None
+    return prefixed, lengths
+
+
+def encode_rows(columns: Sequence[NativeColumn], values: Sequence) -> bytes:
+    """Native bytes of the rows given column by column (see ``_column_bytes``)."""
+    matrices, lengths = zip(
+        *(
+            _column_bytes(column, column_values)
+            for column, column_values in zip(columns, values)
+        )
+    )
+    matrix = np.hstack(matrices)
+    if all(used is None for used in lengths):
+        return matrix.tobytes()
+    mask = np.hstack(
+        [
+            np.ones(part.shape, dtype=bool)
+            if used is None
+            else np.arange(part.shape[1]) < used[:, None]
+            for part, used in zip(matrices, lengths)
+        ]
+    )
+    return matrix[mask].tobytes()
+
+
+# ---------------------------------------------------------------------------
+# Decoding
+# ---------------------------------------------------------------------------
+
+
+def _row_end(columns: Sequence[NativeColumn], data: bytes, start: int) -> int:
+    """End offset of the row starting at ``start``; -1 if ``data`` ends first."""
+    position, size = start, len(data)
+    for column in columns:
+        prefix = column.prefix
+        if not prefix:
+            position += column.width
+            continue
+        if position + prefix > size:
+            return -1
+        length = int.from_bytes(data[position : position + prefix], "little")
+        position += prefix
+        if length != _NULL_PREFIX[prefix]:
+            position += length
+    return position if position <= size else -1
+
+
+def iter_raw_rows(
+    handle: IO[bytes], columns: Sequence[NativeColumn], chunk_bytes: int = 1 << 20
+) -> Iterator[bytes]:
+    """The bytes of each row of a native stream."""
+    buffer, offset = b"", 0
+    while True:
+        end = _row_end(columns, buffer, offset) if offset < len(buffer) else -1
+        if end >= 0:
+            yield buffer[offset:end]
+            offset = end
+            continue
+        chunk = handle.read(chunk_bytes)
+        if not chunk:
+            if offset < len(buffer):
+                raise ValueError(f"Truncated native row at byte {offset}")
+            return
+        buffer, offset = buffer[offset:] + chunk, 0
+
+
+def decode_row(columns: Sequence[NativeColumn], raw: bytes) -> tuple:
+    """Python values of one native row: ints, ``str``, ``Decimal``,
+    ``datetime`` and ``None`` for NULL; ``bit`` columns decode to 0 / 1."""
+    values = []
+    position = 0
+    for column in columns:
+        length = column.width
+        if column.prefix:
+            length = int.from_bytes(raw[position : position + column.prefix], "little")
+            position += column.prefix
+            if length == _NULL_PREFIX[column.prefix]:
+                values.append(None)
+                continue
+        value = raw[position : position + length]
+        position += length
+        if column.text:
+            values.append(value.decode("utf-16-le"))
+        elif column.type == "decimal":
+            magnitude = int.from_bytes(value[3:], "little")
+            sign = "" if value[2] else "-"
+            values.append(Decimal(f"{sign}{magnitude}").scaleb(-value[1]))
+        elif column.type == "datetime":
+            days = int.from_bytes(value[:4], "little", signed=True)
+            ticks = int.from_bytes(value[4:], "little")
+            seconds, rest = divmod(ticks, _TICKS_PER_SECOND)
+            values.append(
+                datetime(1900, 1, 1)
+                + timedelta(days=days, seconds=seconds, microseconds=rest * 10_000 // 3)
+            )
+        else:
+            values.append(int.from_bytes(value, "little", signed=column.type != "bit"))
+    return tuple(values)
+
+
+def decode_rows(columns: Sequence[NativeColumn], data: bytes) -> List[tuple]:
+    """Rows of an in-memory native file, the inverse of ``encode_rows``."""
+    return [
+        decode_row(columns, raw) for raw in iter_raw_rows(io.BytesIO(data), columns)
+    ]
+
+
+def read_rows(path: Path, columns: Sequence[NativeColumn]) -> Iterator[tuple]:
+    with path.open("rb") as handle:
+        for raw in iter_raw_rows(handle, columns):
+            yield decode_row(columns, raw)
+
+
+def native_columns(path: Path) -> List[NativeColumn]:
+    """Columns of a native file of this output, from its name."""
+    table, _, rest = path.name.partition(".")
+    extra = ["czy_aktualne"] if rest.startswith("scd2.") else []
+    return table_columns(table, extra=extra)
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+
+def write_table(
+    path: Path,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence],
+    options: OutputOptions,
+) -> None:
+    """Write a small in-memory (dimension) table and its format file."""
+    native = table_columns(table, extra=columns[len(_TABLE_SPECS[table]) :])
+    values = list(zip(*rows)) if rows else [()] * len(native)
+    arrays = [
+        list(values_of) if column.text else np.asarray(values_of, dtype=np.int64)
+        for column, values_of in zip(native, values)
+    ]
+    path.write_bytes(encode_rows(native, arrays) if rows else b"")
+    path.with_suffix(FORMAT_EXTENSION).write_text(format_file(native))
+
+
+class NativeFactWriters:
+    """Native counterpart of :class:`output.FactWriters`.
+
+    Rides ``first_ride_id .. first_ride_id + ride_count - 1`` of the
+    snapshot are split into ``options.bcp_files`` equal ranges; every row
+    goes to the part of its ride.  Shard part files (``header=False``) get
+    no format files, and their events no ids.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        options: OutputOptions,
+        rides: Tuple[int, int],
+        header: bool = True,
+        event_ids: bool = True,
+        suffix: str = "",
+    ) -> None:
+        self.first_ride_id, self.ride_count = rides
+        self.files = options.bcp_files
+        self.event_ids = event_ids
+        self.columns = {table: table_columns(table, event_ids) for table in FACT_TABLES}
+        self._handles: Dict[str, List[IO[bytes]]] = {
+            table: [
+                part_path(directory, table, part, self.files, suffix).open("wb")
+                for part in range(self.files)
+            ]
+            for table in FACT_TABLES
+        }
+        if header:
+            for table, columns in self.columns.items():
+                path = directory / f"{table}{FORMAT_EXTENSION}"
+                path.write_text(format_file(columns))
+        self.precipitation_labels = TextLabels(
+            PRECIPITATION_TYPES, self.columns[WEATHER_TABLE][-1]
+        )
+        self._route_labels: Optional[TextLabels] = None
+        self._route_names: Optional[np.ndarray] = None
+
+    def __enter__(self) -> "NativeFactWriters":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        for handles in self._handles.values():
+            for handle in handles:
+                handle.flush()
+
+    def close(self) -> None:
+        for handles in self._handles.values():
+            for handle in handles:
+                handle.close()
+        self._handles = {}
+
+    def part_of(self, ride_ids: np.ndarray) -> np.ndarray:
+        offset = np.asarray(ride_ids, dtype=np.int64) - self.first_ride_id
+        return offset * self.files // max(self.ride_count, 1)
+
+    def write_block(self, block: FactBlock, route_names: np.ndarray) -> None:
+        if self._route_names is not route_names:
+            self._route_names = route_names
+            self._route_labels = TextLabels(
+                route_names.tolist(), self.columns[RIDE_TABLE][1]
+            )
+        section_parts = self.part_of(block.section_ride_id)
+        event_sections = np.searchsorted(block.section_id, block.event_section_id)
+        crossing = block.event_crossing_id
+        event_columns = [
+            block.event_section_id,
+            np.ma.masked_array(crossing, mask=crossing <= 0),
+            block.event_definition_id,
+            block.event_delay,
+            block.event_injured,
+            block.event_deaths,
+            block.event_repair_cost,
+            block.event_emergency,
+            block.event_time,
+            block.event_speed,
+        ]
+        if self.event_ids:
+            event_columns.insert(0, block.event_id)
+        self._write(
+            RIDE_TABLE,
+            self.part_of(block.ride_id),
+            [
+                block.ride_id,
+                (self._route_labels, block.ride_route),
+                block.ride_delay,
+                block.ride_departure,
+                block.ride_arrival,
+                block.ride_train_id,
+                block.ride_driver_id,
+            ],
+        )
+        self._write(
+            SECTION_TABLE,
+            section_parts,
+            [
+                block.section_id,
+                block.section_ride_id,
+                block.section_number,
+                block.section_departure_station,
+                block.section_arrival_station,
+                block.section_delay,
+                block.section_arrival,
+                block.section_departure,
+            ],
+        )
+        self._write(
+            WEATHER_TABLE,
+            section_parts,
+            [
+                block.section_id,
+                block.section_departure,
+                block.weather_temperature,
+                block.weather_precipitation,
+                (self.precipitation_labels, block.weather_type),
+            ],
+        )
+        self._write(EVENT_TABLE, section_parts[event_sections], event_columns)
+
+    def _write(self, table: str, parts: np.ndarray, values: List) -> None:
+        # Rows arrive in ride order, so each part is one contiguous slice.
+        bounds = np.searchsorted(parts, np.arange(self.files + 1))
+        for part in np.flatnonzero(np.diff(bounds)):
+            rows = slice(bounds[part], bounds[part + 1])
+            sliced = [
+                (value[0], value[1][rows]) if isinstance(value, tuple) else value[rows]
+                for value in values
+            ]
+            self._handles[table][part].write(encode_rows(self.columns[table], sliced))
+
+
+# ---------------------------------------------------------------------------
+# Shard merging
+# ---------------------------------------------------------------------------
+
+
+def merge_parts(
+    snapshot_dir: Path,
+    part_dir: Path,
+    shard_count: int,
+    first_event_id: int,
+    rides: Tuple[int, int],
+    options: OutputOptions,
+) -> None:
+    """Concatenate shard files part by part, numbering events.
+
+    Shards cover contiguous ride ranges, so (part, shard) order is ride
+    order; only event rows are re-read, to prefix their ids.
+    """
+    NativeFactWriters(snapshot_dir, options, rides).close()
+    files = options.bcp_files
+    event_columns = table_columns(EVENT_TABLE, event_ids=False)
+    next_id = first_event_id
+    for table in FACT_TABLES:
+        for part in range(files):
+            with part_path(snapshot_dir, table, part, files).open("ab") as target:
+                for index in range(shard_count):
+                    source = part_path(part_dir, table, part, files, f".{index:04d}")
+                    with source.open("rb") as handle:
+                        if table != EVENT_TABLE:
+                            shutil.copyfileobj(handle, target, length=1 << 20)
+                            continue
+                        for raw in iter_raw_rows(handle, event_columns):
+                            target.write(next_id.to_bytes(8, "little") + raw)
+                            next_id += 1
+
+
+# ---------------------------------------------------------------------------
+# Load script
+# ---------------------------------------------------------------------------
+
+_SCRIPT_HEADER = """\
+#!/bin/sh
+# Loads the {snapshot} native files into the schema of database/00-schema.sql.
+# Generated by main.py --format bcp.  sqlcmd reads the connection from
+# SQLCMDSERVER, SQLCMDUSER, SQLCMDPASSWORD and SQLCMDDBNAME; DATA_DIR is
+# this folder as the server sees it (see database/compose.yaml).  Dimension
+# rows are merged on id, fact parts are bulk inserted concurrently, one
+# connection per file.
+set -eu
+DATA_DIR="${{DATA_DIR:-/opt/data/{snapshot}}}"
+SQLCMD="${{SQLCMD:-sqlcmd}}"
+
+run() {{
+    $SQLCMD -b -I -Q "SET NOCOUNT ON; $1"
+}}
+
+concurrently() {{
+    pids=""
+    for statement in "$@"; do
+        run "$statement" &
+        pids="$pids $!"
+    done
+    status=0
+    for pid in $pids; do
+        wait "$pid" || status=1
+    done
+    return $status
+}}
+"""
+
+
+def _merge_statement(table: str, files: Sequence[str]) -> str:
+    columns = DIMENSION_COLUMNS[table]
+    updates = ", ".join(f"{name} = source.{name}" for name in columns[1:])
+    names = ", ".join(columns)
+    values = ", ".join(f"source.{name}" for name in columns)
+    statements = [f"SELECT TOP 0 * INTO #stage FROM {table};"]
+    for name in files:
+        stem = name[: -len(NATIVE_EXTENSION)]
+        statements += [
+            "TRUNCATE TABLE #stage;",
+            f"BULK INSERT #stage FROM '${{DATA_DIR}}/{name}' WITH (FORMATFILE = "
+            f"'${{DATA_DIR}}/{stem}{FORMAT_EXTENSION}', KEEPIDENTITY, TABLOCK);",
+            f"SET IDENTITY_INSERT {table} ON;",
+            f"MERGE {table} AS target USING #stage AS source ON target.id = source.id",
+            f"WHEN MATCHED THEN UPDATE SET {updates}",
+            f"WHEN NOT MATCHED THEN INSERT ({names}) VALUES ({values});",
+            f"SET IDENTITY_INSERT {table} OFF;",
+        ]
+    return " ".join(statements)
+
+
+def _bulk_statement(table: str, name: str, files: int) -> str:
+    key = "id_odcinka ASC, data_pomiaru ASC" if table == WEATHER_TABLE else "id ASC"
+    hints = [f"FORMATFILE = '${{DATA_DIR}}/{table}{FORMAT_EXTENSION}'"]
+    if table in IDENTITY_TABLES:
+        hints.append("KEEPIDENTITY")
+    hints += [f"ORDER ({key})", f"BATCHSIZE = {_LOAD_BATCH_ROWS}"]
+    # Only a single file can take the table lock for minimal logging.
+    if files == 1:
+        hints.append("TABLOCK")
+    return f"BULK INSERT {table} FROM '${{DATA_DIR}}/{name}' WITH ({', '.join(hints)})"
+
+
+def _shell_call(function: str, statements: Sequence[str]) -> str:
+    quoted = " \\\n    ".join(f'"{statement}"' for statement in statements)
+    return f"{function} \\\n    {quoted}\n"
+
+
+def write_load_script(
+    snapshot_dir: Path, snapshot: str, options: OutputOptions
+) -> Path:
+    """Write ``load.sh`` for the snapshot's native files; returns its path.
+
+    Dimension files present in the folder (full tables or insert / update
+    change sets) are merged one connection per table; then the parts of
+    ``Kurs``, ``Odcinek_kursu`` and finally ``Weather`` with
+    ``Zdarzenie_na_trasie`` are loaded concurrently.
+    """
+    files = options.bcp_files
+    dimensions = []
+    for table in DIMENSION_TABLES:
+        names = [
+            f"{table}{suffix}{NATIVE_EXTENSION}"
+            for suffix in ("", INSERT_SUFFIX, UPDATE_SUFFIX)
+            if (snapshot_dir / f"{table}{suffix}{NATIVE_EXTENSION}").exists()
+        ]
+        if names:
+            dimensions.append(_merge_statement(table, names))
+
+    def parts(*tables: str) -> List[str]:
+        return [
+            _bulk_statement(
+                table, part_path(snapshot_dir, table, part, files).name, files
+            )
+            for table in tables
+            for part in range(files)
+        ]
+
+    def escalation(mode: str) -> str:
+        return " ".join(
+            f"ALTER TABLE {table} SET (LOCK_ESCALATION = {mode});"
+            for table in FACT_TABLES
+        )
+
+    script = [_SCRIPT_HEADER.format(snapshot=snapshot)]
+    script.append(_shell_call("concurrently", dimensions))
+    # Concurrent loads into one clustered index must not escalate to a
+    # table lock, or the parts would wait for each other.
+    script.append(f'run "{escalation("DISABLE")}"\n')
+    for group in ((RIDE_TABLE,), (SECTION_TABLE,), (WEATHER_TABLE, EVENT_TABLE)):
+        script.append(_shell_call("concurrently", parts(*group)))
+    script.append(f'run "{escalation("TABLE")}"\n')
+    path = snapshot_dir / LOAD_SCRIPT
+    path.write_text("\n".join(script))
+    path.chmod(0o755)
+    return path
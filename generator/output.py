@@ -0,0 +1,720 @@
+import csv
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from batch_engine import FactBlock
+from compressed import CSV_CODECS, CSV_EXTENSIONS, open_csv_writer
+from config import PRECIPITATION_TYPES
+from instrumentation import INSTRUMENTATION
+
+# ---------------------------------------------------------------------------
+# Fact file layout shared by the generator, shard workers and the merger
+# ---------------------------------------------------------------------------
+
+RIDE_TABLE = "Kurs"
+SECTION_TABLE = "Odcinek_kursu"
+EVENT_TABLE = "Zdarzenie_na_trasie"
+WEATHER_TABLE = "Weather"
+
+DIMENSION_COLUMNS = {
+    "Stacja": ["id", "nazwa", "miasto"],
+    "Przejazd": [
+        "id",
+        "czy_rogatki",
+        "czy_sygnalizacja_swietlna",
+        "czy_oswietlony",
+        "dopuszczalna_predkosc",
+    ],
+    "Pociag": ["id", "nazwa", "typ_pociagu", "operator"],
+    "Maszynista": [
+        "id",
+        "imie",
+        "nazwisko",
+        "pesel",
+        "plec",
+        "wiek",
+        "rok_zatrudnienia",
+    ],
+    "Zdarzenie": ["id", "typ_zdarzenia", "kategoria", "skala_niebezpieczenstwa"],
+}
+
+RIDE_COLUMNS = [
+    "id",
+    "nazwa_trasy",
+    "roznica_czasu",
+    "planowa_data_odjazdu",
+    "planowa_data_przyjazdu",
+    "pociag_id",
+    "maszynista_id",
+]
+SECTION_COLUMNS = [
+    "id",
+    "kurs_id",
+    "numer_etapu_kursu",
+    "stacja_wyjazdowa_id",
+    "stacja_wjazdowa_id",
+    "roznica_czasu",
+    "planowa_data_przyjazdu",
+    "planowa_data_odjazdu",
+]
+EVENT_COLUMNS = [
+    "id",
+    "odcinek_kursu_id",
+    "przejazd_id",
+    "zdarzenie_id",
+    "wywolane_opoznienie",
+    "liczba_rannych",
+    "liczba_zgonow",
+    "koszt_naprawy",
+    "czy_interwencja_sluzb",
+    "data",
+    "predkosc",
+]
+WEATHER_COLUMNS = [
+    "id_odcinka",
+    "data_pomiaru",
+    "temperatura",
+    "ilosc_opadow",
+    "typ_opadow",
+]
+
+# Rows buffered per CSV fact file.  About one block of the busiest table:
+# larger buffers only add memory, since each flush is already one write call.
+FLUSH_ROWS = 4096
+
+OUTPUT_FORMATS = ("csv", "parquet", "arrow", "bcp")
+COMPRESSION_CODECS = ("none", "snappy", "gzip", "lz4", "zstd")
+PARTITION_MODES = ("none", "month")
+_FORMAT_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "bcp": ".bcp",
+}
+# Arrow IPC files only support the lz4 and zstd buffer codecs.
+_ARROW_CODECS = ("none", "lz4", "zstd")
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """Table file format shared by dimension and fact writers.
+
+    ``compression`` and ``row_group_rows`` only apply to the columnar
+    formats; CSV files are compressed by ``csv_compression`` instead, on
+    ``compression_threads`` threads (see ``compressed.py``).  With
+    ``pipeline_depth`` > 0 every CSV fact file gets a writer thread fed
+    through a queue of that many batches (see ``PipelinedCsvWriter``) and
+    buffers up to ``flush_rows`` rows before rendering them.
+    ``bcp`` output (SQL Server native files, see ``native.py``) splits every
+    fact table into ``bcp_files`` parts.  ``partition_by`` month writes
+    facts into one folder per departure month (see ``partitions.py``).
+    """
+
+    format: str = "csv"
+    compression: str = "zstd"
+    row_group_rows: int = 1_000_000
+    csv_compression: str = "none"
+    compression_threads: int = 2
+    pipeline_depth: int = 0
+    flush_rows: int = FLUSH_ROWS
+    bcp_files: int = 1
+    partition_by: str = "none"
+
+    def __post_init__(self) -> None:
+        if self.format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {self.format}")
+        if self.compression not in COMPRESSION_CODECS:
+            raise ValueError(f"Unknown compression codec: {self.compression}")
+        if self.format == "arrow" and self.compression not in _ARROW_CODECS:
+            raise ValueError(
+                f"Arrow files support {', '.join(_ARROW_CODECS)} compression, "
+                f"not {self.compression}"
+            )
+        if self.row_group_rows <= 0:
+            raise ValueError("row_group_rows must be positive")
+        if self.csv_compression not in CSV_CODECS:
+            raise ValueError(f"Unknown CSV compression codec: {self.csv_compression}")
+        if self.csv_compression != "none" and self.format != "csv":
+            raise ValueError(
+                f"csv_compression applies to CSV output only, not {self.format}"
+            )
+        if self.compression_threads <= 0:
+            raise ValueError("compression_threads must be positive")
+        if self.pipeline_depth < 0:
+            raise ValueError("pipeline_depth must not be negative")
+        if self.pipeline_depth and self.format != "csv":
+            raise ValueError("Pipelined writers apply to CSV output only")
+        if self.flush_rows <= 0:
+            raise ValueError("flush_rows must be positive")
+        if self.bcp_files <= 0:
+            raise ValueError("bcp_files must be positive")
+        if self.bcp_files != 1 and self.format != "bcp":
+            raise ValueError("bcp_files applies to bcp output only")
+        if self.partition_by not in PARTITION_MODES:
+            raise ValueError(f"Unknown partition mode: {self.partition_by}")
+        if self.partition_by != "none" and self.format == "bcp":
+            raise ValueError("bcp output cannot be partitioned")
+
+    @property
+    def extension(self) -> str:
+        if self.format == "csv":
+            return CSV_EXTENSIONS[self.csv_compression]
+        return _FORMAT_EXTENSIONS[self.format]
+
+    @property
+    def columnar(self) -> bool:
+        return self.format in ("parquet", "arrow")
+
+    @property
+    def columnar_compression(self) -> Optional[str]:
+        return None if self.compression == "none" else self.compression
+
+
+def csv_field(value: str) -> str:
+    """Quote a text value the way ``csv.writer`` (QUOTE_MINIMAL) would."""
+    if any(ch in value for ch in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def csv_labels(values: Sequence[str]) -> np.ndarray:
+    """Object array of pre-quoted labels, indexed by a code column."""
+    return np.array([csv_field(v) for v in values], dtype=object)
+
+
+# ---------------------------------------------------------------------------
+# Cached formatters
+# ---------------------------------------------------------------------------
+
+_MINUTE_SECOND = np.array(
+    [f"{minute:02d}:{second:02d}" for minute in range(60) for second in range(60)],
+    dtype=object,
+)
+
+
+class TimestampFormatter:
+    """Formats epoch seconds as ``YYYY-MM-DD HH:MM:SS``.
+
+    The ``YYYY-MM-DD HH:`` prefix is cached per hour in a contiguous table
+    (a snapshot spans ~13k hours) and the ``MM:SS`` tail comes from a fixed
+    3600-entry table, so a value costs two array lookups and one string
+    concatenation instead of a ``datetime`` plus ``strftime``.
+    """
+
+    def __init__(self) -> None:
+        self._first_hour = 0
+        self._prefixes = np.empty(0, dtype=object)
+
+    def format(self, seconds: np.ndarray) -> np.ndarray:
+        if len(seconds) == 0:
+            return np.empty(0, dtype=object)
+        hours = seconds // 3600
+        self._cover(int(hours.min()), int(hours.max()))
+        return self._prefixes[hours - self._first_hour] + _MINUTE_SECOND[seconds % 3600]
+
+    def format_one(self, seconds: int) -> str:
+        """Scalar variant of :meth:`format` for row-at-a-time writers."""
+        hour = seconds // 3600
+        if not 0 <= hour - self._first_hour < len(self._prefixes):
+            self._cover(hour, hour)
+        return self._prefixes[hour - self._first_hour] + _MINUTE_SECOND[seconds % 3600]
+
+    def _cover(self, low: int, high: int) -> None:
+        last_hour = self._first_hour + len(self._prefixes) - 1
+        if len(self._prefixes) and low >= self._first_hour and high <= last_hour:
+            return
+        if len(self._prefixes):
+            low = min(low, self._first_hour)
+            high = max(high, last_hour)
+        hours = np.arange(low, high + 1, dtype=np.int64) * 3600
+        text = np.datetime_as_string(hours.astype("datetime64[s]"), unit="h")
+        self._prefixes = np.array(
+            [value.replace("T", " ") + ":" for value in text.tolist()], dtype=object
+        )
+        self._first_hour = low
+
+
+class FixedPointFormatter:
+    """Formats floats with a fixed number of decimals without f-strings.
+
+    Values are scaled to integers once (NumPy ``rint``). Small ranges such as
+    ``temperatura`` or ``ilosc_opadow`` are served from a cached table of
+    rendered values; wide ranges such as ``koszt_naprawy`` are split into an
+    integer part and a fractional part looked up in a ``10**digits`` table.
+    """
+
+    TABLE_LIMIT = 100_000
+
+    def __init__(self, digits: int) -> None:
+        self.digits = digits
+        self.scale = 10**digits
+        self._fractions = np.array(
+            [str(value).zfill(digits) for value in range(self.scale)], dtype=object
+        )
+        self._first = 0
+        self._table = np.empty(0, dtype=object)
+
+    def format(self, values: np.ndarray) -> np.ndarray:
+        scaled = np.rint(np.asarray(values, dtype=np.float64) * self.scale).astype(
+            np.int64
+        )
+        if len(scaled) == 0:
+            return np.empty(0, dtype=object)
+        low, high = int(scaled.min()), int(scaled.max())
+        if high - low < self.TABLE_LIMIT:
+            self._cover(low, high)
+            return self._table[scaled - self._first]
+        return self._render(scaled)
+
+    def _cover(self, low: int, high: int) -> None:
+        last = self._first + len(self._table) - 1
+        if len(self._table) and low >= self._first and high <= last:
+            return
+        if len(self._table):
+            merged_low, merged_high = min(low, self._first), max(high, last)
+            if merged_high - merged_low < self.TABLE_LIMIT:
+                low, high = merged_low, merged_high
+        self._table = self._render(np.arange(low, high + 1, dtype=np.int64))
+        self._first = low
+
+    def _render(self, scaled: np.ndarray) -> np.ndarray:
+        magnitude = np.abs(scaled)
+        whole = np.array(
+            [str(value) for value in (magnitude // self.scale).tolist()], dtype=object
+        )
+        rendered = whole + "." + self._fractions[magnitude % self.scale]
+        return np.where(scaled < 0, "-" + rendered, rendered)
+
+
+# ---------------------------------------------------------------------------
+# Buffered writers
+# ---------------------------------------------------------------------------
+
+
+class BulkCsvWriter:
+    """Column-buffered CSV writer for one fact file.
+
+    Blocks of columns are buffered and rendered through a ``%`` row template
+    once ``flush_rows`` rows are pending, then written with a single
+    ``write`` call. Integer columns are passed as ints (``%d``), everything
+    else must already be rendered (``%s``) and CSV-safe. ``writerow`` keeps
+    the ``csv.writer`` interface for callers producing one row at a time.
+    """
+
+    def __init__(
+        self, handle: TextIO, template: str, flush_rows: int = FLUSH_ROWS
+    ) -> None:
+        self.handle = handle
+        self.template = template + "\n"
+        self.flush_rows = flush_rows
+        self._row_writer = csv.writer(handle, lineterminator="\n")
+        self._pending: List[Tuple[list, ...]] = []
+        self._pending_rows = 0
+        self.rows_written = 0
+
+    def write_columns(self, *columns: Sequence) -> None:
+        lists = tuple(
+            column.tolist() if isinstance(column, np.ndarray) else column
+            for column in columns
+        )
+        if not lists or not len(lists[0]):
+            return
+        self._pending.append(lists)
+        self._pending_rows += len(lists[0])
+        if self._pending_rows >= self.flush_rows:
+            self.flush()
+
+    def writerow(self, row: Sequence) -> None:
+        self.flush()
+        self._row_writer.writerow(row)
+        self.rows_written += 1
+
+    def writerows(self, rows: Iterable[Sequence]) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self.handle.write(self._render(self._pending))
+        self.rows_written += self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+
+    def finish(self) -> None:
+        """Write everything still buffered; the handle stays open."""
+        self.flush()
+
+    def sync(self) -> None:
+        """Hand everything buffered to the handle (used by checkpoints)."""
+        self.flush()
+
+    def _render(self, pending: List[Tuple[list, ...]]) -> str:
+        template = self.template
+        return "".join([template % row for columns in pending for row in zip(*columns)])
+
+
+class PipelinedCsvWriter(BulkCsvWriter):
+    """``BulkCsvWriter`` that renders and writes on its own thread.
+
+    Buffered column blocks, and rows from ``writerow`` in batches of
+    ``flush_rows``, go through a FIFO queue of ``depth`` batches to a writer
+    thread, so the file is byte-identical to inline writing.  A full queue
+    blocks the producer, which bounds memory to ``depth + 1`` batches per
+    file.  Time the producer spent blocked (the disk is behind) and time the
+    thread spent waiting for work (generation is behind) are reported as
+    ``pipeline_*[<table>]`` instrumentation counters when the writer
+    finishes.  After a failure the thread keeps draining the queue, so the
+    producer never blocks on it, and the error is raised in the producer.
+    """
+
+    def __init__(
+        self,
+        handle: TextIO,
+        template: str,
+        name: str,
+        depth: int,
+        flush_rows: int = FLUSH_ROWS,
+    ) -> None:
+        super().__init__(handle, template, flush_rows)
+        self.name = name
+        self.depth = depth
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._rows: List[Sequence] = []
+        self._error: Optional[BaseException] = None
+        self.batches = 0
+        self.queued_total = 0
+        self.producer_wait = 0.0
+        self.writer_wait = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name=f"railgen-writer-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def write_columns(self, *columns: Sequence) -> None:
+        self._put_rows()
+        super().write_columns(*columns)
+
+    def writerow(self, row: Sequence) -> None:
+        self._put_columns()
+        self._rows.append(row)
+        self.rows_written += 1
+        if len(self._rows) >= self.flush_rows:
+            self._put_rows()
+
+    def flush(self) -> None:
+        self._put_columns()
+        self._put_rows()
+
+    def sync(self) -> None:
+        self.flush()
+        self._queue.join()
+        self._raise_error()
+
+    def finish(self) -> None:
+        if not self._thread.is_alive():
+            self._raise_error()
+            return
+        self.flush()
+        self._put(None)
+        self._thread.join()
+        self._raise_error()
+        counters = {
+            "batches": self.batches,
+            "slots": self.batches * self.depth,
+            "queued": self.queued_total,
+            "producer_wait_us": round(self.producer_wait * 1e6),
+            "writer_wait_us": round(self.writer_wait * 1e6),
+        }
+        for field, amount in counters.items():
+            INSTRUMENTATION.count(f"pipeline_{field}[{self.name}]", amount)
+
+    def _put_columns(self) -> None:
+        if self._pending:
+            self._put(("columns", self._pending))
+            self.rows_written += self._pending_rows
+            self._pending = []
+            self._pending_rows = 0
+
+    def _put_rows(self) -> None:
+        if self._rows:
+            self._put(("rows", self._rows))
+            self._rows = []
+
+    def _put(self, item: Optional[Tuple[str, list]]) -> None:
+        self._raise_error()
+        started = time.perf_counter()
+        self._queue.put(item)
+        self.producer_wait += time.perf_counter() - started
+        if item is not None:
+            self.batches += 1
+            self.queued_total += self._queue.qsize()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Writer thread of {self.name} failed") from self._error
+
+    def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            item = self._queue.get()
+            self.writer_wait += time.perf_counter() - started
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write(*item)
+            except BaseException as exc:
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _write(self, kind: str, payload: list) -> None:
+        if kind == "columns":
+            self.handle.write(self._render(payload))
+        else:
+            self._row_writer.writerows(payload)
+
+
+class FactWriters:
+    """The four fact CSV files of one snapshot (or of one shard of it).
+
+    Files are compressed by ``compression`` (``compressed.CSV_CODECS``) and,
+    with ``pipeline_depth`` > 0, written by one ``PipelinedCsvWriter`` thread
+    each.
+    Shard part files are written with ``header=False`` and
+    ``event_ids=False``; the merger adds headers and assigns event ids once
+    all shards have reported their counts.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        append: bool = False,
+        header: bool = True,
+        event_ids: bool = True,
+        suffix: str = "",
+        flush_rows: int = FLUSH_ROWS,
+        compression: str = "none",
+        compression_threads: int = 2,
+        pipeline_depth: int = 0,
+    ) -> None:
+        extension = CSV_EXTENSIONS[compression]
+        self.event_ids = event_ids
+        self._files: List[TextIO] = []
+        self._paths: List[Path] = []
+        self._writers: List[BulkCsvWriter] = []
+
+        def _open(table: str, template: str) -> BulkCsvWriter:
+            path = directory / f"{table}{suffix}{extension}"
+            handle = open_csv_writer(path, compression, append, compression_threads)
+            self._files.append(handle)
+            self._paths.append(path)
+            if pipeline_depth:
+                writer = PipelinedCsvWriter(
+                    handle, template, table, pipeline_depth, flush_rows
+                )
+            else:
+                writer = BulkCsvWriter(handle, template, flush_rows)
+            self._writers.append(writer)
+            return writer
+
+        self.ride = _open(RIDE_TABLE, "%d,%s,%d,%s,%s,%d,%d")
+        self.section = _open(SECTION_TABLE, "%d,%d,%d,%d,%d,%d,%s,%s")
+        self.event = _open(
+            EVENT_TABLE,
+            "%d,%d,%s,%d,%d,%d,%d,%s,%d,%s,%d"
+            if event_ids
+            else "%d,%s,%d,%d,%d,%d,%s,%d,%s,%d",
+        )
+        self.weather = _open(WEATHER_TABLE, "%d,%s,%s,%s,%s")
+
+        self.timestamps = TimestampFormatter()
+        self.one_decimal = FixedPointFormatter(1)
+        self.two_decimals = FixedPointFormatter(2)
+        self.precipitation_labels = csv_labels(PRECIPITATION_TYPES)
+        self._route_labels: Optional[np.ndarray] = None
+        self._route_names: Optional[np.ndarray] = None
+
+        if header and not append:
+            self.ride.writerow(RIDE_COLUMNS)
+            self.section.writerow(SECTION_COLUMNS)
+            self.event.writerow(EVENT_COLUMNS if event_ids else EVENT_COLUMNS[1:])
+            self.weather.writerow(WEATHER_COLUMNS)
+
+    def __enter__(self) -> "FactWriters":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        for writer in self._writers:
+            writer.flush()
+
+    def sync(self) -> Dict[str, int]:
+        """Flush every file to disk; returns the file sizes by name.
+
+        Compressed files end their current block, so the sizes fall on
+        member / frame boundaries.
+        """
+        for writer in self._writers:
+            writer.sync()
+        sizes = {}
+        for path, handle in zip(self._paths, self._files):
+            handle.flush()
+            os.fsync(handle.fileno())
+            sizes[path.name] = os.fstat(handle.fileno()).st_size
+        return sizes
+
+    def close(self) -> None:
+        if not self._files:
+            return
+        try:
+            for writer in self._writers:
+                writer.finish()
+        finally:
+            for handle in self._files:
+                handle.close()
+            self._files = []
+
+    def write_block(self, block: FactBlock, route_names: np.ndarray) -> None:
+        if self._route_names is not route_names:
+            self._route_names = route_names
+            self._route_labels = csv_labels(route_names.tolist())
+        stamp = self.timestamps.format
+
+        section_departure = stamp(block.section_departure)
+        self.ride.write_columns(
+            block.ride_id,
+            self._route_labels[block.ride_route],
+            block.ride_delay,
+            stamp(block.ride_departure),
+            stamp(block.ride_arrival),
+            block.ride_train_id,
+            block.ride_driver_id,
+        )
+        self.section.write_columns(
+            block.section_id,
+            block.section_ride_id,
+            block.section_number,
+            block.section_departure_station,
+            block.section_arrival_station,
+            block.section_delay,
+            stamp(block.section_arrival),
+            section_departure,
+        )
+        self.weather.write_columns(
+            block.section_id,
+            section_departure,
+            self.one_decimal.format(block.weather_temperature),
+            self.one_decimal.format(block.weather_precipitation),
+            self.precipitation_labels[block.weather_type],
+        )
+        crossing = block.event_crossing_id
+        event_columns = [
+            block.event_section_id,
+            np.where(crossing > 0, crossing.astype(object), ""),
+            block.event_definition_id,
+            block.event_delay,
+            block.event_injured,
+            block.event_deaths,
+            self.two_decimals.format(block.event_repair_cost),
+            block.event_emergency.astype(np.int8),
+            stamp(block.event_time),
+            block.event_speed,
+        ]
+        if self.event_ids:
+            event_columns.insert(0, block.event_id)
+        self.event.write_columns(*event_columns)
+
+
+# ---------------------------------------------------------------------------
+# Format dispatch
+# ---------------------------------------------------------------------------
+
+
+def open_fact_writers(
+    directory: Path,
+    options: OutputOptions,
+    append: bool = False,
+    header: bool = True,
+    event_ids: bool = True,
+    suffix: str = "",
+    rides: Tuple[int, int] = (1, 0),
+):
+    """Open the fact writers of a snapshot (or shard) in the requested format.
+
+    ``rides`` is the snapshot's (first ride id, ride count), by which native
+    output splits fact files.
+    """
+    if options.partition_by != "none":
+        if append:
+            raise ValueError("Partitioned output cannot be appended to")
+        from partitions import PartitionedFactWriters
+
+        return PartitionedFactWriters(
+            directory, options, header=header, event_ids=event_ids, suffix=suffix
+        )
+    if options.format == "csv":
+        return FactWriters(
+            directory,
+            append=append,
+            header=header,
+            event_ids=event_ids,
+            suffix=suffix,
+            flush_rows=options.flush_rows,
+            compression=options.csv_compression,
+            compression_threads=options.compression_threads,
+            pipeline_depth=options.pipeline_depth,
+        )
+    if append:
+        raise ValueError(f"{options.format} output cannot be appended to")
+    if options.format == "bcp":
+        from native import NativeFactWriters
+
+        return NativeFactWriters(
+            directory, options, rides, header=header, event_ids=event_ids, suffix=suffix
+        )
+    from columnar import ColumnarFactWriters
+
+    return ColumnarFactWriters(directory, options, event_ids=event_ids, suffix=suffix)
+
+
+def write_table(
+    directory: Path,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence],
+    options: OutputOptions,
+    suffix: str = "",
+) -> None:
+    """Write a dimension table given as row tuples in the requested format.
+
+    ``suffix`` names change-set files such as ``Pociag.insert.csv``; the
+    columnar schema is still the one of ``table``.
+    """
+    path = directory / f"{table}{suffix}{options.extension}"
+    if options.format == "bcp":
+        from native import write_table as write_native_table
+
+        write_native_table(path, table, columns, rows, options)
+        return
+    if options.columnar:
+        from columnar import write_table as write_columnar_table
+
+        write_columnar_table(path, table, columns, rows, options)
+        return
+    with open_csv_writer(
+        path, options.csv_compression, threads=options.compression_threads
+    ) as fh:
+        writer = csv.writer(fh, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
@@ -0,0 +1,392 @@
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from batch_engine import BatchFactEngine, CompiledDimensions, count_sections
+from compressed import open_binary_reader, open_binary_writer
+from config import SnapshotConfig
+from instrumentation import INSTRUMENTATION
+from output import (
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+    FactWriters,
+    OutputOptions,
+    open_fact_writers,
+)
+from streams import ROUTE, CounterStreams
+
+if TYPE_CHECKING:
+    from columnar import ColumnarFactWriters
+    from native import NativeFactWriters
+
+# ---------------------------------------------------------------------------
+# Sharded fact generation
+# Shards own fixed ride and section id ranges; the merger numbers events.
+# ---------------------------------------------------------------------------
+
+SHARD_DIR = ".shards"
+
+OnBlock = Callable[[Union[FactWriters, "ColumnarFactWriters"], Dict[str, object]], None]
+
+
+@dataclass(frozen=True)
+class ShardTask:
+    config: SnapshotConfig
+    index: int
+    seed: int
+    ride_count: int
+    first_ride_id: int
+    first_section_id: int
+    block_size: int
+    output: OutputOptions = OutputOptions()
+    random_streams: str = "sequential"
+    # Id of the snapshot's first ride; counter streams key draws by ride
+    # index within the snapshot.
+    ride_base: int = 1
+
+
+@dataclass(frozen=True)
+class ShardResult:
+    index: int
+    ride_count: int
+    section_count: int
+    event_count: int
+    counters: Dict[str, int] = field(default_factory=dict)
+    # Month partition stats (see ``partitions.PartitionStats``).
+    partitions: Dict[int, Dict[str, List[int]]] = field(default_factory=dict)
+
+
+def shard_streams(
+    seed: int, config: SnapshotConfig, index: int
+) -> Tuple[np.random.Generator, np.random.Generator]:
+    """Return the (body, route) generators of one shard."""
+    snapshot_key = int.from_bytes(config.name.encode("utf-8"), "little")
+    body, routes = np.random.SeedSequence([seed, snapshot_key, index]).spawn(2)
+    return np.random.Generator(np.random.PCG64(body)), np.random.Generator(
+        np.random.PCG64(routes)
+    )
+
+
+def split_rides(ride_count: int, workers: int) -> List[int]:
+    shards = max(1, min(workers, ride_count))
+    base, extra = divmod(ride_count, shards)
+    return [base + (1 if idx < extra else 0) for idx in range(shards)]
+
+
+def plan_shards(
+    dims: CompiledDimensions,
+    config: SnapshotConfig,
+    seed: int,
+    workers: int,
+    block_size: int,
+    first_ride_id: int,
+    first_section_id: int,
+    output: OutputOptions = OutputOptions(),
+    random_streams: str = "sequential",
+) -> List[ShardTask]:
+    tasks = []
+    ride_id, section_id = first_ride_id, first_section_id
+    streams = CounterStreams(seed, config.name)
+    for index, ride_count in enumerate(split_rides(config.ride_count, workers)):
+        tasks.append(
+            ShardTask(
+                config=config,
+                index=index,
+                seed=seed,
+                ride_count=ride_count,
+                first_ride_id=ride_id,
+                first_section_id=section_id,
+                block_size=block_size,
+                output=output,
+                random_streams=random_streams,
+                ride_base=first_ride_id,
+            )
+        )
+        if random_streams == "counter":
+            route_rng = streams.sequence(ROUTE, ride_id - first_ride_id)
+        else:
+            _, route_rng = shard_streams(seed, config, index)
+        ride_id += ride_count
+        section_id += count_sections(dims, route_rng, ride_count, block_size)
+    return tasks
+
+
+def run_shard(
+    dims: CompiledDimensions,
+    task: ShardTask,
+    writers: Union[FactWriters, "ColumnarFactWriters", "NativeFactWriters"],
+    first_event_id: int = 1,
+    resume: Optional[Dict[str, object]] = None,
+    on_block: Optional[OnBlock] = None,
+) -> ShardResult:
+    """Generate one shard, optionally continuing from ``resume``.
+
+    ``on_block`` is called after every written block with the writers and
+    the shard's progress: rides, sections and events so far and the
+    engine's random state, which ``resume`` accepts back.
+    """
+    engine = _shard_engine(dims, task)
+    rides = sections = events = 0
+    if resume is not None:
+        engine.restore_random_state(resume["random_state"])
+        rides, sections, events = resume["rides"], resume["sections"], resume["events"]
+    for block in engine.blocks(
+        task.ride_count - rides,
+        first_ride_id=task.first_ride_id + rides,
+        first_section_id=task.first_section_id + sections,
+        first_event_id=first_event_id + events,
+    ):
+        writers.write_block(block, dims.route_names)
+        rides += block.ride_count
+        sections += block.section_count
+        events += block.event_count
+        if on_block is not None:
+            progress = {
+                "rides": rides,
+                "sections": sections,
+                "events": events,
+                "random_state": engine.random_state(),
+            }
+            on_block(writers, progress)
+    return ShardResult(task.index, task.ride_count, sections, events)
+
+
+def _shard_engine(dims: CompiledDimensions, task: ShardTask) -> BatchFactEngine:
+    if task.random_streams == "counter":
+        return BatchFactEngine(
+            dims,
+            task.config,
+            block_size=task.block_size,
+            streams=CounterStreams(task.seed, task.config.name),
+            ride_base=task.ride_base,
+        )
+    rng, route_rng = shard_streams(task.seed, task.config, task.index)
+    return BatchFactEngine(
+        dims, task.config, rng=rng, route_rng=route_rng, block_size=task.block_size
+    )
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+_worker_dims: Optional[CompiledDimensions] = None
+
+
+def _init_worker(dims: CompiledDimensions, instrument_mode: str = "off") -> None:
+    global _worker_dims
+    _worker_dims = dims
+    INSTRUMENTATION.configure(instrument_mode)
+    INSTRUMENTATION.take_counters()  # drop counts inherited from a forked parent
+
+
+def _run_shard_part(task: ShardTask, part_dir: str) -> ShardResult:
+    assert _worker_dims is not None, "worker initialised without dimensions"
+    suffix = f".{task.index:04d}"
+    # Partitioned parts keep shard-local event ids (from 1), which the
+    # merger shifts; without them events could not be put back in order.
+    partitioned = task.output.partition_by != "none"
+    with open_fact_writers(
+        Path(part_dir),
+        task.output,
+        header=False,
+        event_ids=partitioned,
+        suffix=suffix,
+        rides=(task.ride_base, task.config.ride_count),
+    ) as writers:
+        result = run_shard(_worker_dims, task, writers)
+    return replace(
+        result,
+        counters=INSTRUMENTATION.take_counters(),
+        partitions=writers.stats if partitioned else {},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+
+def generate_facts(
+    dims: CompiledDimensions,
+    config: SnapshotConfig,
+    snapshot_dir: Path,
+    seed: int,
+    workers: int,
+    block_size: int,
+    first_ride_id: int,
+    first_section_id: int,
+    first_event_id: int,
+    append: bool = False,
+    output: OutputOptions = OutputOptions(),
+    resume: Optional[Dict[str, object]] = None,
+    on_block: Optional[OnBlock] = None,
+    random_streams: str = "sequential",
+) -> Tuple[int, int, int]:
+    """Generate one snapshot's facts; returns (rides, sections, events).
+
+    ``resume`` and ``on_block`` (see ``run_shard``) need a single shard.
+    """
+    tasks = plan_shards(
+        dims,
+        config,
+        seed,
+        workers,
+        block_size,
+        first_ride_id,
+        first_section_id,
+        output,
+        random_streams,
+    )
+
+    rides = (first_ride_id, config.ride_count)
+    if len(tasks) == 1:
+        with open_fact_writers(
+            snapshot_dir, output, append=append, rides=rides
+        ) as writers:
+            result = run_shard(
+                dims, tasks[0], writers, first_event_id, resume, on_block
+            )
+        return result.ride_count, result.section_count, result.event_count
+    if resume is not None or on_block is not None:
+        raise ValueError("Checkpoints need a single shard (--workers 1)")
+
+    part_dir = snapshot_dir / SHARD_DIR
+    part_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(
+        max_workers=len(tasks),
+        initializer=_init_worker,
+        initargs=(dims, INSTRUMENTATION.mode),
+    ) as pool:
+        futures = [pool.submit(_run_shard_part, task, str(part_dir)) for task in tasks]
+        results = [future.result() for future in futures]
+    for result in results:
+        INSTRUMENTATION.merge_counters(result.counters)
+
+    with INSTRUMENTATION.stage(f"merge_parts[{config.name}]"):
+        if output.partition_by != "none":
+            _merge_partitions(snapshot_dir, part_dir, results, first_event_id, output)
+        elif output.format == "bcp":
+            from native import merge_parts
+
+            merge_parts(
+                snapshot_dir, part_dir, len(tasks), first_event_id, rides, output
+            )
+        elif output.columnar:
+            from columnar import merge_parts
+
+            merge_parts(snapshot_dir, part_dir, len(tasks), first_event_id, output)
+        else:
+            _merge_parts(
+                snapshot_dir, part_dir, len(tasks), first_event_id, append, output
+            )
+    shutil.rmtree(part_dir)
+    return (
+        sum(r.ride_count for r in results),
+        sum(r.section_count for r in results),
+        sum(r.event_count for r in results),
+    )
+
+
+def _merge_partitions(
+    snapshot_dir: Path,
+    part_dir: Path,
+    results: List[ShardResult],
+    first_event_id: int,
+    output: OutputOptions,
+) -> None:
+    """Merge the shards' month partitions and write the manifest.
+
+    A shard's events follow all events of the shards before it, so its
+    local event ids are shifted by their count to match unpartitioned ids.
+    """
+    from partitions import merge_stats, partition_path, write_manifest
+
+    counts = [first_event_id - 1] + [result.event_count for result in results[:-1]]
+    offsets = np.cumsum(counts).tolist()
+    stats: Dict[int, Dict[str, List[int]]] = {}
+    for result, offset in zip(results, offsets):
+        merge_stats(stats, result.partitions, offset)
+    for key in sorted(stats):
+        name = partition_path(key)
+        (snapshot_dir / name).mkdir(parents=True, exist_ok=True)
+        if output.columnar:
+            from columnar import merge_parts
+
+            merge_parts(
+                snapshot_dir / name,
+                part_dir / name,
+                len(results),
+                first_event_id,
+                output,
+                event_offsets=offsets,
+            )
+        else:
+            _merge_parts(
+                snapshot_dir / name,
+                part_dir / name,
+                len(results),
+                first_event_id,
+                False,
+                output,
+                event_offsets=offsets,
+            )
+    write_manifest(snapshot_dir, stats, output.partition_by)
+
+
+def _merge_parts(
+    snapshot_dir: Path,
+    part_dir: Path,
+    shard_count: int,
+    first_event_id: int,
+    append: bool,
+    output: OutputOptions,
+    event_offsets: Optional[List[int]] = None,
+) -> None:
+    """Concatenate shard part files into the snapshot's CSV files.
+
+    Parts without event ids are numbered from ``first_event_id``; parts
+    that have them (month partitions) get ``event_offsets[shard]`` added.
+    Shards without rows in a partition have no part files.
+    """
+    # Opening the final writers truncates the files and writes the headers.
+    codec, threads = output.csv_compression, output.compression_threads
+    FactWriters(
+        snapshot_dir, append=append, compression=codec, compression_threads=threads
+    ).close()
+    extension = output.extension
+
+    # Compressed parts are sequences of complete gzip members / zstd frames,
+    # so their bytes concatenate into a valid stream as they are.
+    for table in (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE):
+        with (snapshot_dir / f"{table}{extension}").open("ab") as target:
+            for index in range(shard_count):
+                part_path = part_dir / f"{table}.{index:04d}{extension}"
+                if not part_path.exists():
+                    continue
+                with part_path.open("rb") as part:
+                    shutil.copyfileobj(part, target, length=1 << 20)
+
+    next_id = first_event_id
+    target_path = snapshot_dir / f"{EVENT_TABLE}{extension}"
+    with open_binary_writer(target_path, codec, True, threads) as target:
+        for index in range(shard_count):
+            part_path = part_dir / f"{EVENT_TABLE}.{index:04d}{extension}"
+            if not part_path.exists():
+                continue
+            with open_binary_reader(part_path) as part:
+                if event_offsets is not None:
+                    offset = event_offsets[index]
+                    for line in part:
+                        event_id, rest = line.split(b",", 1)
+                        target.write(b"%d,%s" % (int(event_id) + offset, rest))
+                    continue
+                for line in part:
+                    target.write(b"%d,%s" % (next_id, line))
+                    next_id += 1
@@ -0,0 +1,194 @@
+import json
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from batch_engine import FactBlock
+from output import (
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+    OutputOptions,
+    open_fact_writers,
+)
+
+# ---------------------------------------------------------------------------
+# Month-partitioned fact output
+# One ``year=YYYY/month=MM`` folder per departure month, described by
+# ``partitions.json``.
+# ---------------------------------------------------------------------------
+
+MANIFEST_FILE = "partitions.json"
+PARTITION_KEY = f"{RIDE_TABLE}.planowa_data_odjazdu"
+FACT_TABLES = (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, EVENT_TABLE)
+
+# Per partition (months since 1970-01) and table: [rows, first id, last id].
+PartitionStats = Dict[int, Dict[str, List[int]]]
+
+
+def month_keys(seconds: np.ndarray) -> np.ndarray:
+    """Months since 1970-01 of epoch-second timestamps."""
+    return seconds.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+
+
+def partition_path(key: int) -> str:
+    """Directory of a partition, relative to the snapshot folder."""
+    year, month = divmod(key, 12)
+    return f"year={1970 + year:04d}/month={month + 1:02d}"
+
+
+def merge_stats(
+    stats: PartitionStats, other: PartitionStats, event_offset: int = 0
+) -> None:
+    """Add ``other`` (a shard's stats) into ``stats``.
+
+    Shard parts number their events from 1; ``event_offset`` moves those ids
+    to their place in the snapshot.
+    """
+    for key, tables in other.items():
+        merged = stats.setdefault(key, {table: [0, 0, 0] for table in FACT_TABLES})
+        for table, (rows, first_id, last_id) in tables.items():
+            if not rows:
+                continue
+            if table == EVENT_TABLE:
+                first_id, last_id = first_id + event_offset, last_id + event_offset
+            entry = merged[table]
+            entry[1] = min(entry[1], first_id) if entry[0] else first_id
+            entry[2] = max(entry[2], last_id)
+            entry[0] += rows
+
+
+def write_manifest(
+    snapshot_dir: Path, stats: PartitionStats, partition_by: str
+) -> None:
+    partitions = []
+    for key in sorted(stats):
+        year, month = divmod(key, 12)
+        tables = {}
+        for table in FACT_TABLES:
+            rows, first_id, last_id = stats[key][table]
+            tables[table] = {
+                "rows": rows,
+                "first_id": first_id if rows else None,
+                "last_id": last_id if rows else None,
+            }
+        partitions.append(
+            {
+                "year": 1970 + year,
+                "month": month + 1,
+                "path": partition_path(key),
+                "tables": tables,
+            }
+        )
+    manifest = {
+        "partition_by": partition_by,
+        "key": PARTITION_KEY,
+        "partitions": partitions,
+    }
+    with (snapshot_dir / MANIFEST_FILE).open("w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+        handle.write("\n")
+
+
+def read_manifest(snapshot_dir: Path) -> Optional[Dict[str, object]]:
+    """The snapshot's partition manifest, or None for unpartitioned output."""
+    path = snapshot_dir / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class PartitionedFactWriters:
+    """Fact writers of one snapshot (or shard) split by departure month.
+
+    Every partition gets its own writers in ``options.format``, opened on the
+    first ride of that month.  Shard parts (``header=False``) leave the
+    manifest to the merger, which combines their ``stats``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        options: OutputOptions,
+        header: bool = True,
+        event_ids: bool = True,
+        suffix: str = "",
+    ) -> None:
+        self.directory = directory
+        self.partition_by = options.partition_by
+        self.stats: PartitionStats = {}
+        self._options = replace(options, partition_by="none")
+        self._header = header
+        self._event_ids = event_ids
+        self._suffix = suffix
+        self._writers: Dict[int, object] = {}
+        self._closed = False
+
+    def __enter__(self) -> "PartitionedFactWriters":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        for writers in self._writers.values():
+            writers.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for partition in self._writers.values():
+            partition.close()
+        if self._header:
+            write_manifest(self.directory, self.stats, self.partition_by)
+
+    def write_block(self, block: FactBlock, route_names: np.ndarray) -> None:
+        keys = month_keys(block.ride_departure)
+        if len(keys) == 0:
+            return
+        months = np.unique(keys)
+        for key in months.tolist():
+            part = block if len(months) == 1 else block.select_rides(keys == key)
+            writers = self._partition(key)
+            writers.write_block(part, route_names)
+            # Rides are not in departure order, so every month's buffers would
+            # fill at once; CSV rows go out with their block instead.  Parquet
+            # and Arrow keep buffering so their row groups do not shrink.
+            if self._options.format == "csv":
+                writers.flush()
+            self._count(key, part)
+
+    def _partition(self, key: int):
+        if key not in self._writers:
+            directory = self.directory / partition_path(key)
+            directory.mkdir(parents=True, exist_ok=True)
+            self._writers[key] = open_fact_writers(
+                directory,
+                self._options,
+                header=self._header,
+                event_ids=self._event_ids,
+                suffix=self._suffix,
+            )
+        return self._writers[key]
+
+    def _count(self, key: int, block: FactBlock) -> None:
+        ids = {
+            RIDE_TABLE: block.ride_id,
+            SECTION_TABLE: block.section_id,
+            WEATHER_TABLE: block.section_id,
+            EVENT_TABLE: block.event_id,
+        }
+        merge_stats(
+            self.stats,
+            {
+                key: {
+                    table: [len(values), int(values.min()), int(values.max())]
+                    for table, values in ids.items()
+                    if len(values)
+                }
+            },
+        )
@@ -0,0 +1,615 @@
+import argparse
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from changes import INSERT_SUFFIX, UPDATE_SUFFIX
+from compressed import CSV_EXTENSIONS, is_csv, open_csv_reader
+from etl import (
+    MONTH_NAMES,
+    SNAPSHOT_REFERENCE_YEAR,
+    danger_scale,
+    experience_category,
+    season,
+    time_of_day,
+)
+from output import (
+    DIMENSION_COLUMNS,
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+)
+from partitions import read_manifest
+
+# ---------------------------------------------------------------------------
+# In-process column store over generated snapshots
+# Ids are dense, so a join is an array lookup by foreign key.
+# ---------------------------------------------------------------------------
+
+FACT_TABLES = (RIDE_TABLE, SECTION_TABLE, EVENT_TABLE, WEATHER_TABLE)
+TIMESTAMP_COLUMNS = {
+    "planowa_data_odjazdu",
+    "planowa_data_przyjazdu",
+    "data",
+    "data_pomiaru",
+}
+TABLE_EXTENSIONS = (*CSV_EXTENSIONS.values(), ".parquet", ".arrow")
+# Fact rows are tagged with the position of their snapshot under this name.
+SNAPSHOT_COLUMN = "__snapshot__"
+FACT_KEY_COLUMNS = {
+    RIDE_TABLE: "id",
+    SECTION_TABLE: "id",
+    EVENT_TABLE: "id",
+    WEATHER_TABLE: "id_odcinka",
+}
+
+
+def _table_path(directory: Path, name: str) -> Optional[Path]:
+    for extension in TABLE_EXTENSIONS:
+        path = directory / f"{name}{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def _fact_dirs(snapshot_dir: Path) -> List[Path]:
+    """Folders holding a snapshot's fact tables: its month partitions, if any."""
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        return [snapshot_dir]
+    return [snapshot_dir / partition["path"] for partition in manifest["partitions"]]
+
+
+def _read_columns(path: Path, columns: Sequence[str]) -> pd.DataFrame:
+    if is_csv(path):
+        with open_csv_reader(path) as source:
+            frame = pd.read_csv(
+                source, usecols=list(columns), keep_default_na=False, na_values=[""]
+            )
+    else:
+        from columnar import _pyarrow
+
+        pa = _pyarrow()
+        if path.suffix == ".parquet":
+            table = pa.parquet.read_table(path, columns=list(columns))
+        else:
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all().select(list(columns))
+        frame = table.to_pandas()
+    for column in columns:
+        if column in TIMESTAMP_COLUMNS and not pd.api.types.is_datetime64_any_dtype(
+            frame[column]
+        ):
+            frame[column] = pd.to_datetime(frame[column], format="%Y-%m-%d %H:%M:%S")
+    return frame
+
+
+class ColumnStore:
+    """Lazily loaded, cached columns of one or more generated snapshots."""
+
+    def __init__(self, input_dir: Path, snapshots: Sequence[str] = ("T1", "T2")):
+        self.input_dir = input_dir
+        self.snapshots = tuple(snapshots)
+        self._columns: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def fingerprint(self) -> Tuple:
+        """Identity of the snapshot files; changes whenever they are rewritten."""
+        entries = []
+        for snapshot in self.snapshots:
+            directory = self.input_dir / snapshot
+            for path in sorted(directory.rglob("*.*")):
+                stat = path.stat()
+                name = path.relative_to(directory).as_posix()
+                entries.append((snapshot, name, stat.st_size, stat.st_mtime_ns))
+        return tuple(entries)
+
+    def clear(self) -> None:
+        self._columns.clear()
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        """A fact column over all snapshots, or a dimension column indexed by id.
+
+        Dimension columns are returned as lookup arrays: entry ``i`` holds the
+        value of the row with id ``i`` (entry 0 is unused).
+        """
+        key = (table, name)
+        if key not in self._columns:
+            if table in FACT_TABLES:
+                self._load_fact(table, [name])
+            else:
+                self._load_dimension(table)
+        return self._columns[key]
+
+    def column_as_of(self, table: str, name: str, snapshot: str) -> np.ndarray:
+        """A dimension column in the state ``snapshot`` left it in.
+
+        Facts join to the dimension rows of their own snapshot, the way the
+        warehouse's type 2 ``Maszynista`` keeps one version per snapshot.
+        """
+        key = (table, name, snapshot)
+        if key not in self._columns:
+            self._load_dimension(table, snapshot)
+        return self._columns[key]
+
+    def fact_snapshots(self, table: str) -> np.ndarray:
+        """Position in ``snapshots`` of the snapshot each fact row came from."""
+        key = (table, SNAPSHOT_COLUMN)
+        if key not in self._columns:
+            self._load_fact(table, [FACT_KEY_COLUMNS[table]])
+        return self._columns[key]
+
+    def columns(self, table: str, *names: str) -> List[np.ndarray]:
+        missing = [name for name in names if (table, name) not in self._columns]
+        if missing and table in FACT_TABLES:
+            self._load_fact(table, missing)
+        return [self.column(table, name) for name in names]
+
+    def _load_fact(self, table: str, names: Sequence[str]) -> None:
+        parts, sources = [], []
+        for position, snapshot in enumerate(self.snapshots):
+            for directory in _fact_dirs(self.input_dir / snapshot):
+                path = _table_path(directory, table)
+                if path is None:
+                    raise FileNotFoundError(f"{table} missing in {directory}")
+                parts.append(_read_columns(path, names))
+                sources.append(position)
+        frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        for name in names:
+            self._columns[(table, name)] = frame[name].to_numpy()
+        self._columns[(table, SNAPSHOT_COLUMN)] = np.repeat(
+            np.array(sources, dtype=np.int64), [len(part) for part in parts]
+        )
+
+    def _load_dimension(self, table: str, as_of: Optional[str] = None) -> None:
+        """Lookup arrays of ``table`` after all snapshots, or after ``as_of``."""
+        columns = DIMENSION_COLUMNS[table]
+        snapshots = self.snapshots
+        if as_of is not None:
+            snapshots = snapshots[: snapshots.index(as_of) + 1]
+        frames = []
+        for snapshot in snapshots:
+            directory = self.input_dir / snapshot
+            path = _table_path(directory, table)
+            if path is not None:
+                frames = [_read_columns(path, columns)]
+                continue
+            for suffix in (INSERT_SUFFIX, UPDATE_SUFFIX):
+                change_set = _table_path(directory, f"{table}{suffix}")
+                if change_set is not None:
+                    changed = _read_columns(change_set, columns)
+                    if len(changed):
+                        frames.append(changed)
+        frame = pd.concat(frames, ignore_index=True).drop_duplicates("id", keep="last")
+        state = () if as_of is None else (as_of,)
+        ids = frame["id"].to_numpy()
+        for name in columns[1:]:
+            values = frame[name].to_numpy()
+            if values.dtype == bool:
+                # Flags are 0/1 in CSV and booleans in Parquet / Arrow.
+                values = values.astype(np.int64)
+            lookup = np.empty(int(ids.max()) + 1, dtype=values.dtype)
+            if lookup.dtype == object:
+                lookup[:] = None
+            lookup[ids] = values
+            self._columns[(table, name, *state)] = lookup
+
+
+# ---------------------------------------------------------------------------
+# Query primitives
+# ---------------------------------------------------------------------------
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+
+
+@dataclass
+class QueryResult:
+    """Column-oriented result table."""
+
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def rows(self) -> List[tuple]:
+        return list(zip(*(values.tolist() for values in self.columns.values())))
+
+    def sort_by(self, column: str, descending: bool = False) -> "QueryResult":
+        order = np.argsort(self.columns[column], kind="stable")
+        if descending:
+            order = order[::-1]
+        return QueryResult(
+            {name: values[order] for name, values in self.columns.items()}
+        )
+
+    def head(self, count: int) -> "QueryResult":
+        return QueryResult(
+            {name: values[:count] for name, values in self.columns.items()}
+        )
+
+    def format(self, limit: int = 20) -> str:
+        names = list(self.columns)
+        shown = [
+            [
+                f"{value:.2f}" if isinstance(value, float) else str(value)
+                for value in row
+            ]
+            for row in self.head(limit).rows()
+        ]
+        widths = [
+            max([len(name)] + [len(row[idx]) for row in shown])
+            for idx, name in enumerate(names)
+        ]
+        lines = ["  ".join(name.ljust(w) for name, w in zip(names, widths))]
+        lines += ["  ".join(v.ljust(w) for v, w in zip(row, widths)) for row in shown]
+        if len(self) > limit:
+            lines.append(f"... {len(self) - limit} more rows")
+        return "\n".join(lines)
+
+
+def group_by(
+    keys: Dict[str, np.ndarray],
+    aggregates: Dict[str, Tuple[str, Optional[np.ndarray]]],
+    where: Optional[np.ndarray] = None,
+) -> QueryResult:
+    """Group rows by the ``keys`` columns and aggregate value columns.
+
+    ``aggregates`` maps output names to ``(function, values)`` pairs, where
+    function is one of :data:`AGGREGATES` (``values`` is ignored by count).
+    ``where`` is an optional boolean row filter. Groups come out sorted by
+    their keys.
+    """
+    if where is not None:
+        keys = {name: values[where] for name, values in keys.items()}
+        aggregates = {
+            name: (function, None if values is None else values[where])
+            for name, (function, values) in aggregates.items()
+        }
+    codes, labels = [], []
+    for values in keys.values():
+        code, uniques = pd.factorize(values, sort=True)
+        codes.append(code)
+        labels.append(np.asarray(uniques))
+    shape = [max(len(uniques), 1) for uniques in labels]
+    if len(codes) == 1:
+        inverse, groups = codes[0], np.arange(len(labels[0]))
+    elif codes:
+        combined = np.ravel_multi_index(codes, shape)
+        inverse, groups = pd.factorize(combined, sort=True)
+    else:
+        size = len(next(iter(aggregates.values()))[1]) if aggregates else 0
+        inverse, groups = np.zeros(size, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    group_count = len(groups)
+
+    result: Dict[str, np.ndarray] = {}
+    for name, uniques, group_codes in zip(
+        keys, labels, np.unravel_index(groups, shape)
+    ):
+        result[name] = uniques[group_codes]
+
+    counts = np.bincount(inverse, minlength=group_count)
+    for name, (function, values) in aggregates.items():
+        if function not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {function}")
+        if function == "count":
+            result[name] = counts
+            continue
+        integral = np.issubdtype(np.asarray(values).dtype, np.integer)
+        values = np.asarray(values, dtype=np.float64)
+        if function in ("sum", "mean"):
+            sums = np.bincount(inverse, weights=values, minlength=group_count)
+            if function == "mean":
+                result[name] = sums / np.maximum(counts, 1)
+            else:
+                result[name] = np.rint(sums).astype(np.int64) if integral else sums
+            continue
+        if function == "min":
+            extremes = np.full(group_count, np.inf)
+            np.minimum.at(extremes, inverse, values)
+        else:
+            extremes = np.full(group_count, -np.inf)
+            np.maximum.at(extremes, inverse, values)
+        result[name] = extremes
+    return QueryResult(result)
+
+
+# ---------------------------------------------------------------------------
+# Query engine and canned questions (warehouse/zapytania.md)
+# ---------------------------------------------------------------------------
+
+QueryFunction = Callable[..., QueryResult]
+QUERIES: Dict[str, Tuple[str, QueryFunction]] = {}
+
+
+def query(name: str, title: str) -> Callable[[QueryFunction], QueryFunction]:
+    def register(function: QueryFunction) -> QueryFunction:
+        QUERIES[name] = (title, function)
+        return function
+
+    return register
+
+
+class QueryEngine:
+    """Runs registered queries with an LRU cache of their results.
+
+    Cache keys combine the query name, its parameters and the snapshot
+    fingerprint, so regenerating the snapshots invalidates stale results.
+    """
+
+    def __init__(self, store: ColumnStore, cache_size: int = 64) -> None:
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, QueryResult]" = OrderedDict()
+        self._fingerprint: Optional[Tuple] = None
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, name: str, **params: object) -> QueryResult:
+        fingerprint = self.store.fingerprint()
+        if fingerprint != self._fingerprint:
+            self.store.clear()
+            self._fingerprint = fingerprint
+        key = (name, tuple(sorted(params.items())), fingerprint)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+        _, function = QUERIES[name]
+        result = function(self.store, **params)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+
+def _section_ride_lookup(store: ColumnStore, column: str) -> np.ndarray:
+    """A Kurs column broadcast to sections through ``kurs_id``."""
+    ride_ids, values = store.columns(RIDE_TABLE, "id", column)
+    lookup = np.empty(int(ride_ids.max()) + 1, dtype=values.dtype)
+    lookup[ride_ids] = values
+    return lookup[store.column(SECTION_TABLE, "kurs_id")]
+
+
+def _event_section_lookup(store: ColumnStore, column: str) -> np.ndarray:
+    """A section column broadcast to events through ``odcinek_kursu_id``."""
+    section_ids, values = store.columns(SECTION_TABLE, "id", column)
+    lookup = np.empty(int(section_ids.max()) + 1, dtype=values.dtype)
+    lookup[section_ids] = values
+    return lookup[store.column(EVENT_TABLE, "odcinek_kursu_id")]
+
+
+def _map_codes(values: np.ndarray, function: Callable[[int], str]) -> np.ndarray:
+    """Apply a banding function through a table over the distinct values."""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array([function(int(value)) for value in uniques], dtype=object)[inverse]
+
+
+@query("q1", "Średnie opóźnienie odcinków per przewoźnik w danym roku")
+def average_delay_by_operator(store: ColumnStore, year: int = 2023) -> QueryResult:
+    train_id = _section_ride_lookup(store, "pociag_id")
+    operator = store.column("Pociag", "operator")[train_id]
+    departure = store.column(SECTION_TABLE, "planowa_data_odjazdu")
+    in_year = departure.astype("datetime64[Y]").astype(np.int64) + 1970 == year
+    return group_by(
+        {"przewoznik": operator},
+        {"avg_roznica_czasu": ("mean", store.column(SECTION_TABLE, "roznica_czasu"))},
+        where=in_year,
+    )
+
+
+@query("q2", "Średnie opóźnienie wg płci i doświadczenia maszynisty")
+def average_delay_by_driver(store: ColumnStore) -> QueryResult:
+    # As in etl.py, a section is banded against its own snapshot's year and
+    # joined to the driver as that snapshot describes them.
+    driver_id = _section_ride_lookup(store, "maszynista_id")
+    source = store.fact_snapshots(SECTION_TABLE)
+    gender = np.empty(len(driver_id), dtype=object)
+    experience = np.empty(len(driver_id), dtype=np.int64)
+    for position, snapshot in enumerate(store.snapshots):
+        rows = source == position
+        drivers = driver_id[rows]
+        reference_year = SNAPSHOT_REFERENCE_YEAR.get(snapshot, date.today().year)
+        employed = store.column_as_of("Maszynista", "rok_zatrudnienia", snapshot)
+        gender[rows] = store.column_as_of("Maszynista", "plec", snapshot)[drivers]
+        experience[rows] = reference_year - employed[drivers]
+    return group_by(
+        {
+            "plec": gender,
+            "doswiadczenie_pracy": _map_codes(experience, experience_category),
+        },
+        {"avg_roznica_czasu": ("mean", store.column(SECTION_TABLE, "roznica_czasu"))},
+    )
+
+
+@query("q3", "Liczba zdarzeń na przejazdach z rogatkami / sygnalizacją i bez")
+def events_by_crossing_protection(store: ColumnStore) -> QueryResult:
+    crossing = store.column(EVENT_TABLE, "przejazd_id")
+    on_crossing = ~pd.isna(crossing)
+    crossing_id = np.where(on_crossing, crossing, 0).astype(np.int64)
+    return group_by(
+        {
+            "czy_rogatki": store.column("Przejazd", "czy_rogatki")[crossing_id],
+            "czy_sygnalizacja_swietlna": store.column(
+                "Przejazd", "czy_sygnalizacja_swietlna"
+            )[crossing_id],
+        },
+        {"liczba_zdarzen": ("count", None)},
+        where=on_crossing,
+    )
+
+
+@query("q4", "Koszt napraw po zdarzeniach per przewoźnik")
+def repair_cost_by_operator(store: ColumnStore) -> QueryResult:
+    ride_id = _event_section_lookup(store, "kurs_id")
+    ride_ids, train_ids = store.columns(RIDE_TABLE, "id", "pociag_id")
+    ride_train = np.empty(int(ride_ids.max()) + 1, dtype=train_ids.dtype)
+    ride_train[ride_ids] = train_ids
+    operator = store.column("Pociag", "operator")[ride_train[ride_id]]
+    return group_by(
+        {"przewoznik": operator},
+        {"koszt_naprawy": ("sum", store.column(EVENT_TABLE, "koszt_naprawy"))},
+    ).sort_by("koszt_naprawy", descending=True)
+
+
+@query("q5", "Pary stacji z największą liczbą rannych i ofiar")
+def casualties_by_station_pair(store: ColumnStore, limit: int = 20) -> QueryResult:
+    names = store.column("Stacja", "nazwa")
+    injured, deaths = store.columns(EVENT_TABLE, "liczba_rannych", "liczba_zgonow")
+    result = group_by(
+        {
+            "stacja_wyjazdowa": names[
+                _event_section_lookup(store, "stacja_wyjazdowa_id")
+            ],
+            "stacja_wjazdowa": names[
+                _event_section_lookup(store, "stacja_wjazdowa_id")
+            ],
+        },
+        {"liczba_poszkodowanych": ("sum", injured + deaths)},
+    )
+    return result.sort_by("liczba_poszkodowanych", descending=True).head(limit)
+
+
+@query("q6", "Średnie wywołane opóźnienie wg skali niebezpieczeństwa")
+def delay_by_danger_scale(store: ColumnStore) -> QueryResult:
+    level = store.column("Zdarzenie", "skala_niebezpieczenstwa")[
+        store.column(EVENT_TABLE, "zdarzenie_id")
+    ]
+    return group_by(
+        {"skala_niebezpieczenstwa": _map_codes(level, danger_scale)},
+        {
+            "avg_wywolane_opoznienie": (
+                "mean",
+                store.column(EVENT_TABLE, "wywolane_opoznienie"),
+            )
+        },
+    ).sort_by("avg_wywolane_opoznienie")
+
+
+@query("q7", "Liczba zdarzeń wg pory roku i pory dnia")
+def events_by_season_and_time(store: ColumnStore) -> QueryResult:
+    stamp = store.column(EVENT_TABLE, "data")
+    month = stamp.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    hour = (
+        (stamp - stamp.astype("datetime64[D]"))
+        .astype("timedelta64[h]")
+        .astype(np.int64)
+    )
+    return group_by(
+        {
+            "pora_roku": _map_codes(month, season),
+            "pora_dnia": _map_codes(hour, time_of_day),
+        },
+        {"liczba_zdarzen": ("count", None)},
+    )
+
+
+@query("q8", "Opóźnienia odcinków w deszczu wg miesiąca")
+def rain_delays_by_month(
+    store: ColumnStore, precipitation: str = "deszcz"
+) -> QueryResult:
+    section_ids, departure, delay = store.columns(
+        SECTION_TABLE, "id", "planowa_data_odjazdu", "roznica_czasu"
+    )
+    weather_ids, weather_type = store.columns(WEATHER_TABLE, "id_odcinka", "typ_opadow")
+    section_weather = np.empty(int(section_ids.max()) + 1, dtype=object)
+    section_weather[weather_ids] = weather_type
+    raining = section_weather[section_ids] == precipitation
+    month = departure.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    result = group_by(
+        {"numer_miesiaca": month},
+        {
+            "liczba_opoznionych": ("sum", (delay > 0).astype(np.int64)),
+            "avg_roznica_czasu": ("mean", delay),
+        },
+        where=raining,
+    )
+    result.columns = {
+        "miesiac": np.array(MONTH_NAMES, dtype=object)[
+            result.columns["numer_miesiaca"] - 1
+        ],
+        **result.columns,
+    }
+    return result
+
+
+@query("q9", "Zdarzenia w deszczu z interwencją służb")
+def rain_interventions(
+    store: ColumnStore, precipitation: str = "deszcz"
+) -> QueryResult:
+    weather_ids, weather_type = store.columns(WEATHER_TABLE, "id_odcinka", "typ_opadow")
+    section_weather = np.empty(int(weather_ids.max()) + 1, dtype=object)
+    section_weather[weather_ids] = weather_type
+    event_weather = section_weather[store.column(EVENT_TABLE, "odcinek_kursu_id")]
+    intervention = store.column(EVENT_TABLE, "czy_interwencja_sluzb").astype(bool)
+    return group_by(
+        {"czy_interwencja_sluzb": intervention, "typ_opadow": event_weather},
+        {"liczba_zdarzen": ("count", None)},
+        where=(event_weather == precipitation) & intervention,
+    )
+
+
+@query("q10", "Temperatura min / max / średnia w trakcie kursu")
+def temperature_by_ride(store: ColumnStore) -> QueryResult:
+    section_ids, ride_id = store.columns(SECTION_TABLE, "id", "kurs_id")
+    weather_ids, temperature = store.columns(WEATHER_TABLE, "id_odcinka", "temperatura")
+    section_ride = np.empty(int(section_ids.max()) + 1, dtype=ride_id.dtype)
+    section_ride[section_ids] = ride_id
+    return group_by(
+        {"kurs_id": section_ride[weather_ids]},
+        {
+            "min_temperatura": ("min", temperature),
+            "max_temperatura": ("max", temperature),
+            "avg_temperatura": ("mean", temperature),
+        },
+    )
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Answer the warehouse business questions from snapshot files."
+    )
+    parser.add_argument(
+        "--input-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument("--snapshot", nargs="+", default=["T1", "T2"])
+    parser.add_argument("--rows", type=int, default=20, help="rows printed per result")
+    parser.add_argument(
+        "queries",
+        nargs="*",
+        default=list(QUERIES),
+        help=f"queries to run (default: all of {', '.join(QUERIES)})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    input_path = Path(args.input_dir)
+    if not input_path.is_absolute():
+        input_path = Path(__file__).resolve().parent / input_path
+    engine = QueryEngine(ColumnStore(input_path, args.snapshot))
+    for name in args.queries:
+        started = time.perf_counter()
+        result = engine.run(name)
+        elapsed = time.perf_counter() - started
+        print(f"[{name}] {QUERIES[name][0]} ({elapsed:.2f}s)")
+        print(result.format(args.rows))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from batch_engine import BatchFactEngine, FactBlock
+from compressed import csv_path, open_csv_reader
+from config import _env_int
+from main import RailwayDataGenerator
+from output import EVENT_TABLE, RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, FactWriters
+from partitions import month_keys, partition_path, read_manifest
+from streams import CounterStreams
+from timetable import TIMETABLE_MODES
+
+# ---------------------------------------------------------------------------
+# Ride regeneration
+# Rebuilds selected rides of a counter-stream run without the rest of it.
+# ---------------------------------------------------------------------------
+
+SCAN_RIDES = 1 << 16
+
+
+class RideRegenerator:
+    """Rebuilds rides of a counter-stream run with the given generator settings."""
+
+    def __init__(self, generator: RailwayDataGenerator) -> None:
+        if generator.random_streams != "counter":
+            raise ValueError("Only counter-stream runs can be regenerated")
+        self.dims = generator.compiled_dimensions()
+        self.configs = {"T1": generator.t1_config, "T2": generator.t2_config}
+        self.seed = generator.seed
+        self._first_sections: Dict[str, np.ndarray] = {}
+        self._section_ends: Dict[str, int] = {}
+
+    def ride_base(self, snapshot: str) -> int:
+        """Id of the snapshot's first ride."""
+        return 1 if snapshot == "T1" else 1 + self.configs["T1"].ride_count
+
+    def engine(self, snapshot: str) -> BatchFactEngine:
+        config = self.configs[snapshot]
+        return BatchFactEngine(
+            self.dims[snapshot],
+            config,
+            streams=CounterStreams(self.seed, config.name),
+            ride_base=self.ride_base(snapshot),
+        )
+
+    def first_section_ids(self, snapshot: str) -> np.ndarray:
+        """Id of every ride's first section, from a scan of the route draws."""
+        if snapshot not in self._first_sections:
+            # T2 section ids continue after the last T1 section.
+            first_id = 1 if snapshot == "T1" else self._section_end("T1")
+            engine = self.engine(snapshot)
+            lengths = np.concatenate(
+                [
+                    self.dims[snapshot].route_lengths[engine.routes(chunk)]
+                    for chunk in self._chunks(snapshot)
+                ]
+            )
+            self._first_sections[snapshot] = first_id + np.cumsum(lengths) - lengths
+            self._section_ends[snapshot] = first_id + int(lengths.sum())
+        return self._first_sections[snapshot]
+
+    def _section_end(self, snapshot: str) -> int:
+        self.first_section_ids(snapshot)
+        return self._section_ends[snapshot]
+
+    def rides_by_id(self, snapshot: str, first_id: int, last_id: int) -> np.ndarray:
+        """Snapshot indexes of the rides with ids ``first_id..last_id``."""
+        base, count = self.ride_base(snapshot), self.configs[snapshot].ride_count
+        first, last = max(first_id - base, 0), min(last_id - base, count - 1)
+        return np.arange(first, last + 1, dtype=np.int64)
+
+    def rides_in_month(self, snapshot: str, year: int, month: int) -> np.ndarray:
+        """Snapshot indexes of the rides departing in the given month."""
+        engine = self.engine(snapshot)
+        calendar = self.dims[snapshot].calendar
+        selected = []
+        for chunk in self._chunks(snapshot):
+            bucket = calendar.bucket(engine.departures(chunk))
+            match = (calendar.year[bucket] == year) & (calendar.month[bucket] == month)
+            selected.append(chunk[match])
+        return np.concatenate(selected)
+
+    def blocks(
+        self, snapshot: str, rides: np.ndarray, block_size: int = 4096
+    ) -> Iterator[FactBlock]:
+        engine = self.engine(snapshot)
+        first_sections = self.first_section_ids(snapshot)
+        for start in range(0, len(rides), block_size):
+            chunk = rides[start : start + block_size]
+            yield engine.regenerate(chunk, first_sections[chunk])
+
+    def _chunks(self, snapshot: str) -> Iterator[np.ndarray]:
+        count = self.configs[snapshot].ride_count
+        for start in range(0, count, SCAN_RIDES):
+            yield np.arange(start, min(start + SCAN_RIDES, count), dtype=np.int64)
+
+
+# ---------------------------------------------------------------------------
+# Writing and checking
+# ---------------------------------------------------------------------------
+
+
+def write_rides(
+    directory: Path, blocks: Iterator[FactBlock], route_names: np.ndarray
+) -> None:
+    """Fact files of the regenerated rides; events are written without ids."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with FactWriters(directory, event_ids=False) as writers:
+        for block in blocks:
+            writers.write_block(block, route_names)
+
+
+def _keyed_lines(path: Path, drop_id: bool) -> Iterator[tuple]:
+    """(key, line) per data row; the key is the first column after the id
+    when ``drop_id`` strips it."""
+    with open_csv_reader(path) as handle:
+        next(handle, None)
+        for line in handle:
+            if drop_id:
+                line = line.split(",", 1)[1]
+            yield line.split(",", 1)[0], line
+
+
+def check_rides(
+    snapshot_dir: Path,
+    blocks: Iterator[FactBlock],
+    route_names: np.ndarray,
+    limit: int = 20,
+) -> List[str]:
+    """Compare regenerated rides with the snapshot's fact files.
+
+    Returns up to ``limit`` row-level mismatches; rides, sections and
+    weather rows are matched by id, events by section id.
+    """
+    mismatches: List[str] = []
+    with tempfile.TemporaryDirectory() as scratch:
+        expected_dir = Path(scratch)
+        write_rides(expected_dir, blocks, route_names)
+        for table in (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, EVENT_TABLE):
+            expected = dict(_keyed_lines(csv_path(expected_dir, table), False))
+            sections = None
+            if table == EVENT_TABLE:
+                # Sections without an expected event must not have one either.
+                weather = csv_path(expected_dir, WEATHER_TABLE)
+                sections = {key for key, _ in _keyed_lines(weather, False)}
+            actual_path = csv_path(snapshot_dir, table)
+            for key, line in _keyed_lines(actual_path, table == EVENT_TABLE):
+                wanted = expected.pop(key, None)
+                if wanted is None and (sections is None or key not in sections):
+                    continue
+                if wanted != line:
+                    mismatches.append(
+                        f"{actual_path.name} {key}: expected {wanted!r}, found {line!r}"
+                    )
+                    if len(mismatches) >= limit:
+                        return mismatches
+            for key, line in expected.items():
+                mismatches.append(f"{actual_path.name} {key}: missing {line!r}")
+                if len(mismatches) >= limit:
+                    return mismatches
+    return mismatches
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Regenerate rides of a --random-streams counter run.",
+        epilog="Generator settings must match the run; every option falls back "
+        "to its RAILGEN_* environment variable.",
+    )
+    parser.add_argument(
+        "--output-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument("--snapshot", choices=("T1", "T2"), default="T1")
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument(
+        "--rides", metavar="FIRST[-LAST]", help="ride id or inclusive id range"
+    )
+    selection.add_argument(
+        "--month", metavar="YYYY-MM", help="rides departing in this month"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="compare with the snapshot's fact files instead of writing them",
+    )
+    parser.add_argument(
+        "--target",
+        help="folder for the regenerated fact files "
+        "(default: <output-dir>/regenerated/<snapshot>)",
+    )
+    parser.add_argument("--seed", type=int, default=_env_int("RAILGEN_SEED", 42))
+    parser.add_argument(
+        "--timetable",
+        choices=TIMETABLE_MODES,
+        default=os.getenv("RAILGEN_TIMETABLE", "random"),
+    )
+    parser.add_argument(
+        "--scale-factor", type=float, default=os.getenv("RAILGEN_SCALE_FACTOR")
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    output_path = Path(args.output_dir)
+    if not output_path.is_absolute():
+        output_path = Path(__file__).resolve().parent / output_path
+    generator = RailwayDataGenerator(
+        output_path,
+        seed=args.seed,
+        timetable=args.timetable,
+        scale_factor=args.scale_factor,
+        random_streams="counter",
+    )
+    regenerator = RideRegenerator(generator)
+    if args.rides:
+        first, _, last = args.rides.partition("-")
+        rides = regenerator.rides_by_id(args.snapshot, int(first), int(last or first))
+    else:
+        moment = datetime.strptime(args.month, "%Y-%m")
+        rides = regenerator.rides_in_month(args.snapshot, moment.year, moment.month)
+    blocks = regenerator.blocks(args.snapshot, rides)
+    route_names = regenerator.dims[args.snapshot].route_names
+
+    if args.check:
+        snapshot_dir = output_path / args.snapshot
+        if read_manifest(snapshot_dir) is not None:
+            if not args.month:
+                sys.exit("Partitioned snapshots are checked one --month at a time")
+            moment = np.datetime64(args.month, "s").astype(np.int64)
+            snapshot_dir /= partition_path(int(month_keys(np.array([moment]))[0]))
+        mismatches = check_rides(snapshot_dir, blocks, route_names)
+        for mismatch in mismatches:
+            print(mismatch)
+        print(
+            f"{args.snapshot}: {len(rides)} rides checked, {len(mismatches)} mismatches"
+        )
+        sys.exit(1 if mismatches else 0)
+    target = Path(args.target or output_path / "regenerated" / args.snapshot)
+    write_rides(target, blocks, route_names)
+    print(f"{args.snapshot}: {len(rides)} rides written to {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import random
+from typing import Callable, Dict, Generic, List, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+from config import EVENT_TYPE_WEIGHTS, OPERATOR_WEIGHTS
+
+# ---------------------------------------------------------------------------
+# Alias-table samplers
+# ---------------------------------------------------------------------------
+
+T = TypeVar("T")
+
+# Condition bits of the event-type mix.
+OLD_CROSSING = 1
+SNOW = 2
+CARGO_OPERATOR = 4
+
+
+class AliasTable(Generic[T]):
+    """Walker alias table over ``keys`` with the given (unnormalised) weights."""
+
+    def __init__(self, keys: Sequence[T], weights: Sequence[float]) -> None:
+        if len(keys) != len(weights) or not keys:
+            raise ValueError("An alias table needs one weight per key")
+        scaled = np.asarray(weights, dtype=np.float64)
+        if (scaled < 0).any() or scaled.sum() <= 0:
+            raise ValueError("Alias table weights must be non-negative")
+        size = len(keys)
+        scaled = scaled * size / scaled.sum()
+        prob = np.ones(size)
+        alias = np.arange(size, dtype=np.int64)
+        small = [i for i in range(size) if scaled[i] < 1.0]
+        large = [i for i in range(size) if scaled[i] >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            prob[low] = scaled[low]
+            alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Whatever is left is 1.0 up to rounding and keeps its own column.
+        self.keys = list(keys)
+        self.prob = prob
+        self.alias = alias
+        self._prob = prob.tolist()
+        self._alias = alias.tolist()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def draw_index(self, rng: random.Random) -> int:
+        u = rng.random() * len(self._prob)
+        column = int(u)
+        return column if u - column < self._prob[column] else self._alias[column]
+
+    def draw(self, rng: random.Random) -> T:
+        return self.keys[self.draw_index(rng)]
+
+    def lookup(self, u: np.ndarray) -> np.ndarray:
+        """Outcome indexes for uniforms ``u`` in [0, 1)."""
+        scaled = u * len(self.prob)
+        column = scaled.astype(np.int64)
+        return np.where(scaled - column < self.prob[column], column, self.alias[column])
+
+    def draw_many(self, rng: np.random.Generator, count: int) -> np.ndarray:
+        return self.lookup(rng.random(count))
+
+    def probabilities(self) -> np.ndarray:
+        """The normalised distribution the table encodes."""
+        size = len(self.prob)
+        result = self.prob / size
+        np.add.at(result, self.alias, (1.0 - self.prob) / size)
+        return result
+
+
+class ConditionalAliasTable(Generic[T]):
+    """One alias table per combination of ``bits`` condition flags."""
+
+    def __init__(
+        self,
+        keys: Sequence[T],
+        bits: int,
+        weights_for: Callable[[int], Sequence[float]],
+    ) -> None:
+        self.keys = list(keys)
+        self.tables = [AliasTable(keys, weights_for(code)) for code in range(1 << bits)]
+        self.prob = np.stack([table.prob for table in self.tables])
+        self.alias = np.stack([table.alias for table in self.tables])
+
+    def draw_index(self, rng: random.Random, condition: int) -> int:
+        return self.tables[condition].draw_index(rng)
+
+    def draw(self, rng: random.Random, condition: int) -> T:
+        return self.tables[condition].draw(rng)
+
+    def lookup(self, u: np.ndarray, conditions: np.ndarray) -> np.ndarray:
+        """Outcome indexes for uniforms ``u``, row ``i`` under ``conditions[i]``."""
+        scaled = u * len(self.keys)
+        column = scaled.astype(np.int64)
+        return np.where(
+            scaled - column < self.prob[conditions, column],
+            column,
+            self.alias[conditions, column],
+        )
+
+    def draw_many(self, rng: np.random.Generator, conditions: np.ndarray) -> np.ndarray:
+        return self.lookup(rng.random(len(conditions)), conditions)
+
+
+def event_type_weights(condition: int) -> List[float]:
+    """Event-type mix under a combination of the condition bits above."""
+    weights = dict(EVENT_TYPE_WEIGHTS)
+    if condition & OLD_CROSSING:
+        weights["wypadek"] += 0.04
+        weights["awaria"] += 0.03
+    if condition & SNOW:
+        weights["incydent"] += 0.05
+        weights["awaria"] += 0.04
+    if condition & CARGO_OPERATOR:
+        weights["awaria"] += 0.04
+        weights["incydent"] -= 0.02
+    return [weights[name] for name in EVENT_TYPE_WEIGHTS]
+
+
+def event_ids_by_type(events: Dict[int, Tuple[str, str, int]]) -> Dict[str, List[int]]:
+    """Event definition ids grouped by event type, in id order."""
+    pools: Dict[str, List[int]] = {name: [] for name in EVENT_TYPE_WEIGHTS}
+    for event_id, (event_type, _, _) in sorted(events.items()):
+        pools[event_type].append(event_id)
+    return pools
+
+
+class SamplerRegistry:
+    """Named, precompiled samplers shared by both fact engines."""
+
+    def __init__(self) -> None:
+        self._samplers: Dict[str, object] = {}
+
+    def register(self, name: str, sampler: object) -> None:
+        if name in self._samplers:
+            raise ValueError(f"Sampler already registered: {name}")
+        self._samplers[name] = sampler
+
+    def __getitem__(self, name: str):
+        return self._samplers[name]
+
+    def names(self) -> List[str]:
+        return list(self._samplers)
+
+
+SAMPLERS = SamplerRegistry()
+SAMPLERS.register(
+    "operator", AliasTable(list(OPERATOR_WEIGHTS), list(OPERATOR_WEIGHTS.values()))
+)
+SAMPLERS.register(
+    "event_type",
+    ConditionalAliasTable(list(EVENT_TYPE_WEIGHTS), 3, event_type_weights),
+)
@@ -0,0 +1,175 @@
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Counter-based random streams
+# Philox4x32-10 keyed by (seed, snapshot) over (ride, section, purpose,
+# draw), evaluated on whole arrays of counters.
+# ---------------------------------------------------------------------------
+
+RANDOM_STREAM_MODES = ("sequential", "counter")
+
+# Purposes: the third counter word, one independent stream per decision.
+ROUTE, RIDE, SECTION, EVENT = range(1, 5)
+
+_M0 = np.uint64(0xD2511F53)
+_M1 = np.uint64(0xCD9E8D57)
+_W0 = 0x9E3779B9
+_W1 = 0xBB67AE85
+_LOW = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+_ROUNDS = 10
+
+Size = Union[None, int, Tuple[int, int]]
+
+
+def philox4x32(
+    counter: Sequence[np.ndarray], key: Tuple[int, int]
+) -> Tuple[np.ndarray, ...]:
+    """Philox4x32-10 of broadcastable uint32 counter words under ``key``."""
+    c0, c1, c2, c3 = np.broadcast_arrays(
+        *(np.asarray(word, dtype=np.uint64) for word in counter)
+    )
+    k0, k1 = key
+    for _ in range(_ROUNDS):
+        p0 = c0 * _M0
+        p1 = c2 * _M1
+        c0, c1, c2, c3 = (
+            (p1 >> _SHIFT) ^ c1 ^ np.uint64(k0),
+            p1 & _LOW,
+            (p0 >> _SHIFT) ^ c3 ^ np.uint64(k1),
+            p0 & _LOW,
+        )
+        k0 = (k0 + _W0) & 0xFFFFFFFF
+        k1 = (k1 + _W1) & 0xFFFFFFFF
+    return c0, c1, c2, c3
+
+
+class CounterStreams:
+    """Random numbers of one snapshot, addressed by ride and section."""
+
+    def __init__(self, seed: int, snapshot: str) -> None:
+        snapshot_key = int.from_bytes(snapshot.encode("utf-8"), "little")
+        words = np.random.SeedSequence([seed, snapshot_key]).generate_state(2)
+        self.key = (int(words[0]), int(words[1]))
+
+    def uniforms(
+        self,
+        purpose: int,
+        rides: np.ndarray,
+        positions: Optional[np.ndarray],
+        first_pair: int,
+        pairs: int,
+    ) -> np.ndarray:
+        """Doubles in [0, 1), shape (2 * pairs, rows), 53 bits each.
+
+        Each Philox block yields two doubles; ``first_pair`` selects the
+        block range, so draws of one row never overlap.
+        """
+        rides = np.asarray(rides, dtype=np.uint64)[None, :]
+        positions = np.uint64(0) if positions is None else positions
+        positions = np.asarray(positions, dtype=np.uint64)
+        positions = positions[None, :] if positions.ndim else positions
+        draw = np.arange(first_pair, first_pair + pairs, dtype=np.uint64)[:, None]
+        a, b, c, d = philox4x32((rides, positions, np.uint64(purpose), draw), self.key)
+        first = ((a >> np.uint64(5)) << np.uint64(26)) + (b >> np.uint64(6))
+        second = ((c >> np.uint64(5)) << np.uint64(26)) + (d >> np.uint64(6))
+        values = np.empty((2 * pairs, rides.shape[1]))
+        values[0::2] = first * 2.0**-53
+        values[1::2] = second * 2.0**-53
+        return values
+
+    def draws(
+        self,
+        purpose: int,
+        rides: np.ndarray,
+        positions: Optional[np.ndarray] = None,
+    ) -> "KeyedDraws":
+        return KeyedDraws(self, purpose, rides, positions)
+
+    def sequence(self, purpose: int, first_ride: int) -> "RideSequence":
+        return RideSequence(self, purpose, first_ride)
+
+
+class KeyedDraws:
+    """The ``np.random.Generator`` methods the batch engine uses, keyed by row.
+
+    One instance covers a fixed set of rows (rides, or the sections of
+    rides); every call returns one value per row, or ``size[0]`` values per
+    row for a 2-D ``size``.  Successive calls move on to the next draws of
+    each row, so the engine code reads the same for both stream modes.
+    """
+
+    def __init__(
+        self,
+        streams: CounterStreams,
+        purpose: int,
+        rides: np.ndarray,
+        positions: Optional[np.ndarray],
+    ) -> None:
+        self.streams = streams
+        self.purpose = purpose
+        self.rides = rides
+        self.positions = positions
+        self.rows = len(rides)
+        self._pair = 0
+
+    def random(self, size: Size = None) -> np.ndarray:
+        draws = self._count(size)
+        values = self._uniforms(draws)
+        return values if isinstance(size, tuple) else values[0]
+
+    def integers(self, low, high=None, size: Size = None) -> np.ndarray:
+        if high is None:
+            low, high = 0, low
+        values = self._uniforms(self._count(size))
+        low = np.asarray(low, dtype=np.int64)
+        span = np.asarray(high, dtype=np.int64) - low
+        result = low + np.floor(values * span).astype(np.int64)
+        return result if isinstance(size, tuple) else result[0]
+
+    def normal(self, loc: float = 0.0, scale: float = 1.0, size: Size = None):
+        if isinstance(size, tuple):
+            raise ValueError("Keyed normal draws take one value per row")
+        self._count(size)
+        u = self._uniforms(2)
+        radius = np.sqrt(-2.0 * np.log1p(-u[0]))
+        return loc + scale * radius * np.cos(2.0 * np.pi * u[1])
+
+    def _count(self, size: Size) -> int:
+        if size is None:
+            return 1
+        if isinstance(size, tuple):
+            draws, rows = size
+        else:
+            draws, rows = 1, size
+        if rows != self.rows:
+            raise ValueError(f"Expected {self.rows} rows, got {rows}")
+        return draws
+
+    def _uniforms(self, draws: int) -> np.ndarray:
+        pairs = (draws + 1) // 2
+        values = self.streams.uniforms(
+            self.purpose, self.rides, self.positions, self._pair, pairs
+        )
+        self._pair += pairs
+        return values[:draws]
+
+
+class RideSequence:
+    """Generator-like view of one purpose over consecutive rides.
+
+    Every call covers the next ``size`` rides, which lets code written for a
+    sequential generator (``count_sections``) walk a counter stream.
+    """
+
+    def __init__(self, streams: CounterStreams, purpose: int, first_ride: int) -> None:
+        self.streams = streams
+        self.purpose = purpose
+        self.ride = first_ride
+
+    def integers(self, low, high=None, size: int = 1) -> np.ndarray:
+        rides = np.arange(self.ride, self.ride + size, dtype=np.int64)
+        self.ride += size
+        return self.streams.draws(self.purpose, rides).integers(low, high, size)
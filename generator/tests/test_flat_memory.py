@@ -0,0 +1,19 @@
+import benchmark
+
+# ---------------------------------------------------------------------------
+# Flat peak memory across scale factors
+# With the default settings peak RSS grows only with the dimensions.
+# ---------------------------------------------------------------------------
+
+SCALE_FACTORS = ("1", "4")
+TOLERANCE = 0.10
+
+
+def test_peak_rss_is_flat_across_scale_factors(tmp_path):
+    args = benchmark._parse_args(
+        ["--scale-factor", *SCALE_FACTORS, "--work-dir", str(tmp_path)]
+    )
+    report = benchmark.run_benchmark(args)
+
+    assert [scale["scale_factor"] for scale in report["scales"]] == [1.0, 4.0]
+    assert benchmark.check_flat_rss(report, TOLERANCE) == []
@@ -0,0 +1,241 @@
+from datetime import datetime
+from decimal import Decimal
+from xml.etree import ElementTree
+
+import numpy as np
+import pytest
+
+from batch_engine import FactBlock
+from clock import to_epoch
+from native import (
+    NativeColumn,
+    NativeFactWriters,
+    TextLabels,
+    decode_rows,
+    encode_rows,
+    format_file,
+    part_path,
+    read_rows,
+    table_columns,
+)
+from output import (
+    EVENT_TABLE,
+    RIDE_TABLE,
+    SECTION_TABLE,
+    WEATHER_TABLE,
+    OutputOptions,
+)
+
+# ---------------------------------------------------------------------------
+# SQL Server native encoding, checked offline
+# ---------------------------------------------------------------------------
+
+STAMPS = [
+    datetime(1970, 1, 1),
+    datetime(2023, 4, 30, 23, 59, 59),
+    datetime(1999, 12, 31, 6),
+]
+
+
+def _round_trip(columns, values):
+    return decode_rows(columns, encode_rows(columns, values))
+
+
+@pytest.mark.parametrize(
+    "spec, values, expected",
+    [
+        ("int", [0, -(2**31), 2**31 - 1], [0, -(2**31), 2**31 - 1]),
+        ("bigint", [1, -(2**63), 2**63 - 1], [1, -(2**63), 2**63 - 1]),
+        ("bit", [0, 1, 1], [0, 1, 1]),
+        (
+            "decimal(10,2)",
+            [1234.56, -0.01, 0.0],
+            [Decimal("1234.56"), Decimal("-0.01"), Decimal("0.00")],
+        ),
+        (
+            "decimal(4,1)",
+            [-12.5, 0.1, 99.9],
+            [Decimal("-12.5"), Decimal("0.1"), Decimal("99.9")],
+        ),
+        ("datetime", [to_epoch(stamp) for stamp in STAMPS], STAMPS),
+        ("varchar(40)", ["Łódź Fabryczna", "Kraków Główny", ""], None),
+        ("char(11)", ["02270803628", "90010112345", "00000000000"], None),
+    ],
+)
+def test_column_round_trip(spec, values, expected):
+    column = NativeColumn.parse("value", spec)
+    if column.text:
+        data = values
+    else:
+        dtype = np.float64 if column.type == "decimal" else np.int64
+        data = np.asarray(values, dtype=dtype)
+    rows = _round_trip([column], [data])
+    assert [row[0] for row in rows] == (values if expected is None else expected)
+
+
+def test_nullable_columns_round_trip_null():
+    columns = [
+        NativeColumn.parse("id", "bigint"),
+        NativeColumn.parse("ref", "int null"),
+    ]
+    ref = np.ma.masked_array([7, 0, -3], mask=[False, True, False])
+    rows = _round_trip(columns, [np.array([1, 2, 3]), ref])
+    assert rows == [(1, 7), (2, None), (3, -3)]
+
+
+def test_text_labels_round_trip_by_code():
+    column = NativeColumn.parse("nazwa", "varchar(40)")
+    labels = TextLabels(["Łódź Kaliska", "Gdańsk", "Zielona Góra"], column)
+    rows = _round_trip([column], [(labels, np.array([2, 0, 0, 1]))])
+    assert [row[0] for row in rows] == [
+        "Zielona Góra",
+        "Łódź Kaliska",
+        "Łódź Kaliska",
+        "Gdańsk",
+    ]
+
+
+def test_text_longer_than_column_is_rejected():
+    column = NativeColumn.parse("plec", "varchar(3)")
+    with pytest.raises(ValueError, match="at most 3 characters"):
+        TextLabels(["Mężczyzna"], column)
+
+
+def test_mixed_row_round_trip():
+    columns = table_columns(EVENT_TABLE)
+    crossing = np.ma.masked_array([12, 0], mask=[False, True])
+    values = [
+        np.array([1, 2]),
+        np.array([10, 11]),
+        crossing,
+        np.array([3, 4]),
+        np.array([15, 0]),
+        np.array([2, 0]),
+        np.array([0, 1]),
+        np.array([1500.25, 0.0]),
+        np.array([True, False]),
+        np.array([to_epoch(STAMPS[1]), to_epoch(STAMPS[2])]),
+        np.array([80, 120]),
+    ]
+    assert _round_trip(columns, values) == [
+        (1, 10, 12, 3, 15, 2, 0, Decimal("1500.25"), 1, STAMPS[1], 80),
+        (2, 11, None, 4, 0, 0, 1, Decimal("0.00"), 0, STAMPS[2], 120),
+    ]
+
+
+def test_format_file_is_a_bcp_format_file():
+    root = ElementTree.fromstring(format_file(table_columns(WEATHER_TABLE)))
+    namespace = "{http://schemas.microsoft.com/sqlserver/2004/bulkload/format}"
+    assert root.tag == f"{namespace}BCPFORMAT"
+    assert len(root.find(f"{namespace}RECORD")) == 5
+    assert len(root.find(f"{namespace}ROW")) == 5
+
+
+# ---------------------------------------------------------------------------
+# Fact files split by ride range
+# ---------------------------------------------------------------------------
+
+
+def _block(first_ride: int, rides: int) -> FactBlock:
+    """``rides`` rides with two sections each and an event on every third."""
+    ride_id = np.arange(first_ride, first_ride + rides, dtype=np.int64)
+    section_ride_id = np.repeat(ride_id, 2)
+    sections = len(section_ride_id)
+    section_id = np.arange(1, sections + 1, dtype=np.int64)
+    event_section_id = section_id[::3]
+    events = len(event_section_id)
+    start = to_epoch(datetime(2023, 1, 1))
+    return FactBlock(
+        ride_id=ride_id,
+        ride_route=np.arange(rides) % 2,
+        ride_delay=np.ones(rides, dtype=np.int64),
+        ride_departure=start + ride_id * 3600,
+        ride_arrival=start + ride_id * 3600 + 1800,
+        ride_train_id=np.ones(rides, dtype=np.int64),
+        ride_driver_id=np.ones(rides, dtype=np.int64),
+        section_id=section_id,
+        section_ride_id=section_ride_id,
+        section_number=np.tile([1, 2], rides),
+        section_departure_station=np.ones(sections, dtype=np.int64),
+        section_arrival_station=np.ones(sections, dtype=np.int64),
+        section_delay=np.ones(sections, dtype=np.int64),
+        section_arrival=start + section_id * 60,
+        section_departure=start + section_id * 60,
+        weather_temperature=np.full(sections, -2.5),
+        weather_precipitation=np.zeros(sections),
+        weather_type=np.zeros(sections, dtype=np.int64),
+        event_id=np.arange(1, events + 1, dtype=np.int64),
+        event_section_id=event_section_id,
+        event_crossing_id=np.where(np.arange(events) % 2, 0, 5),
+        event_definition_id=np.ones(events, dtype=np.int64),
+        event_delay=np.ones(events, dtype=np.int64),
+        event_injured=np.zeros(events, dtype=np.int64),
+        event_deaths=np.zeros(events, dtype=np.int64),
+        event_repair_cost=np.full(events, 99.99),
+        event_emergency=np.zeros(events, dtype=bool),
+        event_time=start + event_section_id * 60,
+        event_speed=np.ones(events, dtype=np.int64),
+    )
+
+
+def test_fact_parts_follow_ride_ranges(tmp_path):
+    first_ride, rides, files = 101, 7, 3
+    block = _block(first_ride, rides)
+    options = OutputOptions(format="bcp", bcp_files=files)
+    route_names = np.array(
+        ["Łódź Kaliska - Kraków Główny", "Gdynia - Hel"], dtype=object
+    )
+    with NativeFactWriters(tmp_path, options, (first_ride, rides)) as writers:
+        parts = writers.part_of(block.ride_id)
+        writers.write_block(block, route_names)
+
+    # Equal, contiguous ride ranges covering every part.
+    assert parts.tolist() == [0, 0, 0, 1, 1, 2, 2]
+    part_of_ride = dict(zip(block.ride_id.tolist(), parts.tolist()))
+    part_of_section = {
+        section: part_of_ride[ride]
+        for section, ride in zip(
+            block.section_id.tolist(), block.section_ride_id.tolist()
+        )
+    }
+    tables = {
+        table: table_columns(table)
+        for table in (RIDE_TABLE, SECTION_TABLE, WEATHER_TABLE, EVENT_TABLE)
+    }
+    found = {table: [] for table in tables}
+    for part in range(files):
+        rows = {
+            table: list(read_rows(part_path(tmp_path, table, part, files), columns))
+            for table, columns in tables.items()
+        }
+        assert {part_of_ride[row[0]] for row in rows[RIDE_TABLE]} == {part}
+        assert {part_of_ride[row[1]] for row in rows[SECTION_TABLE]} == {part}
+        assert {part_of_section[row[0]] for row in rows[WEATHER_TABLE]} == {part}
+        assert {part_of_section[row[1]] for row in rows[EVENT_TABLE]} <= {part}
+        for table, table_rows in rows.items():
+            found[table] += table_rows
+
+    assert [row[0] for row in found[RIDE_TABLE]] == block.ride_id.tolist()
+    assert [row[1] for row in found[RIDE_TABLE]] == route_names[
+        block.ride_route
+    ].tolist()
+    assert [row[0] for row in found[SECTION_TABLE]] == block.section_id.tolist()
+    assert [row[0] for row in found[WEATHER_TABLE]] == block.section_id.tolist()
+    assert [row[0] for row in found[EVENT_TABLE]] == block.event_id.tolist()
+    assert [row[2] for row in found[EVENT_TABLE]] == [
+        None if crossing == 0 else crossing
+        for crossing in block.event_crossing_id.tolist()
+    ]
+
+
+def test_part_files_decode_with_decode_rows(tmp_path):
+    block = _block(1, 4)
+    options = OutputOptions(format="bcp", bcp_files=2)
+    with NativeFactWriters(tmp_path, options, (1, 4)) as writers:
+        writers.write_block(block, np.array(["A", "B"], dtype=object))
+    columns = table_columns(RIDE_TABLE)
+    decoded = [
+        decode_rows(columns, part_path(tmp_path, RIDE_TABLE, part, 2).read_bytes())
+        for part in range(2)
+    ]
+    assert [[row[0] for row in rows] for rows in decoded] == [[1, 2], [3, 4]]
@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from clock import MINUTE
+from config import REGIONS, RouteTemplate
+
+# ---------------------------------------------------------------------------
+# Compiled route timetables
+# ---------------------------------------------------------------------------
+
+TIMETABLE_MODES = ("random", "repeating")
+
+# Daily departures per route in repeating mode, and the service window.
+DAILY_DEPARTURES = (4, 16)
+FIRST_DEPARTURE_MINUTE = 4 * 60
+LAST_DEPARTURE_MINUTE = 22 * 60 + 55
+DEPARTURE_STEP_MINUTES = 5
+
+
+@dataclass(frozen=True)
+class RouteTimetable:
+    name: str
+    departure_station: np.ndarray
+    arrival_station: np.ndarray
+    section_minutes: np.ndarray
+    start_minutes: np.ndarray
+    hotspot: np.ndarray
+    region: np.ndarray
+    departures: np.ndarray
+    # (departure, arrival, hotspot, region, departure offset, arrival offset)
+    # per section as plain Python values (offsets in seconds), for the scalar
+    # engine.
+    section_rows: Tuple[Tuple[int, int, bool, str, int, int], ...]
+
+    @property
+    def section_count(self) -> int:
+        return len(self.section_minutes)
+
+    @property
+    def total_minutes(self) -> int:
+        return int(self.start_minutes[-1] + self.section_minutes[-1])
+
+
+def daily_departures(rng: np.random.Generator) -> np.ndarray:
+    """Sorted minutes after midnight of one route's daily runs."""
+    slots = np.arange(
+        FIRST_DEPARTURE_MINUTE, LAST_DEPARTURE_MINUTE + 1, DEPARTURE_STEP_MINUTES
+    )
+    count = rng.integers(DAILY_DEPARTURES[0], DAILY_DEPARTURES[1] + 1)
+    return np.sort(rng.choice(slots, size=count, replace=False)).astype(np.int64)
+
+
+def compile_timetables(
+    routes: List[RouteTemplate],
+    station_regions: np.ndarray,
+    hotspot_station_ids: Iterable[int],
+    departures_rng: Optional[np.random.Generator] = None,
+) -> List[RouteTimetable]:
+    """Compile every route; ``departures_rng`` enables repeating departures.
+
+    ``station_regions`` holds the region code of every station, by id.
+    """
+    hotspots = set(hotspot_station_ids)
+    timetables = []
+    for route in routes:
+        stops = np.asarray(route.station_ids, dtype=np.int64)
+        minutes = np.asarray(route.section_minutes, dtype=np.int64)
+        start_minutes = np.cumsum(minutes) - minutes
+        dep, arr = stops[:-1], stops[1:]
+        hotspot = np.array(
+            [
+                a in hotspots or b in hotspots
+                for a, b in zip(dep.tolist(), arr.tolist())
+            ],
+            dtype=bool,
+        )
+        region = station_regions[arr].astype(np.int8)
+        timetables.append(
+            RouteTimetable(
+                name=route.name,
+                departure_station=dep,
+                arrival_station=arr,
+                section_minutes=minutes,
+                start_minutes=start_minutes,
+                hotspot=hotspot,
+                region=region,
+                departures=(
+                    daily_departures(departures_rng)
+                    if departures_rng is not None
+                    else np.zeros(0, dtype=np.int64)
+                ),
+                section_rows=tuple(
+                    (
+                        a,
+                        b,
+                        flag,
+                        REGIONS[code],
+                        start * MINUTE,
+                        end * MINUTE,
+                    )
+                    for a, b, flag, code, start, end in zip(
+                        dep.tolist(),
+                        arr.tolist(),
+                        hotspot.tolist(),
+                        region.tolist(),
+                        start_minutes.tolist(),
+                        (start_minutes + minutes).tolist(),
+                    )
+                ),
+            )
+        )
+    return timetables
@@ -0,0 +1,709 @@
+import argparse
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from changes import INSERT_SUFFIX, UPDATE_SUFFIX
+from compressed import csv_path, open_csv_reader, snapshot_format
+from config import SWITCH_DATE, UPGRADE_DATE, _env_int
+from output import (
+    DIMENSION_COLUMNS,
+    EVENT_COLUMNS,
+    EVENT_TABLE,
+    RIDE_COLUMNS,
+    RIDE_TABLE,
+    SECTION_COLUMNS,
+    SECTION_TABLE,
+    WEATHER_COLUMNS,
+    WEATHER_TABLE,
+)
+from partitions import read_manifest
+
+# ---------------------------------------------------------------------------
+# Streaming snapshot validation
+# Checks the generated files directly, each fact file once and in chunks;
+# the first failed check stops the run with the offending rows.
+# ---------------------------------------------------------------------------
+
+DIMENSION_TABLES = ("Stacja", "Przejazd", "Pociag", "Maszynista", "Zdarzenie")
+PESEL_WEIGHTS = np.array([1, 3, 7, 9, 1, 3, 7, 9, 1, 3])
+# Month offset of the PESEL century encoding -> first year of the century.
+PESEL_CENTURIES = {80: 1800, 0: 1900, 20: 2000, 40: 2100, 60: 2200}
+# One-sided z score an effect must reach, and the smallest sample (events
+# or rides on each side) on which a missing effect counts as a failure.
+EFFECT_Z = 3.0
+EFFECT_MIN_ROWS = 1000
+UPGRADE_STAMP = UPGRADE_DATE.strftime("%Y-%m-%d %H:%M:%S")
+SWITCH_STAMP = SWITCH_DATE.strftime("%Y-%m-%d %H:%M:%S")
+REPLACEMENT_OPERATOR = "DB Cargo Polska"
+REPLACEMENT_SUFFIX = "-DB"
+
+
+class ValidationError(Exception):
+    """A failed check, with diagnostics for the offending rows."""
+
+    def __init__(self, message: str, rows: Sequence[str] = ()) -> None:
+        super().__init__(message)
+        self.rows = list(rows)
+
+    def __str__(self) -> str:
+        return "\n".join([self.args[0], *(f"  {row}" for row in self.rows)])
+
+
+class Bitset:
+    """Set of non-negative integer ids, one bit per possible id."""
+
+    def __init__(self) -> None:
+        self.words = np.zeros(0, dtype=np.uint64)
+
+    def add(self, ids: np.ndarray) -> None:
+        if not len(ids):
+            return
+        needed = int(ids.max()) // 64 + 1
+        if needed > len(self.words):
+            grown = np.zeros(max(needed, 2 * len(self.words)), dtype=np.uint64)
+            grown[: len(self.words)] = self.words
+            self.words = grown
+        np.bitwise_or.at(self.words, ids >> 6, _bits(ids))
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        word = ids >> 6
+        inside = (ids >= 0) & (word < len(self.words))
+        found = np.zeros(len(ids), dtype=bool)
+        found[inside] = (self.words[word[inside]] & _bits(ids[inside])) != 0
+        return found
+
+    def missing_from(self, other: "Bitset") -> np.ndarray:
+        """Ids in ``other`` that are not in this set."""
+        words = other.words.copy()
+        shared = min(len(words), len(self.words))
+        words[:shared] &= ~self.words[:shared]
+        bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+        return np.flatnonzero(bits)
+
+
+def _bits(ids: np.ndarray) -> np.ndarray:
+    return np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64))
+
+
+def two_proportion_z(hits_a: int, total_a: int, hits_b: int, total_b: int) -> float:
+    """z score of rate b minus rate a under a pooled two-proportion test."""
+    pooled = (hits_a + hits_b) / (total_a + total_b)
+    spread = math.sqrt(pooled * (1 - pooled) * (1 / total_a + 1 / total_b))
+    if not spread:
+        return 0.0
+    return (hits_b / total_b - hits_a / total_a) / spread
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+def _read_table(path: Path, columns: Sequence[str]) -> pd.DataFrame:
+    with open_csv_reader(path) as handle:
+        frame = pd.read_csv(handle, dtype={"pesel": str, "nazwa": str})
+    if list(frame.columns) != list(columns):
+        raise ValidationError(f"{path.name}: unexpected header {list(frame.columns)}")
+    return frame
+
+
+def _read_chunks(
+    path: Path, columns: Sequence[str], usecols: Sequence[str], chunk_rows: int
+) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """(line number of the first row, rows) per chunk of a fact file."""
+    with open_csv_reader(path) as handle:
+        header = handle.readline().rstrip("\r\n").split(",")
+        if header != list(columns):
+            raise ValidationError(f"{path.name}: unexpected header {header}")
+        line = 2
+        for chunk in pd.read_csv(
+            handle,
+            names=list(columns),
+            usecols=list(usecols),
+            chunksize=chunk_rows,
+            keep_default_na=False,
+            na_values={"przejazd_id": [""]},
+        ):
+            yield line, chunk
+            line += len(chunk)
+
+
+def _fail(
+    message: str,
+    source: str,
+    first_line: Optional[int],
+    frame: pd.DataFrame,
+    mask: np.ndarray,
+    max_rows: int,
+) -> None:
+    """Raise for the rows selected by ``mask``, if any.
+
+    Rows are located by line when ``first_line`` gives the file line of the
+    frame's first row (merged dimension frames have no such line).
+    """
+    if not mask.any():
+        return
+    offending = np.flatnonzero(mask)
+    rows = []
+    for index in offending[:max_rows]:
+        values = " ".join(f"{k}={v}" for k, v in frame.iloc[index].items())
+        where = source if first_line is None else f"{source}:{first_line + index}"
+        rows.append(f"{where}: {values}")
+    if len(offending) > max_rows:
+        rows.append(f"... {len(offending) - max_rows} more in this chunk")
+    raise ValidationError(f"{message} ({source})", rows)
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+
+class SnapshotValidator:
+    """Validates snapshots in order; T2 dimensions may be change sets."""
+
+    def __init__(
+        self, input_dir: Path, chunk_rows: int = 1_000_000, max_rows: int = 10
+    ) -> None:
+        self.input_dir = input_dir
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self.dimensions: Dict[str, pd.DataFrame] = {}
+        self.report: List[str] = []
+
+    def validate(self, snapshots: Sequence[str]) -> List[str]:
+        for snapshot in snapshots:
+            self.validate_snapshot(snapshot)
+        return self.report
+
+    def validate_snapshot(self, snapshot: str) -> None:
+        directory = self.input_dir / snapshot
+        output_format = snapshot_format(directory)
+        if output_format != "csv":
+            raise ValidationError(
+                f"{snapshot}: unsupported format {output_format}, "
+                "validate.py reads CSV snapshots"
+            )
+        if read_manifest(directory) is not None:
+            raise ValidationError(
+                f"{snapshot}: partitioned snapshots are not supported, "
+                "validate.py reads unpartitioned fact files"
+            )
+        self._load_dimensions(directory)
+        self._check_dimensions(snapshot)
+        self._index_dimensions()
+        self.stats = dict.fromkeys(
+            (
+                "sections_before",
+                "sections_after",
+                "legacy_events_before",
+                "legacy_events_after",
+                "cargo_before",
+                "cargo_after",
+                "replacement_before",
+                "replacement_after",
+            ),
+            0,
+        )
+        self.rides, self.sections = Bitset(), Bitset()
+        self._scan_rides(directory)
+        self._scan_sections(directory)
+        self._scan_weather(directory)
+        self._scan_events(directory)
+        self._check_effects(snapshot)
+
+    # ------------------------------------------------------------------
+    # Dimensions
+    # ------------------------------------------------------------------
+
+    def _load_dimensions(self, directory: Path) -> None:
+        for table in DIMENSION_TABLES:
+            columns = DIMENSION_COLUMNS[table]
+            path = csv_path(directory, table)
+            if path.exists():
+                self.dimensions[table] = _read_table(path, columns)
+                continue
+            if table not in self.dimensions:
+                raise ValidationError(
+                    f"{directory.name}: no {table} table and no earlier snapshot"
+                )
+            changes = [
+                _read_table(csv_path(directory, f"{table}{suffix}"), columns)
+                for suffix in (INSERT_SUFFIX, UPDATE_SUFFIX)
+            ]
+            # Empty change sets would turn every column into objects.
+            changes = [frame for frame in changes if len(frame)]
+            merged = pd.concat([self.dimensions[table], *changes], ignore_index=True)
+            self.dimensions[table] = merged.drop_duplicates("id", keep="last")
+
+    def _check_dimensions(self, snapshot: str) -> None:
+        for table, frame in self.dimensions.items():
+            ids = frame["id"].to_numpy()
+            _fail(
+                "duplicate or non-positive id",
+                f"{snapshot} {table}",
+                None,
+                frame,
+                pd.Series(ids).duplicated(keep=False).to_numpy() | (ids <= 0),
+                self.max_rows,
+            )
+        self._check_pesel(snapshot)
+        self.report.append(
+            f"{snapshot} dimensions: "
+            + ", ".join(f"{t} {len(f)}" for t, f in self.dimensions.items())
+        )
+
+    def _check_pesel(self, snapshot: str) -> None:
+        drivers = self.dimensions["Maszynista"]
+        source = f"{snapshot} Maszynista"
+        pesel = drivers["pesel"].fillna("").to_numpy(dtype=str)
+        shape_ok = (np.char.str_len(pesel) == 11) & np.char.isdigit(pesel)
+        _fail("PESEL is not 11 digits", source, None, drivers, ~shape_ok, self.max_rows)
+
+        digits = (
+            np.frombuffer("".join(pesel).encode("ascii"), dtype=np.uint8).reshape(
+                -1, 11
+            )
+            - ord("0")
+        ).astype(np.int64)
+        checksum = (10 - (digits[:, :10] @ PESEL_WEIGHTS) % 10) % 10
+        _fail(
+            "PESEL checksum mismatch",
+            source,
+            None,
+            drivers,
+            checksum != digits[:, 10],
+            self.max_rows,
+        )
+
+        encoded_month = digits[:, 2] * 10 + digits[:, 3]
+        century = encoded_month - (encoded_month - 1) % 20 - 1
+        month = encoded_month - century
+        base = np.zeros(len(pesel), dtype=np.int64)
+        for offset, first_year in PESEL_CENTURIES.items():
+            base[century == offset] = first_year
+        year = base + digits[:, 0] * 10 + digits[:, 1]
+        day = digits[:, 4] * 10 + digits[:, 5]
+        months = (year - 1970) * 12 + month - 1
+        month_days = (
+            (months + 1).astype("datetime64[M]").astype("datetime64[D]")
+            - months.astype("datetime64[M]").astype("datetime64[D]")
+        ).astype(np.int64)
+        _fail(
+            "PESEL encodes an invalid birth date",
+            source,
+            None,
+            drivers,
+            (month < 1) | (month > 12) | (day < 1) | (day > month_days),
+            self.max_rows,
+        )
+        odd = digits[:, 9] % 2 == 1
+        _fail(
+            "PESEL gender digit does not match plec",
+            source,
+            None,
+            drivers,
+            odd != (drivers["plec"].to_numpy() == "man"),
+            self.max_rows,
+        )
+        _fail(
+            "duplicate PESEL",
+            source,
+            None,
+            drivers,
+            pd.Series(pesel).duplicated(keep=False).to_numpy(),
+            self.max_rows,
+        )
+
+    def _index_dimensions(self) -> None:
+        """Bitsets and id-indexed lookup arrays over the dimension tables."""
+        self.ids: Dict[str, Bitset] = {}
+        for table, frame in self.dimensions.items():
+            self.ids[table] = Bitset()
+            self.ids[table].add(frame["id"].to_numpy())
+
+        crossings = self.dimensions["Przejazd"]
+        self.legacy_crossing = np.zeros(crossings["id"].max() + 1, dtype=bool)
+        self.legacy_crossing[crossings["id"].to_numpy()] = (
+            crossings[["czy_rogatki", "czy_sygnalizacja_swietlna", "czy_oswietlony"]]
+            .sum(axis=1)
+            .to_numpy()
+            == 0
+        )
+
+        drivers = self.dimensions["Maszynista"]
+        self.employment_year = np.zeros(drivers["id"].max() + 1, dtype=np.int64)
+        self.employment_year[drivers["id"].to_numpy()] = drivers["rok_zatrudnienia"]
+
+        # Switched trains: the replacement is named after its original.
+        trains = self.dimensions["Pociag"]
+        size = trains["id"].max() + 1
+        operator = trains["operator"].to_numpy()
+        self.cargo_train = np.zeros(size, dtype=bool)
+        self.cargo_train[trains["id"].to_numpy()] = (
+            np.char.find(operator.astype(str), "Cargo") >= 0
+        )
+        self.replacement_train = np.zeros(size, dtype=bool)
+        self.switched_train = np.zeros(size, dtype=bool)
+        names = trains["nazwa"].astype(str)
+        unique = ~names.duplicated(keep=False).to_numpy()
+        by_name = pd.Series(trains["id"].to_numpy()[unique], names.to_numpy()[unique])
+        replacements = trains[
+            (operator == REPLACEMENT_OPERATOR)
+            & names.str.endswith(REPLACEMENT_SUFFIX).to_numpy()
+        ]
+        originals = by_name.reindex(
+            replacements["nazwa"].str[: -len(REPLACEMENT_SUFFIX)]
+        )
+        paired = originals.notna().to_numpy()
+        self.replacement_train[replacements["id"].to_numpy()[paired]] = True
+        self.switched_train[originals.to_numpy()[paired].astype(np.int64)] = True
+
+    # ------------------------------------------------------------------
+    # Facts
+    # ------------------------------------------------------------------
+
+    def _scan_rides(self, directory: Path) -> None:
+        path = csv_path(directory, RIDE_TABLE)
+        usecols = ("id", "planowa_data_odjazdu", "pociag_id", "maszynista_id")
+        rows = 0
+        for line, chunk in _read_chunks(path, RIDE_COLUMNS, usecols, self.chunk_rows):
+            ride = chunk["id"].to_numpy()
+            self._check_new_ids("duplicate ride id", self.rides, path, line, chunk)
+            train = chunk["pociag_id"].to_numpy()
+            driver = chunk["maszynista_id"].to_numpy()
+            self._check_reference("Pociag", "pociag_id", path, line, chunk)
+            self._check_reference("Maszynista", "maszynista_id", path, line, chunk)
+
+            departure = chunk["planowa_data_odjazdu"].to_numpy(dtype=str)
+            year = departure.astype("datetime64[Y]").astype(np.int64) + 1970
+            _fail(
+                "driver not yet employed in the ride's year",
+                path.name,
+                line,
+                chunk,
+                self.employment_year[driver] > year,
+                self.max_rows,
+            )
+            after = departure >= SWITCH_STAMP
+            _fail(
+                "replacement train used before the switch date",
+                path.name,
+                line,
+                chunk,
+                ~after & self.replacement_train[train],
+                self.max_rows,
+            )
+            _fail(
+                "switched train still used after the switch date",
+                path.name,
+                line,
+                chunk,
+                after & self.switched_train[train],
+                self.max_rows,
+            )
+            cargo = self.cargo_train[train]
+            replacement = self.replacement_train[train]
+            self.stats["cargo_before"] += int((cargo & ~after).sum())
+            self.stats["cargo_after"] += int((cargo & after).sum())
+            self.stats["replacement_before"] += int((replacement & ~after).sum())
+            self.stats["replacement_after"] += int((replacement & after).sum())
+            self.rides.add(ride)
+            rows += len(chunk)
+        self.ride_count = rows
+        self.report.append(f"{directory.name} {RIDE_TABLE}: {rows} rows ok")
+
+    def _scan_sections(self, directory: Path) -> None:
+        path = csv_path(directory, SECTION_TABLE)
+        usecols = (
+            "id",
+            "kurs_id",
+            "numer_etapu_kursu",
+            "stacja_wyjazdowa_id",
+            "stacja_wjazdowa_id",
+            "planowa_data_odjazdu",
+        )
+        rides_with_sections = Bitset()
+        last_ride, last_number, last_station = -1, 0, -1
+        rows = 0
+        for line, chunk in _read_chunks(
+            path, SECTION_COLUMNS, usecols, self.chunk_rows
+        ):
+            self._check_new_ids(
+                "duplicate section id", self.sections, path, line, chunk
+            )
+            _fail(
+                "section of an unknown ride",
+                path.name,
+                line,
+                chunk,
+                ~self.rides.contains(chunk["kurs_id"].to_numpy()),
+                self.max_rows,
+            )
+            self._check_reference("Stacja", "stacja_wyjazdowa_id", path, line, chunk)
+            self._check_reference("Stacja", "stacja_wjazdowa_id", path, line, chunk)
+
+            ride = chunk["kurs_id"].to_numpy()
+            number = chunk["numer_etapu_kursu"].to_numpy()
+            start = chunk["stacja_wyjazdowa_id"].to_numpy()
+            end = chunk["stacja_wjazdowa_id"].to_numpy()
+            previous_ride = np.concatenate(([last_ride], ride[:-1]))
+            previous_number = np.concatenate(([last_number], number[:-1]))
+            previous_end = np.concatenate(([last_station], end[:-1]))
+            same = ride == previous_ride
+            _fail(
+                "section numbers of a ride are not 1, 2, ...",
+                path.name,
+                line,
+                chunk,
+                np.where(same, number != previous_number + 1, number != 1),
+                self.max_rows,
+            )
+            _fail(
+                "section does not start where the previous one ended",
+                path.name,
+                line,
+                chunk,
+                same & (start != previous_end),
+                self.max_rows,
+            )
+            first = ~same
+            regrouped = np.zeros(len(chunk), dtype=bool)
+            regrouped[first] = (
+                rides_with_sections.contains(ride[first])
+                | pd.Series(ride[first]).duplicated().to_numpy()
+            )
+            _fail(
+                "sections of a ride are not contiguous",
+                path.name,
+                line,
+                chunk,
+                regrouped,
+                self.max_rows,
+            )
+            rides_with_sections.add(ride[first])
+            self.sections.add(chunk["id"].to_numpy())
+
+            after = chunk["planowa_data_odjazdu"].to_numpy(dtype=str) >= UPGRADE_STAMP
+            self.stats["sections_after"] += int(after.sum())
+            self.stats["sections_before"] += int((~after).sum())
+            last_ride, last_number, last_station = ride[-1], number[-1], end[-1]
+            rows += len(chunk)
+
+        without = rides_with_sections.missing_from(self.rides)
+        if len(without):
+            raise ValidationError(
+                f"{len(without)} rides without sections ({path.name})",
+                [f"kurs id={ride}" for ride in without[: self.max_rows]],
+            )
+        self.section_count = rows
+        self.report.append(f"{directory.name} {SECTION_TABLE}: {rows} rows ok")
+
+    def _scan_weather(self, directory: Path) -> None:
+        path = csv_path(directory, WEATHER_TABLE)
+        measured = Bitset()
+        rows = 0
+        for line, chunk in _read_chunks(
+            path, WEATHER_COLUMNS, ("id_odcinka",), self.chunk_rows
+        ):
+            section = chunk["id_odcinka"].to_numpy()
+            _fail(
+                "weather for an unknown section",
+                path.name,
+                line,
+                chunk,
+                ~self.sections.contains(section),
+                self.max_rows,
+            )
+            self._check_new_ids(
+                "second weather row for a section",
+                measured,
+                path,
+                line,
+                chunk,
+                "id_odcinka",
+            )
+            measured.add(section)
+            rows += len(chunk)
+        if rows != self.section_count:
+            missing = measured.missing_from(self.sections)
+            raise ValidationError(
+                f"{len(missing)} sections without weather ({path.name})",
+                [f"odcinek id={section}" for section in missing[: self.max_rows]],
+            )
+        self.report.append(f"{directory.name} {WEATHER_TABLE}: {rows} rows ok")
+
+    def _scan_events(self, directory: Path) -> None:
+        path = csv_path(directory, EVENT_TABLE)
+        usecols = ("id", "odcinek_kursu_id", "przejazd_id", "zdarzenie_id", "data")
+        events, event_sections = Bitset(), Bitset()
+        rows = 0
+        for line, chunk in _read_chunks(path, EVENT_COLUMNS, usecols, self.chunk_rows):
+            self._check_new_ids("duplicate event id", events, path, line, chunk)
+            section = chunk["odcinek_kursu_id"].to_numpy()
+            _fail(
+                "event on an unknown section",
+                path.name,
+                line,
+                chunk,
+                ~self.sections.contains(section),
+                self.max_rows,
+            )
+            self._check_new_ids(
+                "second event on a section",
+                event_sections,
+                path,
+                line,
+                chunk,
+                "odcinek_kursu_id",
+            )
+            self._check_reference("Zdarzenie", "zdarzenie_id", path, line, chunk)
+
+            crossing = chunk["przejazd_id"].to_numpy(dtype=np.float64)
+            at_crossing = ~np.isnan(crossing)
+            crossing = np.where(at_crossing, crossing, 0).astype(np.int64)
+            _fail(
+                "event at an unknown crossing",
+                path.name,
+                line,
+                chunk,
+                at_crossing & ~self.ids["Przejazd"].contains(crossing),
+                self.max_rows,
+            )
+            legacy = at_crossing & self.legacy_crossing[crossing]
+            after = chunk["data"].to_numpy(dtype=str) >= UPGRADE_STAMP
+            self.stats["legacy_events_before"] += int((legacy & ~after).sum())
+            self.stats["legacy_events_after"] += int((legacy & after).sum())
+            events.add(chunk["id"].to_numpy())
+            event_sections.add(section)
+            rows += len(chunk)
+        self.report.append(f"{directory.name} {EVENT_TABLE}: {rows} rows ok")
+
+    def _check_new_ids(
+        self,
+        message: str,
+        seen: Bitset,
+        path: Path,
+        line: int,
+        chunk: pd.DataFrame,
+        column: str = "id",
+    ) -> None:
+        ids = chunk[column].to_numpy()
+        repeated = seen.contains(ids) | pd.Series(ids).duplicated().to_numpy()
+        _fail(message, path.name, line, chunk, repeated | (ids <= 0), self.max_rows)
+
+    def _check_reference(
+        self, table: str, column: str, path: Path, line: int, chunk: pd.DataFrame
+    ) -> None:
+        unknown = ~self.ids[table].contains(chunk[column].to_numpy())
+        _fail(
+            f"{column} not in {table}", path.name, line, chunk, unknown, self.max_rows
+        )
+
+    # ------------------------------------------------------------------
+    # Business effects
+    # ------------------------------------------------------------------
+
+    def _check_effects(self, snapshot: str) -> None:
+        stats = self.stats
+        self._check_effect(
+            snapshot,
+            "events at unprotected crossings per section fall after the upgrade",
+            (stats["legacy_events_before"], stats["sections_before"]),
+            (stats["legacy_events_after"], stats["sections_after"]),
+            -1,
+            min(stats["legacy_events_before"], stats["legacy_events_after"]),
+        )
+        self._check_effect(
+            snapshot,
+            "DB Cargo replacement share of cargo rides rises after the switch",
+            (stats["replacement_before"], stats["cargo_before"]),
+            (stats["replacement_after"], stats["cargo_after"]),
+            1,
+            min(stats["cargo_before"], stats["cargo_after"]),
+        )
+
+    def _check_effect(
+        self,
+        snapshot: str,
+        name: str,
+        before: Tuple[int, int],
+        after: Tuple[int, int],
+        direction: int,
+        sample: int,
+    ) -> None:
+        if not before[1] or not after[1]:
+            self.report.append(f"{snapshot} {name}: not covered by this snapshot")
+            return
+        z = direction * two_proportion_z(*before, *after)
+        summary = (
+            f"{snapshot} {name}: {before[0] / before[1]:.4f} -> "
+            f"{after[0] / after[1]:.4f} (z={z:.1f})"
+        )
+        if z >= EFFECT_Z:
+            self.report.append(f"{summary} ok")
+        elif sample < EFFECT_MIN_ROWS:
+            self.report.append(f"{summary} inconclusive, sample of {sample}")
+        else:
+            raise ValidationError(f"{summary}: effect missing")
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Validate generated snapshots without loading them.",
+    )
+    parser.add_argument(
+        "--input-dir", default=os.getenv("RAILGEN_OUTPUT_DIR", "output")
+    )
+    parser.add_argument(
+        "--snapshot",
+        nargs="+",
+        default=["T1", "T2"],
+        help="snapshots to validate in order; delta T2 dimensions need T1 first",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=_env_int("RAILGEN_VALIDATE_CHUNK_ROWS", 1_000_000),
+        help="fact rows read and checked at a time",
+    )
+    parser.add_argument(
+        "--max-rows",
+        type=int,
+        default=10,
+        help="offending rows reported for a failed check",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = _parse_args(argv)
+    input_path = Path(args.input_dir)
+    if not input_path.is_absolute():
+        input_path = Path(__file__).resolve().parent / input_path
+    validator = SnapshotValidator(input_path, args.chunk_rows, args.max_rows)
+    try:
+        validator.validate(args.snapshot)
+    except ValidationError as error:
+        for line in validator.report:
+            print(line)
+        print(f"FAILED: {error}")
+        sys.exit(1)
+    for line in validator.report:
+        print(line)
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from clock import HOUR, to_epoch
+from config import (
+    MONTH_MEAN_TEMPERATURE,
+    PRECIPITATION_TYPES,
+    REGION_TEMPERATURE_OFFSET,
+    REGIONS,
+)
+
+# ---------------------------------------------------------------------------
+# Precomputed weather field
+# Drawn once per region and hour; sections look their weather up.
+# ---------------------------------------------------------------------------
+
+BRAK, DESZCZ, SNIEG, GRAD = range(len(PRECIPITATION_TYPES))
+CENTRAL, COASTAL_REGION, MOUNTAIN_REGION = range(len(REGIONS))
+
+_MONTH_MEAN = np.array([0.0] + [MONTH_MEAN_TEMPERATURE[m] for m in range(1, 13)])
+_REGION_OFFSET = np.array([REGION_TEMPERATURE_OFFSET[name] for name in REGIONS])
+
+
+def sample_weather(
+    rng: np.random.Generator, month: np.ndarray, region: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Independent weather draws for the given months and region codes."""
+    total = len(month)
+    mean = _MONTH_MEAN[month] + _REGION_OFFSET[region]
+    temperature = np.clip(rng.normal(mean, 4.0), -30.0, 40.0)
+
+    winter = (month == 12) | (month <= 2)
+    summer = (month >= 6) & (month <= 8)
+    amount = rng.gamma(2.0, 2.0, total)
+    amount *= np.where(summer, 1.2, 1.0) * np.where(winter, 0.8, 1.0)
+    amount *= np.where(region == MOUNTAIN_REGION, 1.2, 1.0)
+    wet_coast = (region == COASTAL_REGION) & (winter | (month >= 10))
+    amount *= np.where(wet_coast, 1.15, 1.0)
+    amount = np.round(np.minimum(amount, 25.0), 1)
+
+    draws = rng.random((2, total))
+    transition = (month == 3) | (month == 4) | (month == 10) | (month == 11)
+    winter_type = np.where(
+        amount < 1.0,
+        BRAK,
+        np.where((amount < 6.0) | (draws[0] < 0.2), SNIEG, DESZCZ),
+    )
+    other_type = np.where(
+        (amount >= 10.0) & (draws[0] < 0.05),
+        GRAD,
+        np.where(
+            amount < 1.0,
+            BRAK,
+            np.where(transition & (draws[1] < 0.2), SNIEG, DESZCZ),
+        ),
+    )
+    precip_type = np.where(winter, winter_type, other_type).astype(np.int8)
+    return temperature, amount, precip_type
+
+
+class WeatherField:
+    """Weather per region and hour, starting at the hour of ``start``.
+
+    Arrays are indexed ``[region, hour]``; timestamps outside the window are
+    clamped to its first or last hour.
+    """
+
+    def __init__(self, seed: int, start: datetime, end: datetime) -> None:
+        first = to_epoch(start)
+        self.origin_epoch = first - first % HOUR
+        self.hours = (to_epoch(end) - self.origin_epoch) // HOUR + 1
+        rng = np.random.Generator(
+            np.random.PCG64(np.random.SeedSequence([seed, 0x77656174686572]))
+        )
+        stamps = (self.origin_epoch + np.arange(self.hours) * HOUR).astype(
+            "datetime64[s]"
+        )
+        month = np.tile(
+            stamps.astype("datetime64[M]").astype(np.int64) % 12 + 1, len(REGIONS)
+        )
+        region = np.repeat(np.arange(len(REGIONS)), self.hours)
+        temperature, amount, precip_type = sample_weather(rng, month, region)
+        shape = (len(REGIONS), self.hours)
+        self.temperature = temperature.reshape(shape)
+        self.precipitation = amount.reshape(shape)
+        self.precipitation_type = precip_type.reshape(shape)
+        # Python copies for the scalar engine, built on its first lookup.
+        self._rows: Optional[List[List[Tuple[float, float, str]]]] = None
+
+    def hour_index(self, epoch: np.ndarray) -> np.ndarray:
+        return np.clip((epoch - self.origin_epoch) // HOUR, 0, self.hours - 1)
+
+    def lookup(
+        self, region: np.ndarray, epoch: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Temperature, precipitation and type codes at epoch seconds."""
+        hour = self.hour_index(epoch)
+        return (
+            self.temperature[region, hour],
+            self.precipitation[region, hour],
+            self.precipitation_type[region, hour],
+        )
+
+    def at(self, region: int, seconds: int) -> Tuple[float, float, str]:
+        """Temperature, precipitation and type name for one section."""
+        if self._rows is None:
+            self._rows = [
+                list(zip(t, a, (PRECIPITATION_TYPES[code] for code in k)))
+                for t, a, k in zip(
+                    self.temperature.tolist(),
+                    self.precipitation.tolist(),
+                    self.precipitation_type.tolist(),
+                )
+            ]
+        offset = (seconds - self.origin_epoch) // HOUR
+        return self._rows[region][min(max(offset, 0), self.hours - 1)]